@@ -1,12 +1,14 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, BackgroundTasks, Depends
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, BackgroundTasks, Depends, Request
 from fastapi.responses import JSONResponse, Response, FileResponse
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 import os
+import json
+import asyncio
 import shutil
 import time
 import random
-import yaml
 from pathlib import Path
 from datetime import datetime
 
@@ -18,36 +20,72 @@ from ..models.schemas import (
     TranslationTask,
     SystemConfig,
     TaskResultUpdate,
-    TranslationSubmit
+    TranslationSubmit,
+    LayoutTranslateRequest,
+    ViewportUpdate
 )
-from ..models.sql_models import Task, Config
+from ..models.sql_models import Task, Config, TaskTranslation
 from ..core.database import get_db
 from ..core.config import TASKS_DIR
 from ..core.pdf_parse_manager import pdf_parse_manager
-from ..core.translation_manager import translation_manager
+from ..core.translation_manager import translation_manager, translation_yaml_path, InteractiveLaneBusy
+from ..core.pdf_pages import get_page_count, parse_page_range, format_page_range
+from ..core.client_pool import aliyun_client_pool
+from ..core.job_queue import job_queue
+from ..core.admission import admission_controller
+from ..core.circuit_breaker import circuit_breakers
+from ..core.hedging import request_hedger
+from ..core.key_pool import key_pools
+from ..core.model_router import model_stats
+from ..core.single_flight import translation_flight
+from ..core.task_logger import read_task_network
+from ..core.result_store import load_result, save_result, path_lock, source_hash, is_stale
 
 import logging
 logger = logging.getLogger(__name__)
 
 SUPPORTED_LANGUAGES = [
     {"name": "中文", "value": "Chinese"},
-    {"name": "英文", "value": "English"}
+    {"name": "英文", "value": "English"},
+    {"name": "日文", "value": "Japanese"},
+    {"name": "韩文", "value": "Korean"},
+    {"name": "法文", "value": "French"},
+    {"name": "德文", "value": "German"},
+    {"name": "西班牙文", "value": "Spanish"},
+    {"name": "俄文", "value": "Russian"}
 ]
 
 router = APIRouter()
 
+def _client_id(request: Request) -> str:
+    """提交者标识: 优先使用 X-User-Id 请求头，否则使用客户端 IP"""
+    user_id = (request.headers.get("X-User-Id") or "").strip()
+    if user_id:
+        return user_id[:128]
+    return request.client.host if request.client else "anonymous"
+
+def _admit(stage: str, client_id: str) -> None:
+    """超出容量时以 429/503 拒绝，并通过 Retry-After 告知重试时间"""
+    decision = admission_controller.check(stage, client_id)
+    if not decision.allowed:
+        raise HTTPException(status_code=decision.status_code, detail=decision.reason, headers=decision.headers())
+
 @router.get("/languages")
 async def get_languages():
     return {"languages": SUPPORTED_LANGUAGES}
 
 @router.post("/upload")
 async def upload_file(
+    request: Request,
     background_tasks: BackgroundTasks, 
     file: UploadFile = File(...),
     source_lang: str = Form("English"),
     target_lang: str = Form("English"),
+    page_range: str = Form("all"),
     db: Session = Depends(get_db)
 ):
+    client_id = _client_id(request)
+    _admit("parse", client_id)
     try:
         # 验证语言
         valid_values = [lang["value"] for lang in SUPPORTED_LANGUAGES]
@@ -65,6 +103,21 @@ async def upload_file(
         file_path = task_dir / file.filename
         with open(file_path, "wb") as buffer:
             shutil.copyfileobj(file.file, buffer)
+
+        # 校验并规范化页码范围；读取 PDF 的阻塞调用放到线程池，页数记录在任务上供调度与解析使用
+        try:
+            try:
+                page_count = await run_in_threadpool(get_page_count, str(file_path))
+            except Exception as e:
+                if (page_range or "all").strip().lower() != "all":
+                    raise
+                logger.warning(f"Failed to count pages of {file_path}: {e}")
+                page_count = 0
+            page_indices = parse_page_range(page_range, page_count)
+            page_range = format_page_range(page_indices)
+        except Exception as e:
+            shutil.rmtree(task_dir, ignore_errors=True)
+            raise HTTPException(status_code=400, detail=f"页码范围无效: {e}")
             
         # 创建数据库记录
         new_task = Task(
@@ -73,6 +126,9 @@ async def upload_file(
             file_path=str(file_path),
             source_lang=source_lang,
             target_lang=target_lang,
+            page_range=page_range,
+            page_count=page_count,
+            submitter=client_id,
             status="pending",
             parse_progress=0,
             translate_progress=0,
@@ -83,16 +139,23 @@ async def upload_file(
         db.commit()
         db.refresh(new_task)
         
-        # 提交任务到任务池
-        pdf_parse_manager.submit_task(task_id)
+        # 提交任务到任务池 (auto 引擎需要检测文本层，同样在线程池中执行)
+        engine = await run_in_threadpool(pdf_parse_manager.resolve_parse_engine, db.query(Config).first(), str(file_path))
+        pdf_parse_manager.submit_task(
+            task_id,
+            size=len(page_indices) if page_indices is not None else (page_count or None),
+            engine=engine,
+        )
         
-        return {"taskId": task_id, "status": "pending"}
+        return {"taskId": task_id, "status": "pending", "pageRange": page_range}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Upload error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/translate", response_model=TaskResponse)
-async def submit_translate_task(payload: TranslationSubmit, db: Session = Depends(get_db)):
+async def submit_translate_task(payload: TranslationSubmit, request: Request, db: Session = Depends(get_db)):
     task_id = payload.taskId
     task = db.query(Task).filter(Task.task_id == task_id).first()
     if not task:
@@ -101,9 +164,150 @@ async def submit_translate_task(payload: TranslationSubmit, db: Session = Depend
     if (task.parse_progress or 0) < 100:
         raise HTTPException(status_code=400, detail="解析未完成，无法开始翻译")
 
-    translation_manager.submit_task(task_id)
+    valid_values = [lang["value"] for lang in SUPPORTED_LANGUAGES]
+    extra_langs = []
+    for lang in payload.targetLangs or []:
+        if lang not in valid_values:
+            raise HTTPException(status_code=400, detail=f"不支持的目标语言: {lang}")
+        if lang != task.target_lang and lang not in extra_langs:
+            extra_langs.append(lang)
+
+    # 未指定 targetLangs 或其中包含主目标语言时翻译主目标语言
+    if not payload.targetLangs or task.target_lang in payload.targetLangs:
+        if not job_queue.has_active_job("translate", task_id):
+            _admit("translate", _client_id(request))
+        translation_manager.submit_task(task_id)
+
+    for lang in extra_langs:
+        record = (
+            db.query(TaskTranslation)
+            .filter(TaskTranslation.task_id == task_id, TaskTranslation.target_lang == lang)
+            .first()
+        )
+        if record is None:
+            record = TaskTranslation(task_id=task_id, target_lang=lang)
+            db.add(record)
+        if job_queue.has_active_job("translate", task_id, variant=lang):
+            continue
+        _admit("translate", _client_id(request))
+        record.status = "pending"
+        record.translate_progress = 0
+        record.failed_layouts = None
+        record.message = "等待翻译..."
+        db.commit()
+        translation_manager.submit_task(task_id, lang=lang)
     return {"taskId": task_id, "status": "processing"}
 
+def _task_translations(db: Session, task_id: str) -> List[dict]:
+    rows = (
+        db.query(TaskTranslation)
+        .filter(TaskTranslation.task_id == task_id)
+        .order_by(TaskTranslation.id)
+        .all()
+    )
+    return [
+        {
+            "targetLang": row.target_lang,
+            "status": row.status,
+            "translateProgress": row.translate_progress,
+            "message": row.message or "",
+            "failedLayouts": json.loads(row.failed_layouts) if row.failed_layouts else [],
+        }
+        for row in rows
+    ]
+
+def _result_path(task_id: str, lang: Optional[str], db: Session) -> Path:
+    """lang 为空或为主目标语言时返回 parse_result.yaml，否则返回该语言的译文文件"""
+    task_dir = TASKS_DIR / task_id
+    if lang:
+        task = db.query(Task).filter(Task.task_id == task_id).first()
+        if task and lang != task.target_lang:
+            return Path(translation_yaml_path(str(task_dir), lang))
+    return Path(translation_yaml_path(str(task_dir)))
+
+def _control_task(task_id: str, action: str, db: Session) -> dict:
+    task = db.query(Task).filter(Task.task_id == task_id).first()
+    if not task:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    active_langs = (
+        db.query(TaskTranslation)
+        .filter(TaskTranslation.task_id == task_id, TaskTranslation.status.in_(["pending", "processing"]))
+        .count()
+    )
+    if task.status not in ("pending", "processing") and not active_langs:
+        raise HTTPException(status_code=400, detail=f"任务当前状态为 {task.status}，无法{'暂停' if action == 'pause' else '取消'}")
+
+    stages = job_queue.request_control(task_id, action)
+    # 任务在本进程运行时立即停止，在独立 worker 中运行时由其轮询到控制请求后停止
+    if stages.get("parse") == "running":
+        pdf_parse_manager.control_task(task_id, action)
+    if stages.get("translate") == "running":
+        translation_manager.control_task(task_id, action)
+
+    status = "paused" if action == "pause" else "cancelled"
+    # 尚未开始的附加目标语言翻译直接更新状态，运行中的由翻译管理器更新
+    for record in (
+        db.query(TaskTranslation)
+        .filter(TaskTranslation.task_id == task_id, TaskTranslation.status == "pending")
+        .all()
+    ):
+        record.status = status
+        record.message = f"翻译已{'暂停' if action == 'pause' else '取消'}"
+    db.commit()
+    if task.status in ("pending", "processing") and "running" not in stages.values():
+        # 排队中或未入队的任务直接更新状态
+        stage_label = "解析" if (task.parse_progress or 0) < 100 else "翻译"
+        task.status = status
+        task.message = f"{stage_label}已{'暂停' if action == 'pause' else '取消'}"
+        db.commit()
+    return {"taskId": task_id, "status": status}
+
+@router.post("/task/{task_id}/pause", response_model=TaskResponse)
+async def pause_task(task_id: str, db: Session = Depends(get_db)):
+    return _control_task(task_id, "pause", db)
+
+@router.post("/task/{task_id}/cancel", response_model=TaskResponse)
+async def cancel_task(task_id: str, db: Session = Depends(get_db)):
+    return _control_task(task_id, "cancel", db)
+
+@router.post("/task/{task_id}/resume", response_model=TaskResponse)
+async def resume_task(task_id: str, request: Request, db: Session = Depends(get_db)):
+    task = db.query(Task).filter(Task.task_id == task_id).first()
+    if not task:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    stopped_langs = (
+        db.query(TaskTranslation)
+        .filter(TaskTranslation.task_id == task_id, TaskTranslation.status.in_(["paused", "cancelled", "partial"]))
+        .all()
+    )
+    resume_primary = task.status in ("paused", "cancelled", "partial")
+    if not resume_primary and not stopped_langs:
+        raise HTTPException(status_code=400, detail=f"任务当前状态为 {task.status}，无需恢复")
+
+    stage = "parse" if (task.parse_progress or 0) < 100 else "translate"
+    if resume_primary:
+        if not job_queue.has_active_job(stage, task_id):
+            _admit(stage, _client_id(request))
+        task.status = "pending"
+        task.message = "等待恢复解析..." if stage == "parse" else "等待恢复翻译..."
+    langs = []
+    if stage == "translate":
+        for record in stopped_langs:
+            if not job_queue.has_active_job("translate", task_id, variant=record.target_lang):
+                _admit("translate", _client_id(request))
+            record.status = "pending"
+            record.message = "等待恢复翻译..."
+            langs.append(record.target_lang)
+    db.commit()
+    if resume_primary:
+        if stage == "parse":
+            await run_in_threadpool(pdf_parse_manager.submit_task, task_id)
+        else:
+            translation_manager.submit_task(task_id, resume=True)
+    for lang in langs:
+        translation_manager.submit_task(task_id, resume=True, lang=lang)
+    return {"taskId": task_id, "status": "pending"}
+
 @router.get("/progress/{task_id}")
 async def get_progress(task_id: str, db: Session = Depends(get_db)):
     task = db.query(Task).filter(Task.task_id == task_id).first()
@@ -114,9 +318,27 @@ async def get_progress(task_id: str, db: Session = Depends(get_db)):
         "parseProgress": task.parse_progress,
         "translateProgress": task.translate_progress,
         "status": task.status,
-        "message": task.message or ""
+        "message": task.message or "",
+        "failedLayouts": json.loads(task.failed_layouts) if task.failed_layouts else [],
+        "targetLang": task.target_lang,
+        "translations": _task_translations(db, task_id),
+    }
+
+@router.get("/queue/stats")
+async def get_queue_stats():
+    return {
+        "stages": job_queue.stats(),
+        "breakers": circuit_breakers.snapshot(),
+        "hedging": request_hedger.snapshot(),
+        "models": model_stats.snapshot(),
+        "singleFlight": translation_flight.snapshot(),
     }
 
+@router.get("/keys/usage")
+async def get_key_usage():
+    """各翻译引擎凭据的用量与轮换状态 (凭据已脱敏)"""
+    return {"pools": key_pools.snapshot()}
+
 @router.get("/translations")
 async def get_translations(db: Session = Depends(get_db)):
     tasks = db.query(Task).order_by(Task.created_at.desc()).all()
@@ -131,7 +353,10 @@ async def get_translations(db: Session = Depends(get_db)):
             "parseProgress": task.parse_progress,
             "translateProgress": task.translate_progress,
             "createTime": task.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-            "message": task.message
+            "message": task.message,
+            "pageRange": task.page_range or "all",
+            "targetLang": task.target_lang,
+            "translations": _task_translations(db, task.task_id),
         })
         
     return {"tasks": result}
@@ -147,9 +372,8 @@ async def get_task_figure(task_id: str, filename: str):
     return FileResponse(file_path)
 
 @router.get("/task/{task_id}/result")
-async def get_task_result(task_id: str):
-    task_dir = TASKS_DIR / task_id
-    yaml_path = task_dir / "parse_result.yaml"
+async def get_task_result(task_id: str, lang: Optional[str] = None, db: Session = Depends(get_db)):
+    yaml_path = _result_path(task_id, lang, db)
 
     logger.info(f"Reading yaml file: {yaml_path}")
     logger.info(f"File exists: {yaml_path.exists()}")
@@ -162,10 +386,7 @@ async def get_task_result(task_id: str):
         return []
 
     try:
-        with open(yaml_path, "r", encoding="utf-8") as f:
-            data = yaml.safe_load(f)
-            
-        layouts = data.get("layouts", [])
+        _, layouts = load_result(str(yaml_path))
         result = []
         for idx, item in enumerate(layouts):
             result.append({
@@ -174,7 +395,8 @@ async def get_task_result(task_id: str):
                 "subType": item.get("subType"),
                 "markdownContent": item.get("markdownContent"),
                 "translatedMarkdownContent": item.get("translatedMarkdownContent") or "",
-                "pageNum": item.get("pageNum")
+                "pageNum": item.get("pageNum"),
+                "stale": is_stale(item),
             })
             
         return result
@@ -182,37 +404,111 @@ async def get_task_result(task_id: str):
         logger.error(f"Error reading yaml: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="解析结果读取失败")
 
+def _set_source(item: dict, markdown: str) -> None:
+    """修改原文；没有 sourceHash 的旧译文按修改前的原文补记，使其被识别为过期"""
+    if item.get("translatedMarkdownContent") and not item.get("sourceHash"):
+        item["sourceHash"] = source_hash(item.get("markdownContent") or "")
+    item["markdownContent"] = markdown
+
 @router.post("/task/{task_id}/result/update")
-async def update_task_result(task_id: str, update_data: TaskResultUpdate):
-    task_dir = TASKS_DIR / task_id
-    yaml_path = task_dir / "parse_result.yaml"
+async def update_task_result(task_id: str, update_data: TaskResultUpdate, lang: Optional[str] = None,
+                             db: Session = Depends(get_db)):
+    yaml_path = _result_path(task_id, lang, db)
     
     if not yaml_path.exists():
         raise HTTPException(status_code=404, detail="Result file not found")
+    if update_data.markdownContent is None and update_data.translatedMarkdownContent is None:
+        raise HTTPException(status_code=400, detail="更新内容不能为空")
         
     try:
-        with open(yaml_path, "r", encoding="utf-8") as f:
-            data = yaml.safe_load(f)
-            
-        layouts = data.get("layouts", [])
-        if update_data.index < 0 or update_data.index >= len(layouts):
-             raise HTTPException(status_code=400, detail="Invalid index")
-             
-        if update_data.markdownContent is None and update_data.translatedMarkdownContent is None:
-            raise HTTPException(status_code=400, detail="更新内容不能为空")
+        with path_lock(str(yaml_path)):
+            data, layouts = load_result(str(yaml_path))
+            if update_data.index < 0 or update_data.index >= len(layouts):
+                 raise HTTPException(status_code=400, detail="Invalid index")
+
+            item = layouts[update_data.index]
+            if update_data.markdownContent is not None:
+                _set_source(item, update_data.markdownContent)
+            if update_data.translatedMarkdownContent is not None:
+                item["translatedMarkdownContent"] = update_data.translatedMarkdownContent
+                # 人工修改的译文对应当前原文
+                item["sourceHash"] = source_hash(item.get("markdownContent") or "")
+            save_result(str(yaml_path), data, layouts)
+
         if update_data.markdownContent is not None:
-            layouts[update_data.index]["markdownContent"] = update_data.markdownContent
-        if update_data.translatedMarkdownContent is not None:
-            layouts[update_data.index]["translatedMarkdownContent"] = update_data.translatedMarkdownContent
-        
-        with open(yaml_path, "w", encoding="utf-8") as f:
-            yaml.safe_dump(data, f, allow_unicode=True, sort_keys=False)
+            # 原文由各目标语言共享：同步写入其余目标语言的结果，过期译文在编辑停止后自动刷新
+            langs = [None] + [
+                row.target_lang
+                for row in db.query(TaskTranslation).filter(TaskTranslation.task_id == task_id).all()
+            ]
+            for other in langs:
+                path = _result_path(task_id, other, db)
+                if not path.exists():
+                    continue
+                if path != yaml_path:
+                    with path_lock(str(path)):
+                        other_data, other_layouts = load_result(str(path))
+                        if update_data.index < len(other_layouts):
+                            _set_source(other_layouts[update_data.index], update_data.markdownContent)
+                            save_result(str(path), other_data, other_layouts)
+                translation_manager.schedule_refresh(task_id, other)
             
         return {"status": "success"}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error updating yaml: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Failed to update result")
 
+@router.post("/task/{task_id}/translate-layout")
+async def translate_layout(task_id: str, payload: LayoutTranslateRequest):
+    """立即翻译单个布局 (写回结果) 或任意文本，走预留的交互通道，不在批量翻译队列中排队"""
+    if payload.index is None and not (payload.text or "").strip():
+        raise HTTPException(status_code=400, detail="需要指定布局下标或待翻译文本")
+    try:
+        future = translation_manager.translate_interactive(task_id, payload.index, payload.text, payload.lang)
+        return await asyncio.wrap_future(future)
+    except InteractiveLaneBusy as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Interactive translation failed: task_id={task_id}, index={payload.index}, err={e}")
+        raise HTTPException(status_code=502, detail=f"翻译失败: {e}")
+
+@router.post("/task/{task_id}/viewport")
+async def update_viewport(task_id: str, payload: ViewportUpdate, db: Session = Depends(get_db)):
+    """记录详情页可见的页码，正在进行的翻译优先处理这些页及附近的页"""
+    task = db.query(Task).filter(Task.task_id == task_id).first()
+    if not task:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    # 只保留少量页码，避免异常请求放大排序开销
+    pages = sorted({int(p) for p in payload.pages if p >= 0})[:50]
+    task.viewport_pages = json.dumps(pages) if pages else None
+    task.viewport_updated_at = datetime.now()
+    db.commit()
+    return {"taskId": task_id, "pages": pages}
+
+@router.post("/task/{task_id}/refresh")
+async def refresh_stale_translations(task_id: str, lang: Optional[str] = None, db: Session = Depends(get_db)):
+    """立即重新翻译原文已修改的布局"""
+    task = db.query(Task).filter(Task.task_id == task_id).first()
+    if not task:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    if lang == task.target_lang:
+        lang = None
+    stale = translation_manager.refresh_stale(task_id, lang)
+    return {"taskId": task_id, "stale": stale}
+
+@router.get("/task/{task_id}/network-log")
+async def get_task_network_log(task_id: str, limit: int = 200):
+    """任务最近的网络请求日志 (兼容旧版 YAML 日志)"""
+    if not (TASKS_DIR / task_id).exists():
+        raise HTTPException(status_code=404, detail="任务不存在")
+    return {"entries": read_task_network(task_id, limit=max(0, limit))}
+
 @router.get("/task/{task_id}/source")
 async def download_source_file(task_id: str, db: Session = Depends(get_db)):
     task = db.query(Task).filter(Task.task_id == task_id).first()
@@ -237,7 +533,7 @@ async def download_translation(task_id: str, db: Session = Depends(get_db)):
     if not task:
         raise HTTPException(status_code=404, detail="任务不存在")
         
-    if task.status != "completed":
+    if task.status not in ("completed", "partial"):
         raise HTTPException(status_code=400, detail="翻译未完成")
         
     # TODO: 实现真实的文件下载逻辑
@@ -249,15 +545,7 @@ async def download_translation(task_id: str, db: Session = Depends(get_db)):
     }
     return Response(content=mock_content, media_type="application/pdf", headers=headers)
 
-@router.get("/config", response_model=SystemConfig)
-async def get_config(db: Session = Depends(get_db)):
-    config = db.query(Config).first()
-    if not config:
-        config = Config()
-        db.add(config)
-        db.commit()
-        db.refresh(config)
-    
+def _config_response(config: Config) -> dict:
     return {
         "aliyunAccessKeyId": config.aliyun_access_key_id,
         "aliyunAccessKeySecret": config.aliyun_access_key_secret,
@@ -266,15 +554,40 @@ async def get_config(db: Session = Depends(get_db)):
         "llmApiKey": config.llm_api_key,
         "llmModel": config.llm_model,
         "llmEndpoint": config.llm_endpoint,
-        "translationEngine": config.translation_engine
+        "translationEngine": config.translation_engine,
+        "parseEngine": config.parse_engine or "docmind",
+        "translationFailover": bool(config.translation_failover),
+        "llmExtraKeys": json.loads(config.llm_extra_keys) if config.llm_extra_keys else [],
+        "aliyunMtExtraKeys": json.loads(config.aliyun_mt_extra_keys) if config.aliyun_mt_extra_keys else [],
+        "llmModelRoutes": json.loads(config.llm_model_routes) if config.llm_model_routes else []
     }
 
+@router.get("/config", response_model=SystemConfig)
+async def get_config(db: Session = Depends(get_db)):
+    config = db.query(Config).first()
+    if not config:
+        config = Config()
+        db.add(config)
+        db.commit()
+        db.refresh(config)
+    
+    return _config_response(config)
+
+def _aliyun_credentials(config: Config) -> set:
+    """配置中使用的全部阿里云凭据 (主凭据与机器翻译附加凭据)"""
+    credentials = {(config.aliyun_access_key_id, config.aliyun_access_key_secret)}
+    extra_keys = json.loads(config.aliyun_mt_extra_keys) if config.aliyun_mt_extra_keys else []
+    credentials.update((key.get("accessKeyId"), key.get("accessKeySecret")) for key in extra_keys)
+    return credentials
+
 @router.post("/config", response_model=SystemConfig)
 async def update_config(config_in: SystemConfig, db: Session = Depends(get_db)):
     config = db.query(Config).first()
     if not config:
         config = Config()
         db.add(config)
+
+    old_credentials = _aliyun_credentials(config)
     
     config.aliyun_access_key_id = config_in.aliyunAccessKeyId
     config.aliyun_access_key_secret = config_in.aliyunAccessKeySecret
@@ -284,17 +597,19 @@ async def update_config(config_in: SystemConfig, db: Session = Depends(get_db)):
     config.llm_model = config_in.llmModel
     config.llm_endpoint = config_in.llmEndpoint
     config.translation_engine = config_in.translationEngine
+    config.parse_engine = config_in.parseEngine
+    config.translation_failover = config_in.translationFailover
+    config.llm_extra_keys = json.dumps([key.model_dump() for key in config_in.llmExtraKeys if key.apiKey])
+    config.aliyun_mt_extra_keys = json.dumps(
+        [key.model_dump() for key in config_in.aliyunMtExtraKeys if key.accessKeyId and key.accessKeySecret]
+    )
+    config.llm_model_routes = json.dumps([route.model_dump() for route in config_in.llmModelRoutes if route.model])
     
     db.commit()
     db.refresh(config)
+
+    # 丢弃使用已移除凭据 (主凭据与机器翻译附加凭据) 的共享客户端
+    for access_key_id, access_key_secret in old_credentials - _aliyun_credentials(config):
+        aliyun_client_pool.evict(access_key_id, access_key_secret)
     
-    return {
-        "aliyunAccessKeyId": config.aliyun_access_key_id,
-        "aliyunAccessKeySecret": config.aliyun_access_key_secret,
-        "aliyunRegion": config.aliyun_region,
-        "aliyunEndpoint": config.aliyun_endpoint,
-        "llmApiKey": config.llm_api_key,
-        "llmModel": config.llm_model,
-        "llmEndpoint": config.llm_endpoint,
-        "translationEngine": config.translation_engine
-    }
+    return _config_response(config)
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+import math
+import shutil
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from .config import PIPELINE_CONFIG, TASKS_DIR
+from .job_queue import job_queue, JobQueue
+
+logger = logging.getLogger(__name__)
+
+# 没有历史运行数据时，单个任务的预估耗时 (秒)
+DEFAULT_JOB_SECONDS = 120
+# 磁盘空间不足时建议的重试间隔 (秒)
+DISK_RETRY_SECONDS = 300
+MIN_RETRY_SECONDS = 5
+
+
+class AdmissionDecision:
+    def __init__(self, allowed: bool, status_code: int = 200, reason: str = "",
+                 retry_after: int = 0, estimated_start: Optional[datetime] = None):
+        self.allowed = allowed
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+        self.estimated_start = estimated_start
+
+    def headers(self) -> Dict[str, str]:
+        headers = {}
+        if self.retry_after:
+            headers["Retry-After"] = str(self.retry_after)
+        if self.estimated_start:
+            headers["X-Estimated-Start"] = self.estimated_start.isoformat(timespec="seconds")
+        return headers
+
+
+class AdmissionController:
+    """
+    在接收上传/翻译请求前检查系统容量。
+
+    - 单个提交者的排队+运行中任务过多: 429
+    - 队列深度或预计积压时长超限、数据盘剩余空间不足: 503
+    拒绝时给出 Retry-After 与预计开始时间，由调用方写入响应头。
+    """
+
+    def __init__(self, queue: Optional[JobQueue] = None, config: Optional[Dict[str, Any]] = None):
+        self.queue = queue or job_queue
+        self.config = config if config is not None else PIPELINE_CONFIG
+
+    def check(self, stage: str, client_id: Optional[str] = None) -> AdmissionDecision:
+        stats = self.queue.stats().get(stage) or {}
+        depth = int(stats.get("depth") or 0)
+        capacity = max(int(stats.get("running") or 0), int(self.config.get(f"{stage}_workers") or 1), 1)
+        job_seconds = float(stats.get("avgRunSeconds") or 0) or DEFAULT_JOB_SECONDS
+        # 新任务需等待当前排队任务全部开始，运行中的任务平均还需半个任务时长
+        backlog_seconds = (depth / capacity + (0.5 if stats.get("running") else 0)) * job_seconds
+        estimated_start = datetime.now() + timedelta(seconds=backlog_seconds)
+
+        min_free_mb = int(self.config.get("admission_min_free_disk_mb") or 0)
+        if min_free_mb > 0:
+            free_mb = self._free_disk_mb()
+            if free_mb is not None and free_mb < min_free_mb:
+                logger.warning(f"Admission rejected ({stage}): free disk {free_mb}MB < {min_free_mb}MB")
+                return AdmissionDecision(
+                    False, 503, "服务器存储空间不足，请稍后重试", DISK_RETRY_SECONDS
+                )
+
+        max_active = int(self.config.get("admission_max_active_per_client") or 0)
+        if max_active > 0 and client_id:
+            active = self.queue.active_count(client_id)
+            if active >= max_active:
+                logger.warning(f"Admission rejected ({stage}): client {client_id} has {active} active jobs")
+                retry_after = self._retry_seconds(job_seconds / capacity * (active - max_active + 1))
+                return AdmissionDecision(
+                    False, 429, f"您已有 {active} 个任务在排队或处理中 (上限 {max_active})，请等待部分任务完成后重试",
+                    retry_after, estimated_start,
+                )
+
+        max_depth = int(self.config.get("admission_max_queue_depth") or 0)
+        if max_depth > 0 and depth >= max_depth:
+            logger.warning(f"Admission rejected ({stage}): queue depth {depth} >= {max_depth}")
+            retry_after = self._retry_seconds(job_seconds / capacity * (depth - max_depth + 1))
+            return AdmissionDecision(
+                False, 503, f"当前排队任务过多 ({depth})，请稍后重试",
+                retry_after, estimated_start,
+            )
+
+        max_backlog = float(self.config.get("admission_max_backlog_seconds") or 0)
+        if max_backlog > 0 and backlog_seconds > max_backlog:
+            logger.warning(f"Admission rejected ({stage}): backlog {backlog_seconds:.0f}s > {max_backlog:.0f}s")
+            retry_after = self._retry_seconds(backlog_seconds - max_backlog)
+            return AdmissionDecision(
+                False, 503, f"当前预计需等待约 {math.ceil(backlog_seconds / 60)} 分钟，请稍后重试",
+                retry_after, estimated_start,
+            )
+
+        return AdmissionDecision(True, estimated_start=estimated_start)
+
+    def _retry_seconds(self, seconds: float) -> int:
+        return max(MIN_RETRY_SECONDS, int(math.ceil(seconds)))
+
+    def _free_disk_mb(self) -> Optional[int]:
+        try:
+            return int(shutil.disk_usage(TASKS_DIR).free / (1024 * 1024))
+        except Exception as e:
+            logger.warning(f"Failed to check disk usage of {TASKS_DIR}: {e}")
+            return None
+
+
+admission_controller = AdmissionController()
@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from .pdf_parser import PDFParser, STATUS_QUERY_ERROR
+from .pdf_pages import split_pdf
+
+logger = logging.getLogger(__name__)
+
+
+class _Chunk:
+    def __init__(self, index: int, file_path: str, pages: List[int]):
+        self.index = index
+        self.file_path = file_path
+        self.pages = pages
+        self.status = "init"
+        self.processing = 0.0
+        self.total_layout_num = 0
+        self.layouts: List[dict] = []
+        self.attempts = 0
+        self.job_id: Optional[str] = None
+        self.parser: Optional[PDFParser] = None
+
+
+class ChunkedPDFParser:
+    """
+    将大 PDF 按页拆分为多个子文件，作为并行的 DocMind 子任务提交，
+    并把各子任务的布局按页码顺序合并回来。
+
+    对外接口 (run/stop/task_status/total_layout_num/processed_layout_num/all_layouts
+    以及 on_update/on_data/on_finish 回调) 与 PDFParser 保持一致。
+    """
+
+    def __init__(self,
+                 task_id: str,
+                 file_path: str,
+                 output_path: str,
+                 chunk_dir: str,
+                 chunk_pages: int = 50,
+                 max_workers: int = 4,
+                 max_chunk_retries: int = 1,
+                 page_indices: Optional[List[int]] = None,
+                 resume_chunks: Optional[List[Dict]] = None,
+                 initial_layouts: Optional[List[dict]] = None,
+                 on_update: Optional[Callable] = None,
+                 on_data: Optional[Callable] = None,
+                 on_finish: Optional[Callable] = None,
+                 on_submit: Optional[Callable] = None,
+                 **parser_kwargs):
+        """
+        Args:
+            task_id (str): 本地任务 ID
+            file_path (str): 源 PDF 路径
+            output_path (str): 输出结果路径
+            chunk_dir (str): 子文件存放目录
+            chunk_pages (int): 每个子任务的页数
+            max_workers (int): 并行运行的子任务数
+            max_chunk_retries (int): 单个子任务失败后的重试次数
+            page_indices (List[int], optional): 只解析这些页 (从 0 开始)，默认全部页
+            resume_chunks (List[dict], optional): get_checkpoint() 保存的各子任务状态，用于接管云端任务
+            initial_layouts (List[dict], optional): 接管时已拉取的布局 (按页码归还给各子任务)
+            on_update (callable, optional): 汇总状态回调, signature: (task_id, old_status, new_status, processing)
+            on_data (callable, optional): 数据更新回调, signature: (task_id, new_layouts)
+            on_finish (callable, optional): 任务结束回调, signature: (task_id, status, result_info)
+            on_submit (callable, optional): 子任务提交成功回调, signature: (task_id, job_id)
+            **parser_kwargs: 透传给每个子 PDFParser 的参数 (endpoint, access_key_id 等)
+        """
+        self.task_id = task_id
+        self.file_path = file_path
+        self.output_path = output_path
+        self.chunk_dir = chunk_dir
+        self.chunk_pages = chunk_pages
+        self.max_workers = max(1, max_workers)
+        self.max_chunk_retries = max(0, max_chunk_retries)
+        self.page_indices = page_indices
+        self.resume_chunks = resume_chunks
+        self.initial_layouts = initial_layouts
+        self.parser_kwargs = parser_kwargs
+
+        self._on_update_callback = on_update
+        self._on_data_callback = on_data
+        self._on_finish_callback = on_finish
+        self._on_submit_callback = on_submit
+
+        self.task_status = "idle"  # idle, init, processing, success, fail
+        self.chunks: List[_Chunk] = []
+
+        # 子任务在各自线程中回调，统一加锁后再转发给上层
+        self._lock = threading.RLock()
+        self._stop_event = threading.Event()
+
+    @property
+    def total_layout_num(self) -> int:
+        return sum(chunk.total_layout_num for chunk in self.chunks)
+
+    @property
+    def processed_layout_num(self) -> int:
+        return sum(len(chunk.layouts) for chunk in self.chunks)
+
+    @property
+    def all_layouts(self) -> List[dict]:
+        """按子任务 (即页码) 顺序拼接的布局"""
+        layouts: List[dict] = []
+        for chunk in self.chunks:
+            layouts.extend(chunk.layouts)
+        return layouts
+
+    def run(self, interval=5, stop_event: Optional[threading.Event] = None):
+        """同步运行所有子任务（阻塞直到完成或停止）"""
+        self._stop_event.clear()
+
+        chunk_files = split_pdf(self.file_path, self.chunk_dir, self.chunk_pages, self.page_indices)
+        self.chunks = [_Chunk(i, path, pages) for i, (path, pages) in enumerate(chunk_files)]
+        self._restore_chunks()
+        logger.info(
+            f"开始分片解析任务: task_id={self.task_id}, chunks={len(self.chunks)}, workers={self.max_workers}"
+        )
+        self._set_status("init")
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="PDFChunkWorker") as executor:
+            futures = [
+                executor.submit(self._run_chunk, chunk, interval, stop_event)
+                for chunk in self.chunks
+            ]
+            for future in futures:
+                try:
+                    future.result()
+                except Exception as e:
+                    logger.error(f"分片子任务异常: task_id={self.task_id}, err={e}", exc_info=True)
+
+        if self._stop_event.is_set():
+            logger.info(f"分片解析任务 {self.task_id} 已停止，已获取 {self.processed_layout_num} 个布局")
+            return
+
+        if all(chunk.status == "success" for chunk in self.chunks):
+            self._renumber_layouts()
+            self._set_status("success")
+            logger.info(f"分片解析任务 {self.task_id} 完成，共获取 {self.processed_layout_num} 个布局")
+            if self._on_finish_callback:
+                self._on_finish_callback(self.task_id, "success", {
+                    "status": "success",
+                    "output_path": self.output_path,
+                    "total_layouts": self.processed_layout_num,
+                })
+        else:
+            failed = [chunk.index for chunk in self.chunks if chunk.status != "success"]
+            # 只有状态查询失败 (云端任务可能仍在运行) 时整体为 error，调用方保留检查点稍后接管
+            query_error_only = all(chunk.status in ("success", STATUS_QUERY_ERROR) for chunk in self.chunks)
+            status = STATUS_QUERY_ERROR if query_error_only else "fail"
+            self._set_status(status)
+            logger.error(f"分片解析任务 {self.task_id} 失败: status={status}, failed_chunks={failed}")
+            if self._on_finish_callback:
+                self._on_finish_callback(self.task_id, status, {"error": "Chunk failed", "failed_chunks": failed})
+
+    def stop(self):
+        """发送停止信号到所有子任务"""
+        self._stop_event.set()
+        for chunk in self.chunks:
+            if chunk.parser:
+                chunk.parser.stop()
+        logger.info("分片任务已收到停止信号")
+
+    def _run_chunk(self, chunk: _Chunk, interval, external_stop_event=None):
+        while not self._stop_event.is_set():
+            if external_stop_event and external_stop_event.is_set():
+                self.stop()
+                break
+
+            chunk.attempts += 1
+            with self._lock:
+                requery = chunk.status == STATUS_QUERY_ERROR
+                chunk.status = "init"
+                chunk.processing = 0.0
+                if chunk.attempts > 1 and not requery:
+                    # 云端任务失败后重试时重新提交，丢弃该子任务已拉取的部分；
+                    # 只是状态查询失败时保留云端任务 ID 继续接管
+                    chunk.job_id = None
+                    chunk.layouts = []
+                chunk.total_layout_num = len(chunk.layouts)
+
+            parser = PDFParser(
+                task_id=self.task_id,
+                file_path=chunk.file_path,
+                output_path=self.output_path,
+                page_map=chunk.pages,
+                job_id=chunk.job_id,
+                initial_layouts=chunk.layouts,
+                on_update=lambda tid, old, new, processing: self._handle_chunk_update(chunk, new, processing),
+                on_data=lambda tid, layouts: self._handle_chunk_data(chunk, layouts),
+                on_submit=lambda tid, job_id: self._handle_chunk_submit(chunk, job_id),
+                **self.parser_kwargs,
+            )
+            chunk.parser = parser
+            parser.run(interval=interval, stop_event=external_stop_event)
+
+            with self._lock:
+                if parser.task_status in ("success", STATUS_QUERY_ERROR):
+                    chunk.status = parser.task_status
+                else:
+                    chunk.status = "fail"
+            if chunk.status == "success" or self._stop_event.is_set():
+                return
+            if chunk.attempts > self.max_chunk_retries:
+                logger.error(
+                    f"分片子任务失败: task_id={self.task_id}, chunk={chunk.index}, pages={chunk.pages[0] + 1}-{chunk.pages[-1] + 1}, attempts={chunk.attempts}"
+                )
+                return
+            logger.warning(
+                f"分片子任务失败，准备重试: task_id={self.task_id}, chunk={chunk.index}, attempt={chunk.attempts}"
+            )
+
+    def _handle_chunk_update(self, chunk: _Chunk, new_status: str, processing):
+        with self._lock:
+            chunk.status = new_status
+            try:
+                chunk.processing = float(processing or 0)
+            except (TypeError, ValueError):
+                chunk.processing = 0.0
+            if chunk.parser:
+                chunk.total_layout_num = max(chunk.total_layout_num, chunk.parser.total_layout_num)
+
+            # 失败的子任务可能重试，汇总状态不因单个子任务失败而提前结束
+            statuses = [c.status for c in self.chunks]
+            if all(s == "success" for s in statuses):
+                status = "success"
+            elif any(s == "processing" or s == "success" for s in statuses):
+                status = "processing"
+            else:
+                status = "init"
+            self._set_status(status)
+
+    def _handle_chunk_submit(self, chunk: _Chunk, job_id: str):
+        with self._lock:
+            # 重新提交时 PDFParser 会清空已拉取的布局
+            chunk.job_id = job_id
+            chunk.layouts = []
+            chunk.total_layout_num = 0
+            if self._on_submit_callback:
+                self._on_submit_callback(self.task_id, job_id)
+
+    def _handle_chunk_data(self, chunk: _Chunk, layouts: List[dict]):
+        with self._lock:
+            chunk.layouts.extend(layouts)
+            if chunk.parser:
+                chunk.total_layout_num = max(chunk.total_layout_num, chunk.parser.total_layout_num)
+            if self._on_data_callback:
+                self._on_data_callback(self.task_id, layouts)
+
+    def _aggregate_processing(self) -> float:
+        """按页数加权汇总各子任务的云端进度"""
+        total_pages = sum(len(chunk.pages) for chunk in self.chunks)
+        if total_pages == 0:
+            return 0.0
+        done = 0.0
+        for chunk in self.chunks:
+            percent = 100.0 if chunk.status == "success" else chunk.processing
+            done += percent * len(chunk.pages)
+        return round(done / total_pages, 2)
+
+    def _set_status(self, status: str):
+        with self._lock:
+            old_status = self.task_status
+            self.task_status = status
+            if self._on_update_callback and (status != old_status or status == "processing"):
+                self._on_update_callback(self.task_id, old_status, status, self._aggregate_processing())
+
+    def get_checkpoint(self) -> Dict:
+        """返回可持久化的恢复信息"""
+        with self._lock:
+            return {
+                "chunks": [
+                    {"job_id": chunk.job_id, "layout_num": len(chunk.layouts), "status": chunk.status}
+                    for chunk in self.chunks
+                ]
+            }
+
+    def _restore_chunks(self):
+        """按保存的检查点恢复各子任务的云端任务 ID 与已拉取布局"""
+        if not self.resume_chunks:
+            return
+        if len(self.resume_chunks) != len(self.chunks):
+            logger.warning(
+                f"分片检查点与当前拆分不一致，重新提交全部子任务: task_id={self.task_id}, saved={len(self.resume_chunks)}, chunks={len(self.chunks)}"
+            )
+            return
+
+        # 布局按页码归属到子任务，不依赖保存时的拼接顺序
+        page_to_chunk = {page: chunk for chunk in self.chunks for page in chunk.pages}
+        for layout in self.initial_layouts or []:
+            page_num = layout.get("pageNum")
+            if isinstance(page_num, list):
+                page_num = page_num[0] if page_num else None
+            chunk = page_to_chunk.get(page_num)
+            if chunk is not None:
+                chunk.layouts.append(layout)
+
+        for chunk, saved in zip(self.chunks, self.resume_chunks):
+            chunk.job_id = saved.get("job_id")
+            chunk.layouts = chunk.layouts[:int(saved.get("layout_num") or 0)]
+            chunk.total_layout_num = len(chunk.layouts)
+            if not chunk.job_id:
+                chunk.layouts = []
+        logger.info(
+            f"恢复分片检查点: task_id={self.task_id}, jobs={sum(1 for c in self.chunks if c.job_id)}, layouts={self.processed_layout_num}"
+        )
+
+    def _renumber_layouts(self):
+        """合并后按全局顺序重排布局序号"""
+        for idx, layout in enumerate(self.all_layouts):
+            if "index" in layout:
+                layout["index"] = idx
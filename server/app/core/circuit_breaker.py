@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+import logging
+from collections import deque
+from typing import Deque, Dict, List
+
+from .config import PIPELINE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(RuntimeError):
+    """熔断器处于打开状态，请求被直接拒绝"""
+
+
+class CircuitBreaker:
+    """
+    基于滑动窗口的熔断器。
+
+    - closed: 正常放行，记录最近 window_size 次调用的结果；失败或慢调用占比
+      达到 failure_rate_threshold (且调用数不少于 min_calls) 时打开
+    - open: 直接拒绝，open_seconds 后进入 half_open
+    - half_open: 只放行一个探测请求，成功则关闭，失败则重新打开
+    """
+
+    def __init__(self, name: str, window_size: int = 20, min_calls: int = 5,
+                 failure_rate_threshold: float = 0.5, slow_call_seconds: float = 30.0,
+                 open_seconds: float = 30.0):
+        self.name = name
+        self.window_size = max(1, int(window_size))
+        self.min_calls = max(1, int(min_calls))
+        self.failure_rate_threshold = float(failure_rate_threshold)
+        self.slow_call_seconds = float(slow_call_seconds or 0)
+        self.open_seconds = float(open_seconds)
+
+        self.state = "closed"
+        self._calls: Deque[bool] = deque(maxlen=self.window_size)  # True 表示失败或慢调用
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """是否放行本次调用"""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open":
+                if time.time() - self._opened_at < self.open_seconds:
+                    return False
+                self.state = "half_open"
+                self._probe_in_flight = False
+                logger.info(f"Circuit {self.name} half-open, probing")
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self, latency_seconds: float = 0.0) -> None:
+        slow = self.slow_call_seconds > 0 and latency_seconds >= self.slow_call_seconds
+        with self._lock:
+            if self.state == "half_open":
+                self._probe_in_flight = False
+                if slow:
+                    self._open("slow probe")
+                    return
+                self.state = "closed"
+                self._calls.clear()
+                logger.info(f"Circuit {self.name} closed after successful probe")
+                return
+            self._record(slow)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            if self.state == "half_open":
+                self._probe_in_flight = False
+                self._open("probe failed")
+                return
+            self._record(True)
+
+    def record_ignored(self) -> None:
+        """调用结束但结果与端点健康无关 (如单个凭据被限流)，只释放探测名额"""
+        with self._lock:
+            if self.state == "half_open":
+                self._probe_in_flight = False
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            calls = len(self._calls)
+            return {
+                "name": self.name,
+                "state": self.state,
+                "calls": calls,
+                "failureRate": round(sum(self._calls) / calls, 3) if calls else 0.0,
+            }
+
+    def _record(self, failed: bool) -> None:
+        self._calls.append(failed)
+        if self.state != "closed" or len(self._calls) < self.min_calls:
+            return
+        rate = sum(self._calls) / len(self._calls)
+        if rate >= self.failure_rate_threshold:
+            self._open(f"failure rate {rate:.0%}")
+
+    def _open(self, reason: str) -> None:
+        self.state = "open"
+        self._opened_at = time.time()
+        self._calls.clear()
+        logger.warning(f"Circuit {self.name} opened: {reason}, retry after {self.open_seconds}s")
+
+
+class CircuitBreakerRegistry:
+    """进程内按端点共享的熔断器"""
+
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(name)
+            if breaker is None:
+                breaker = CircuitBreaker(
+                    name,
+                    window_size=int(PIPELINE_CONFIG.get("breaker_window_size") or 20),
+                    min_calls=int(PIPELINE_CONFIG.get("breaker_min_calls") or 5),
+                    failure_rate_threshold=float(PIPELINE_CONFIG.get("breaker_failure_rate") or 0.5),
+                    slow_call_seconds=float(PIPELINE_CONFIG.get("breaker_slow_call_seconds") or 0),
+                    open_seconds=float(PIPELINE_CONFIG.get("breaker_open_seconds") or 30),
+                )
+                self._breakers[name] = breaker
+            return breaker
+
+    def snapshot(self) -> List[Dict[str, object]]:
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return [breaker.snapshot() for breaker in breakers]
+
+
+circuit_breakers = CircuitBreakerRegistry()
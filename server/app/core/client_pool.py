@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import threading
+import time
+import logging
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from alibabacloud_docmind_api20220711.client import Client as docmind_api20220711Client
+from alibabacloud_tea_openapi import models as open_api_models
+from alibabacloud_credentials.client import Client as CredClient
+
+from .aliyun_mt_client import AliyunMTClient, default_endpoint as default_mt_endpoint
+
+logger = logging.getLogger(__name__)
+
+# 使用默认凭据链 (环境变量/实例角色等) 的客户端定期重建，以获取轮换后的临时凭据
+DEFAULT_CREDENTIAL_TTL_SECONDS = 900
+
+
+class _PoolEntry:
+    def __init__(self, client: Any, fingerprint: str, expires_at: Optional[float]):
+        self.client = client
+        self.fingerprint = fingerprint
+        self.expires_at = expires_at
+
+
+class AliyunClientPool:
+    """
+    进程内共享的阿里云 SDK 客户端注册表，按 (类型, 端点, 凭据指纹) 复用。
+
+    客户端本身无请求级状态，可被多个任务线程同时使用。
+    """
+
+    def __init__(self, credential_ttl_seconds: int = DEFAULT_CREDENTIAL_TTL_SECONDS):
+        self.credential_ttl_seconds = credential_ttl_seconds
+        self._entries: Dict[Tuple[str, str, str], _PoolEntry] = {}
+        self._lock = threading.Lock()
+        # 每个键一把构建锁：同一客户端只构建一次，不同客户端的构建互不阻塞
+        self._build_locks: Dict[Tuple[str, str, str], threading.Lock] = {}
+
+    def get_docmind_client(self, endpoint: str, access_key_id: Optional[str] = None,
+                           access_key_secret: Optional[str] = None) -> docmind_api20220711Client:
+        return self._get(
+            "docmind", endpoint, access_key_id, access_key_secret,
+            lambda: self._build_docmind_client(endpoint, access_key_id, access_key_secret),
+        )
+
+    def get_mt_client(self, access_key_id: str, access_key_secret: str, region_id: str = "cn-hangzhou",
+                      endpoint: str = default_mt_endpoint) -> AliyunMTClient:
+        return self._get(
+            "alimt", f"{region_id}/{endpoint}", access_key_id, access_key_secret,
+            lambda: AliyunMTClient(access_key_id, access_key_secret, region_id=region_id, endpoint=endpoint),
+        )
+
+    def evict(self, access_key_id: Optional[str] = None, access_key_secret: Optional[str] = None) -> int:
+        """移除使用指定凭据的客户端，返回移除数量"""
+        fingerprint = self._fingerprint(access_key_id, access_key_secret)
+        with self._lock:
+            keys = [key for key, entry in self._entries.items() if entry.fingerprint == fingerprint]
+            for key in keys:
+                del self._entries[key]
+                self._build_locks.pop(key, None)
+        if keys:
+            logger.info(f"Evicted {len(keys)} cached Aliyun clients: fingerprint={fingerprint}")
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._build_locks.clear()
+
+    def _get(self, kind: str, endpoint: str, access_key_id: Optional[str], access_key_secret: Optional[str],
+             factory: Callable[[], Any]) -> Any:
+        fingerprint = self._fingerprint(access_key_id, access_key_secret)
+        key = (kind, endpoint, fingerprint)
+        with self._lock:
+            client = self._fresh(key)
+            if client is not None:
+                return client
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+
+        # 构建 (含默认凭据链解析) 不持全局锁，只阻塞等待同一客户端的线程
+        with build_lock:
+            with self._lock:
+                client = self._fresh(key)
+            if client is not None:
+                return client
+            logger.info(f"Creating Aliyun {kind} client: endpoint={endpoint}, fingerprint={fingerprint}")
+            client = factory()
+            expires_at = None if (access_key_id and access_key_secret) else time.time() + self.credential_ttl_seconds
+            with self._lock:
+                self._entries[key] = _PoolEntry(client, fingerprint, expires_at)
+            return client
+
+    def _fresh(self, key: Tuple[str, str, str]) -> Any:
+        """未过期的已缓存客户端，调用方持有 _lock"""
+        entry = self._entries.get(key)
+        if entry is not None and (entry.expires_at is None or entry.expires_at > time.time()):
+            return entry.client
+        return None
+
+    def _fingerprint(self, access_key_id: Optional[str], access_key_secret: Optional[str]) -> str:
+        if not access_key_id or not access_key_secret:
+            return "default-credential-chain"
+        return hashlib.sha256(f"{access_key_id}:{access_key_secret}".encode("utf-8")).hexdigest()[:16]
+
+    def _build_docmind_client(self, endpoint: str, access_key_id: Optional[str],
+                              access_key_secret: Optional[str]) -> docmind_api20220711Client:
+        config = open_api_models.Config(endpoint=endpoint)
+        if access_key_id and access_key_secret:
+            config.access_key_id = access_key_id
+            config.access_key_secret = access_key_secret
+            config.type = "access_key"
+        else:
+            cred = CredClient()
+            try:
+                credential = cred.get_credential()
+                config.access_key_id = credential.get_access_key_id()
+                config.access_key_secret = credential.get_access_key_secret()
+            except Exception:
+                pass
+        return docmind_api20220711Client(config)
+
+
+aliyun_client_pool = AliyunClientPool()
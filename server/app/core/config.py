@@ -19,6 +19,20 @@ def init_directories():
     TASKS_DIR.mkdir(exist_ok=True)
     LOG_DIR.mkdir(exist_ok=True)
 
+def _load_package_section(section: str, defaults: dict) -> dict:
+    """Reads a config section from package.json and merges it over defaults"""
+    config = defaults.copy()
+    try:
+        package_json_path = SERVER_DIR.parent / "package.json"
+        if package_json_path.exists():
+            with open(package_json_path, "r", encoding="utf-8") as f:
+                package_data = json.load(f)
+                config.update(package_data.get(section, {}))
+    except Exception as e:
+        print(f"Warning: Failed to read package.json {section} config: {e}")
+
+    return config
+
 def get_logging_config():
     """Reads logging configuration from package.json"""
     default_config = {
@@ -26,21 +40,107 @@ def get_logging_config():
         "max_bytes": 10485760, # 10MB
         "backup_count": 5
     }
+    return _load_package_section("logging", default_config)
 
-    try:
-        package_json_path = SERVER_DIR.parent / "package.json"
-        if package_json_path.exists():
-            with open(package_json_path, "r", encoding="utf-8") as f:
-                package_data = json.load(f)
-                logging_config = package_data.get("logging", {})
-
-                # Merge with defaults
-                config = default_config.copy()
-                config.update(logging_config)
-                return config
-    except Exception as e:
-        print(f"Warning: Failed to read package.json logging config: {e}")
+def get_pipeline_config():
+    """Reads parse/translate pipeline tuning from package.json"""
+    default_config = {
+        # 页数超过该值的 PDF 拆分为多个子任务并行提交到 DocMind (0 表示关闭)
+        "parse_split_min_pages": 200,
+        # 每个子任务包含的页数
+        "parse_chunk_pages": 50,
+        # 同一文档同时运行的子任务数
+        "parse_chunk_workers": 4,
+        # 单个子任务失败后的重试次数
+        "parse_chunk_retries": 1,
+        # 连续查询 DocMind 状态失败达到该次数时停止轮询，保留云端任务稍后接管 (不重新提交)
+        "parse_status_max_errors": 10,
+        # 本地解析进程池大小 (0 表示按 CPU 核数)
+        "local_parse_workers": 0,
+        # 解析/翻译队列的并发 worker 数
+        "parse_workers": 2,
+        "translate_workers": 2,
+        # 队列任务租约时长 (秒)，worker 每 1/3 租约续约一次
+        "job_lease_seconds": 60,
+        # API 进程内是否同时运行解析/翻译 worker；使用独立 worker 进程 (server/worker.py) 时关闭
+        "embedded_workers": True,
+        # SQLite 写锁等待秒数 (API 与 worker 进程共享同一数据库文件，数据库以 WAL 模式打开)
+        "sqlite_busy_timeout_seconds": 30,
+        # 各引擎在所有 worker 中同时运行的任务数上限 (0 或缺省表示不限)
+        "engine_limits": {"docmind": 4, "local": 2, "llm": 4, "aliyun": 4},
+        # 排队任务的有效大小随等待时间衰减 (等待该秒数后减半)，防止大任务长期排不上
+        "scheduler_aging_seconds": 600,
+        # 等待超过该秒数的任务不再参与公平/短作业排序，直接按入队顺序优先
+        "scheduler_max_wait_seconds": 3600,
+        # 准入控制: 单阶段排队任务数上限、预计积压时长上限 (秒)、数据盘最小剩余空间 (MB)、
+        # 单个提交者排队+运行中的任务数上限 (均为 0 表示不限制)
+        "admission_max_queue_depth": 500,
+        "admission_max_backlog_seconds": 7200,
+        "admission_min_free_disk_mb": 1024,
+        "admission_max_active_per_client": 20,
+        # 单个布局重试耗尽后继续翻译其余布局，结束时以更长退避重试失败布局，仍失败则任务为 partial
+        "translate_continue_on_error": True,
+        "translate_deferred_retries": 2,
+        "translate_deferred_backoff_seconds": 15,
+        # 翻译端点熔断: 最近 breaker_window_size 次调用中失败/慢调用占比达到 breaker_failure_rate 时打开，
+        # breaker_open_seconds 后放行一个探测请求；耗时超过 breaker_slow_call_seconds 的调用计为慢调用 (0 表示不统计)
+        "breaker_window_size": 20,
+        "breaker_min_calls": 5,
+        "breaker_failure_rate": 0.5,
+        "breaker_slow_call_seconds": 30,
+        "breaker_open_seconds": 30,
+        # LLM 请求对冲 (默认关闭): 请求耗时超过近期 hedge_percentile 分位数 (且不少于 hedge_min_delay_seconds)
+        # 时再发一份相同请求，取先返回的结果；额外请求数不超过主请求的 hedge_budget_ratio
+        "hedge_enabled": False,
+        "hedge_percentile": 95,
+        "hedge_min_delay_seconds": 2,
+        "hedge_min_samples": 20,
+        "hedge_window_size": 200,
+        "hedge_budget_ratio": 0.05,
+        # 翻译凭据被限流 (HTTP 429 / Throttling) 且未返回 Retry-After 时暂停使用的秒数
+        "key_throttle_seconds": 30,
+        # 翻译前按字符类别识别语言，跳过已是目标语言或无需翻译 (网址、代码、数字) 的布局
+        "translate_detect_language": True,
+        # 同时跳过参考文献条目 ([n] 开头且含年份)
+        "translate_skip_references": True,
+        # 合并被栏/页打断的段落片段一起翻译，译文按原文长度比例切回各片段
+        "translate_merge_fragments": True,
+        # 原文被编辑后自动重新翻译已修改布局的延迟 (秒)，期间的连续编辑合并为一次；0 表示不自动刷新
+        "translate_refresh_debounce_seconds": 3,
+        # 交互式单段翻译的预留通道: 并发数、排队与执行中的请求上限 (超出时返回 429)、失败重试次数
+        "interactive_translate_workers": 2,
+        "interactive_translate_queue": 8,
+        "interactive_translate_retries": 1,
+        # 翻译时查询详情页可见页码的间隔 (秒)，以及可见页码超过多久未更新即失效 (秒)
+        "viewport_poll_seconds": 2,
+        "viewport_ttl_seconds": 300,
+        # 任务网络日志 (JSON Lines) 后台写入: 队列上限 (满时丢弃)、每批条数、攒批等待秒数
+        "network_log_queue_size": 10000,
+        "network_log_batch_size": 500,
+        "network_log_flush_seconds": 0.5,
+        # 单个日志文件超过该大小 (字节) 时轮转，保留的旧文件数；是否 gzip 压缩
+        "network_log_max_bytes": 10485760,
+        "network_log_backups": 3,
+        "network_log_compress": False,
+        # HTTP 调试日志采集策略: off / errors (只写出错的请求) / sampled (另按比例抽样成功请求) / all
+        "debug_capture_mode": "errors",
+        "debug_capture_sample_rate": 0.01,
+        # 每个调试日志在内存中保留的最近交互数，任务失败时补写到文件 (0 表示不保留)
+        "debug_capture_ring_size": 50,
+        # 写入时字符串最大字符数与列表最大条数，超出部分截断
+        "debug_capture_max_chars": 4000,
+        "debug_capture_max_items": 20,
+        # 各 LLM 模型每千 token 的价格，用于按模型估算翻译费用 (未配置的模型不计费)
+        "model_prices": {},
+    }
+    return _load_package_section("pipeline", default_config)
 
-    return default_config
+def embedded_workers_enabled() -> bool:
+    """环境变量 PDF_TRANSLATOR_EMBEDDED_WORKERS 优先于 package.json 配置"""
+    env = os.environ.get("PDF_TRANSLATOR_EMBEDDED_WORKERS")
+    if env is not None:
+        return env.strip().lower() not in {"0", "false", "no", "off"}
+    return bool(PIPELINE_CONFIG.get("embedded_workers", True))
 
 LOG_CONFIG = get_logging_config()
+PIPELINE_CONFIG = get_pipeline_config()
@@ -1,12 +1,33 @@
-from sqlalchemy import create_engine
+import logging
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from .config import DB_URL
+from .config import DB_URL, PIPELINE_CONFIG
 
-# SQLite 需要 check_same_thread=False
+logger = logging.getLogger(__name__)
+
+BUSY_TIMEOUT_SECONDS = float(PIPELINE_CONFIG.get("sqlite_busy_timeout_seconds") or 30)
+
+# SQLite 需要 check_same_thread=False；timeout 为等待其他连接 (含其他进程) 释放写锁的秒数
 engine = create_engine(
-    DB_URL, connect_args={"check_same_thread": False}
+    DB_URL, connect_args={"check_same_thread": False, "timeout": BUSY_TIMEOUT_SECONDS}
 )
+
+
+@event.listens_for(engine, "connect")
+def _configure_sqlite(dbapi_connection, connection_record):
+    """
+    API 与 worker 进程同时读写队列 (认领、续约、控制请求)：WAL 模式下读写互不阻塞，
+    写入在 busy_timeout 内等待锁，避免续约因 "database is locked" 失败导致租约过期。
+    WAL 依赖共享内存，数据库文件只能由同一主机上的进程访问 (不支持网络文件系统)。
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA busy_timeout={int(BUSY_TIMEOUT_SECONDS * 1000)}")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+    finally:
+        cursor.close()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
@@ -17,3 +38,50 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# create_all 不会修改已存在的表，新增列需要在这里登记，启动时自动补齐
+# {表名: {列名: 列定义}}
+SCHEMA_COLUMNS = {
+    "configs": {
+        "translation_engine": "VARCHAR DEFAULT 'llm'",
+        "parse_engine": "VARCHAR DEFAULT 'docmind'",
+        "translation_failover": "BOOLEAN DEFAULT 0",
+        "llm_extra_keys": "TEXT",
+        "aliyun_mt_extra_keys": "TEXT",
+        "llm_model_routes": "TEXT",
+    },
+    "tasks": {
+        "page_range": "VARCHAR DEFAULT 'all'",
+        "page_count": "INTEGER DEFAULT 0",
+        "parse_job_id": "VARCHAR",
+        "parse_layout_num": "INTEGER DEFAULT 0",
+        "parse_checkpoint": "TEXT",
+        "submitter": "VARCHAR",
+        "layout_count": "INTEGER DEFAULT 0",
+        "failed_layouts": "TEXT",
+        "viewport_pages": "TEXT",
+        "viewport_updated_at": "DATETIME",
+    },
+    "jobs": {
+        "submitter": "VARCHAR",
+        "size": "INTEGER DEFAULT 1",
+        "engine": "VARCHAR",
+        "control": "VARCHAR",
+        "variant": "VARCHAR",
+    },
+}
+
+def migrate_schema():
+    """为旧数据库补齐缺失的列 (SQLite)"""
+    with engine.connect() as conn:
+        for table, columns in SCHEMA_COLUMNS.items():
+            try:
+                result = conn.execute(text(f"PRAGMA table_info({table})"))
+                existing = [row.name for row in result.fetchall()]
+                for column, ddl in columns.items():
+                    if column not in existing:
+                        logger.info(f"Adding missing column '{column}' to '{table}' table")
+                        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+                conn.commit()
+            except Exception as e:
+                logger.warning(f"Schema check failed for table {table}: {e}")
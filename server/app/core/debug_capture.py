@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+import os
+import time
+import random
+import threading
+import logging
+from collections import deque
+from pprint import pformat
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from .config import PIPELINE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# off: 不记录; errors: 出错的请求立即写入; sampled: 出错的请求 + 按比例抽样的成功请求; all: 全部写入
+CAPTURE_MODES = ("off", "errors", "sampled", "all")
+REDACTED_HEADERS = {"authorization", "x-acs-accesskey-id", "x-acs-signature", "x-acs-security-token"}
+REDACTED_VALUE = "***"
+
+
+def redact_headers(headers: Any) -> Any:
+    """返回隐藏了鉴权头的请求头副本 (非 dict 原样返回)"""
+    if not isinstance(headers, dict) or not any(
+        isinstance(key, str) and key.lower() in REDACTED_HEADERS for key in headers
+    ):
+        return headers
+    return {
+        key: REDACTED_VALUE if isinstance(key, str) and key.lower() in REDACTED_HEADERS else value
+        for key, value in headers.items()
+    }
+
+
+def redact_secrets(value: Any, depth: int = 8) -> Any:
+    """递归隐藏任意层级中的鉴权头，用于已序列化为 dict/list 的日志内容"""
+    if depth <= 0:
+        return value
+    if isinstance(value, dict):
+        return {
+            key: REDACTED_VALUE if isinstance(key, str) and key.lower() in REDACTED_HEADERS
+            else redact_secrets(item, depth - 1)
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [redact_secrets(item, depth - 1) for item in value]
+    return value
+
+
+class _Exchange:
+    """一次 HTTP 交互，序列化与格式化推迟到真正写入文件时"""
+
+    __slots__ = ("timestamp", "source", "action", "status", "request", "response", "error", "serializer", "written")
+
+    def __init__(self, source, action, status, request, response, error, serializer):
+        self.timestamp = time.time()
+        self.source = source
+        self.action = action
+        self.status = status
+        self.request = request
+        self.response = response
+        self.error = error
+        self.serializer = serializer
+        self.written = False
+
+
+class DebugCapture:
+    """
+    HTTP 调试信息采集。
+
+    每个调试日志文件对应一个内存环形缓冲区，保存最近 debug_capture_ring_size 次交互 (只保存引用，不做序列化)；
+    按 debug_capture_mode 决定哪些交互立即写入文件，任务失败时再把缓冲区中尚未写入的交互补写到文件，
+    任务正常结束时直接丢弃。写入的字符串与列表按 debug_capture_max_chars / debug_capture_max_items 截断。
+    """
+
+    def __init__(self):
+        self._buffers: Dict[str, Deque[_Exchange]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def mode(self) -> str:
+        mode = str(PIPELINE_CONFIG.get("debug_capture_mode") or "errors").lower()
+        return mode if mode in CAPTURE_MODES else "errors"
+
+    @property
+    def enabled(self) -> bool:
+        """是否采集 HTTP 调试信息 (debug_capture_mode 不为 off)，创建解析器/翻译器时作为 debug 参数"""
+        return self.mode != "off"
+
+    def record(
+        self,
+        path: str,
+        source: str,
+        action: str,
+        request: Any = None,
+        response: Any = None,
+        status: Any = None,
+        error: Any = None,
+        serializer: Optional[Callable[[Any], Any]] = None,
+    ) -> None:
+        mode = self.mode
+        if mode == "off" or not path:
+            return
+        exchange = _Exchange(source, action, status, request, response, error, serializer)
+
+        ring_size = int(PIPELINE_CONFIG.get("debug_capture_ring_size") or 0)
+        if ring_size > 0:
+            key = os.path.abspath(path)
+            with self._lock:
+                ring = self._buffers.get(key)
+                if ring is None or ring.maxlen != ring_size:
+                    ring = deque(ring or (), maxlen=ring_size)
+                    self._buffers[key] = ring
+                ring.append(exchange)
+
+        if self._should_write(mode, exchange):
+            self._write(path, [exchange])
+
+    def finish(self, path: str, failed: bool) -> None:
+        """任务结束：失败时把缓冲区补写到文件，否则丢弃"""
+        if failed:
+            self.flush(path)
+        else:
+            self.discard(path)
+
+    def flush(self, path: str) -> int:
+        """把缓冲区中尚未写入的交互写入文件，返回写入条数"""
+        with self._lock:
+            ring = self._buffers.pop(os.path.abspath(path), None)
+        pending = [exchange for exchange in (ring or ()) if not exchange.written]
+        if pending:
+            self._write(path, pending, header=f"flushed {len(pending)} recent exchanges after task failure")
+        return len(pending)
+
+    def discard(self, path: str) -> None:
+        with self._lock:
+            self._buffers.pop(os.path.abspath(path), None)
+
+    def _should_write(self, mode: str, exchange: _Exchange) -> bool:
+        if mode == "all" or exchange.error is not None:
+            return True
+        if mode == "sampled":
+            rate = float(PIPELINE_CONFIG.get("debug_capture_sample_rate") or 0)
+            return rate > 0 and random.random() < rate
+        return False
+
+    def _write(self, path: str, exchanges: List[_Exchange], header: Optional[str] = None) -> None:
+        try:
+            lines: List[str] = []
+            if header:
+                timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
+                lines.append(f"{timestamp} - debug_capture - {header}")
+                lines.append("=" * 120)
+            for exchange in exchanges:
+                lines.extend(self._format(exchange))
+                exchange.written = True
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+        except Exception as e:
+            logger.error(f"Error writing debug capture to {path}: {e}")
+
+    def _format(self, exchange: _Exchange) -> List[str]:
+        timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(exchange.timestamp))
+        status = exchange.status
+        if callable(status):
+            try:
+                status = status()
+            except Exception:
+                status = None
+        lines = [f"{timestamp} - {exchange.source} - DEBUG_HTTP - action={exchange.action} status={status}"]
+        for title, value in (("REQUEST", exchange.request), ("RESPONSE", exchange.response)):
+            if value is None:
+                continue
+            if exchange.serializer is not None:
+                value = exchange.serializer(value)
+            lines.append(f"{title}:")
+            lines.extend("  " + line for line in pformat(self._truncate(value), width=160).splitlines())
+        if exchange.error is not None:
+            lines.append(f"ERROR: {type(exchange.error).__name__}: {self._truncate(str(exchange.error))}")
+        lines.append("-" * 120)
+        return lines
+
+    def _truncate(self, value: Any, depth: int = 8) -> Any:
+        """截断过长的字符串与列表，隐藏鉴权头"""
+        max_chars = int(PIPELINE_CONFIG.get("debug_capture_max_chars") or 0)
+        max_items = int(PIPELINE_CONFIG.get("debug_capture_max_items") or 0)
+        if isinstance(value, str):
+            if max_chars > 0 and len(value) > max_chars:
+                return f"{value[:max_chars]}...<truncated {len(value) - max_chars} chars>"
+            return value
+        if depth <= 0:
+            return self._truncate(repr(value), 1)
+        if isinstance(value, dict):
+            result = {}
+            for key, item in value.items():
+                if isinstance(key, str) and key.lower() in REDACTED_HEADERS:
+                    result[key] = REDACTED_VALUE
+                else:
+                    result[key] = self._truncate(item, depth - 1)
+            return result
+        if isinstance(value, (list, tuple)):
+            items = [self._truncate(item, depth - 1) for item in value[:max_items or None]]
+            if max_items > 0 and len(value) > max_items:
+                items.append(f"...<truncated {len(value) - max_items} items>")
+            return items
+        if isinstance(value, bytes):
+            return self._truncate(value.decode("utf-8", errors="replace"), depth)
+        return value
+
+
+debug_capture = DebugCapture()
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+import math
+import threading
+import time
+import logging
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Deque, Dict, Optional, TypeVar
+
+from .config import PIPELINE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class LatencyTracker:
+    """记录最近 window_size 次成功请求的耗时，用于计算动态分位数"""
+
+    def __init__(self, window_size: int = 200):
+        self._samples: Deque[float] = deque(maxlen=max(1, int(window_size)))
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct: float, min_samples: int = 1) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < max(1, min_samples):
+                return None
+            ordered = sorted(self._samples)
+        rank = max(0, min(len(ordered) - 1, int(math.ceil(pct / 100.0 * len(ordered))) - 1))
+        return ordered[rank]
+
+
+class HedgeBudget:
+    """
+    对冲请求预算 (令牌桶)：每个主请求累积 ratio 个令牌，每次对冲消耗 1 个，
+    保证对冲带来的额外请求不超过主请求的 ratio 比例。
+    """
+
+    def __init__(self, ratio: float = 0.05, max_tokens: float = 10.0):
+        self.ratio = max(0.0, float(ratio))
+        self.max_tokens = max(1.0, float(max_tokens))
+        self._tokens = 1.0
+        self._lock = threading.Lock()
+
+    def on_request(self) -> None:
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self._tokens < 1.0:
+                return False
+            self._tokens -= 1.0
+            return True
+
+
+class _HedgePolicy:
+    def __init__(self, window_size: int, budget_ratio: float):
+        self.latency = LatencyTracker(window_size)
+        self.budget = HedgeBudget(budget_ratio)
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+
+class RequestHedger:
+    """
+    对冲请求：请求耗时超过该端点近期耗时的 percentile 分位数时，再发出一份相同请求，
+    取先成功返回的结果；落后的请求在后台完成后被丢弃。
+
+    每个端点 (key) 独立统计耗时与预算。调用方需保证请求幂等。
+    """
+
+    def __init__(self, max_workers: int = 32):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="HedgeWorker")
+        self._policies: Dict[str, _HedgePolicy] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(PIPELINE_CONFIG.get("hedge_enabled"))
+
+    def call(self, key: str, fn: Callable[[], T]) -> T:
+        if not self.enabled:
+            return fn()
+
+        policy = self._policy(key)
+        policy.budget.on_request()
+        policy.requests += 1
+        delay = self._hedge_delay(policy)
+
+        primary = self._executor.submit(self._timed, fn)
+        if delay is None:
+            # 样本不足时不对冲
+            return self._unwrap(policy, primary.result())
+
+        done, _ = wait([primary], timeout=delay)
+        if done or not policy.budget.try_acquire():
+            return self._unwrap(policy, primary.result())
+
+        policy.hedges += 1
+        logger.info(f"Hedging request to {key}: primary exceeded {delay:.2f}s")
+        hedge = self._executor.submit(self._timed, fn)
+        pending = {primary, hedge}
+        last_error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                error = future.exception()
+                if error is not None:
+                    last_error = error
+                    continue
+                if future is hedge:
+                    policy.hedge_wins += 1
+                return self._unwrap(policy, future.result())
+        raise last_error
+
+    def snapshot(self) -> Dict[str, Dict[str, object]]:
+        with self._lock:
+            policies = dict(self._policies)
+        pct = float(PIPELINE_CONFIG.get("hedge_percentile") or 95)
+        return {
+            key: {
+                "requests": policy.requests,
+                "hedges": policy.hedges,
+                "hedgeWins": policy.hedge_wins,
+                "latencyPercentile": policy.latency.percentile(pct),
+            }
+            for key, policy in policies.items()
+        }
+
+    def _policy(self, key: str) -> _HedgePolicy:
+        with self._lock:
+            policy = self._policies.get(key)
+            if policy is None:
+                policy = _HedgePolicy(
+                    window_size=int(PIPELINE_CONFIG.get("hedge_window_size") or 200),
+                    budget_ratio=float(PIPELINE_CONFIG.get("hedge_budget_ratio") or 0.05),
+                )
+                self._policies[key] = policy
+            return policy
+
+    def _hedge_delay(self, policy: _HedgePolicy) -> Optional[float]:
+        threshold = policy.latency.percentile(
+            float(PIPELINE_CONFIG.get("hedge_percentile") or 95),
+            min_samples=int(PIPELINE_CONFIG.get("hedge_min_samples") or 20),
+        )
+        if threshold is None:
+            return None
+        return max(float(PIPELINE_CONFIG.get("hedge_min_delay_seconds") or 0), threshold)
+
+    def _timed(self, fn: Callable[[], T]):
+        start = time.time()
+        result = fn()
+        return result, time.time() - start
+
+    def _unwrap(self, policy: _HedgePolicy, timed_result):
+        result, elapsed = timed_result
+        # 记录单个请求自身的耗时，避免对冲等待拉高分位数
+        policy.latency.record(elapsed)
+        return result
+
+
+request_hedger = RequestHedger()
@@ -0,0 +1,673 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import socket
+import threading
+import uuid
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import func
+
+from .config import PIPELINE_CONFIG
+from .database import SessionLocal
+from .metrics import metrics, job_wait_seconds
+from .scheduler import FairShareScheduler, JobCandidate
+from ..models.sql_models import Job, Task, TaskTranslation
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("parse", "translate")
+ACTIVE_STATUSES = ("queued", "running")
+# 控制请求 -> 任务停止后的状态
+CONTROL_STATUSES = {"pause": "paused", "cancel": "cancelled"}
+# 租约丢失 (任务已被重新排队并可能由其他 worker 接管) 时通知处理函数停止的动作，
+# 处理函数停止后不再写入任务状态与结果文件
+INTERRUPT_ACTION = "interrupt"
+
+DEFAULT_LEASE_SECONDS = 60
+
+
+class JobInterrupted(Exception):
+    """处理函数因服务停止而中断，任务应归还队列稍后继续"""
+
+
+class JobControlled(Exception):
+    """处理函数响应了暂停/取消请求而停止"""
+
+    def __init__(self, action: str):
+        super().__init__(action)
+        self.action = action
+
+
+def make_worker_id(name: str) -> str:
+    """生成全局唯一的 worker 标识: 主机名:进程号:名称:随机串"""
+    return f"{socket.gethostname()}:{os.getpid()}:{name}:{uuid.uuid4().hex[:6]}"
+
+
+class JobQueue:
+    """
+    基于 SQLite jobs 表的持久化任务队列。
+
+    任务通过租约认领：认领时写入 lease_owner 与 lease_expires_at，运行期间定期续约，
+    租约过期 (进程崩溃/重启) 的任务会被重新放回队列。
+    认领顺序由 FairShareScheduler 决定 (公平分享 + 短作业优先 + 引擎并发上限)。
+    """
+
+    def __init__(self, scheduler: Optional[FairShareScheduler] = None):
+        self.scheduler = scheduler or FairShareScheduler(
+            engine_limits=PIPELINE_CONFIG.get("engine_limits") or {},
+            aging_seconds=PIPELINE_CONFIG.get("scheduler_aging_seconds") or 600,
+            max_wait_seconds=PIPELINE_CONFIG.get("scheduler_max_wait_seconds") or 0,
+        )
+
+    def enqueue(self, stage: str, task_id: str, payload: Optional[Dict[str, Any]] = None,
+                max_attempts: int = 3, submitter: Optional[str] = None, size: Optional[int] = None,
+                engine: Optional[str] = None, variant: Optional[str] = None) -> int:
+        """入队，同一任务同一阶段 (同一 variant) 已在排队或运行时直接返回已有任务"""
+        db = SessionLocal()
+        try:
+            existing = (
+                db.query(Job)
+                .filter(
+                    Job.stage == stage,
+                    Job.task_id == task_id,
+                    self._variant_filter(variant),
+                    Job.status.in_(ACTIVE_STATUSES),
+                )
+                .first()
+            )
+            if existing:
+                logger.info(f"Job for task {task_id} stage {stage} already {existing.status}: job_id={existing.id}")
+                return existing.id
+
+            job = Job(
+                task_id=task_id,
+                stage=stage,
+                status="queued",
+                payload=json.dumps(payload, ensure_ascii=False) if payload else None,
+                max_attempts=max_attempts,
+                submitter=submitter,
+                size=size,
+                engine=engine,
+                variant=variant,
+                enqueued_at=datetime.now(),
+            )
+            db.add(job)
+            db.commit()
+            logger.info(
+                f"Job enqueued: job_id={job.id}, task_id={task_id}, stage={stage}, variant={variant}, submitter={submitter}, size={size}, engine={engine}"
+            )
+            return job.id
+        finally:
+            db.close()
+
+    def claim(self, stage: str, owner: str, lease_seconds: int = DEFAULT_LEASE_SECONDS,
+              limit: int = 20, scan_limit: int = 500) -> Optional[Dict[str, Any]]:
+        """按调度顺序认领一个排队中的任务，返回任务信息或 None"""
+        db = SessionLocal()
+        try:
+            rows = (
+                db.query(Job.id, Job.submitter, Job.size, Job.engine, Job.enqueued_at)
+                .filter(Job.stage == stage, Job.status == "queued")
+                .order_by(Job.id)
+                .limit(scan_limit)
+                .all()
+            )
+            if not rows:
+                return None
+            candidates = [JobCandidate(*row) for row in rows]
+            # 引擎上限跨阶段统计 (同一引擎可能同时服务多个阶段)，公平分享按本阶段统计
+            running_by_engine = dict(
+                db.query(Job.engine, func.count(Job.id))
+                .filter(Job.status == "running")
+                .group_by(Job.engine)
+                .all()
+            )
+            running_by_submitter = {
+                submitter or "anonymous": count
+                for submitter, count in (
+                    db.query(Job.submitter, func.count(Job.id))
+                    .filter(Job.stage == stage, Job.status == "running")
+                    .group_by(Job.submitter)
+                    .all()
+                )
+            }
+            ordered = self.scheduler.order(candidates, running_by_submitter, running_by_engine)
+            for candidate in ordered[:limit]:
+                job = self._try_claim(db, candidate.job_id, owner, lease_seconds)
+                if job is not None:
+                    return job
+            return None
+        finally:
+            db.close()
+
+    def heartbeat(self, job_id: int, owner: str, lease_seconds: int = DEFAULT_LEASE_SECONDS) -> bool:
+        """续约，返回租约是否仍归属 owner"""
+        db = SessionLocal()
+        try:
+            updated = (
+                db.query(Job)
+                .filter(Job.id == job_id, Job.lease_owner == owner, Job.status == "running")
+                .update(
+                    {Job.lease_expires_at: datetime.now() + timedelta(seconds=lease_seconds)},
+                    synchronize_session=False,
+                )
+            )
+            db.commit()
+            return updated == 1
+        finally:
+            db.close()
+
+    def complete(self, job_id: int, owner: str) -> None:
+        self._finish(job_id, owner, {Job.status: "done", Job.finished_at: datetime.now()})
+
+    def fail(self, job_id: int, owner: str, error: str, retry: bool = True) -> None:
+        """标记失败，未超过最大尝试次数时重新排队"""
+        db = SessionLocal()
+        try:
+            job = (
+                db.query(Job)
+                .filter(Job.id == job_id, Job.lease_owner == owner, Job.status == "running")
+                .first()
+            )
+            if not job:
+                return
+            job.last_error = (error or "")[:1000]
+            job.lease_owner = None
+            job.lease_expires_at = None
+            if retry and (job.attempts or 0) < (job.max_attempts or 1):
+                job.status = "queued"
+                logger.warning(f"Job {job_id} failed, requeued: attempts={job.attempts}, err={error}")
+            else:
+                job.status = "failed"
+                job.finished_at = datetime.now()
+                logger.error(f"Job {job_id} failed permanently: attempts={job.attempts}, err={error}")
+                self._fail_record(db, job, f"任务执行失败: {error}")
+            db.commit()
+        finally:
+            db.close()
+
+    def request_control(self, task_id: str, action: str) -> Dict[str, str]:
+        """
+        对任务的活动队列任务发出暂停/取消请求。
+
+        排队中的任务直接转为 paused/cancelled；运行中的任务记录 control，
+        由持有租约的 worker 轮询到后停止。返回 {阶段: "queued" 或 "running"}。
+        """
+        status = CONTROL_STATUSES[action]
+        db = SessionLocal()
+        try:
+            jobs = (
+                db.query(Job.id, Job.stage)
+                .filter(Job.task_id == task_id, Job.status.in_(ACTIVE_STATUSES))
+                .all()
+            )
+            result: Dict[str, str] = {}
+            for job_id, stage in jobs:
+                updated = (
+                    db.query(Job)
+                    .filter(Job.id == job_id, Job.status == "queued")
+                    .update({Job.status: status, Job.finished_at: datetime.now()}, synchronize_session=False)
+                )
+                if updated:
+                    result[stage] = "queued"
+                    continue
+                updated = (
+                    db.query(Job)
+                    .filter(Job.id == job_id, Job.status == "running")
+                    .update({Job.control: action}, synchronize_session=False)
+                )
+                if updated:
+                    result[stage] = "running"
+            db.commit()
+            if result:
+                logger.info(f"Control requested: task_id={task_id}, action={action}, jobs={result}")
+            return result
+        finally:
+            db.close()
+
+    def pending_controls(self, job_ids: List[int]) -> Dict[int, str]:
+        """返回运行中任务尚未处理的控制请求 {job_id: action}"""
+        if not job_ids:
+            return {}
+        db = SessionLocal()
+        try:
+            rows = (
+                db.query(Job.id, Job.control)
+                .filter(Job.id.in_(job_ids), Job.status == "running", Job.control.isnot(None))
+                .all()
+            )
+            return {job_id: control for job_id, control in rows}
+        finally:
+            db.close()
+
+    def finish_controlled(self, job_id: int, owner: str, action: str) -> None:
+        """响应控制请求停止后，将任务标记为 paused/cancelled"""
+        self._finish(job_id, owner, {
+            Job.status: CONTROL_STATUSES.get(action, "cancelled"),
+            Job.control: None,
+            Job.finished_at: datetime.now(),
+        })
+        logger.info(f"Job {job_id} stopped by control request: {action}")
+
+    def release(self, job_id: int, owner: str) -> None:
+        """主动归还租约 (如服务停止)，不计入尝试次数"""
+        db = SessionLocal()
+        try:
+            (
+                db.query(Job)
+                .filter(Job.id == job_id, Job.lease_owner == owner, Job.status == "running")
+                .update(
+                    {
+                        Job.status: "queued",
+                        Job.lease_owner: None,
+                        Job.lease_expires_at: None,
+                        Job.attempts: func.max(Job.attempts - 1, 0),
+                    },
+                    synchronize_session=False,
+                )
+            )
+            db.commit()
+            logger.info(f"Job {job_id} released by {owner}")
+        finally:
+            db.close()
+
+    def recover_expired(self) -> int:
+        """将租约过期的运行中任务重新放回队列，返回恢复数量"""
+        db = SessionLocal()
+        try:
+            expired = (
+                db.query(Job)
+                .filter(Job.status == "running", Job.lease_expires_at < datetime.now())
+                .all()
+            )
+            for job in expired:
+                logger.warning(
+                    f"Job {job.id} lease expired: task_id={job.task_id}, stage={job.stage}, owner={job.lease_owner}"
+                )
+                job.lease_owner = None
+                job.lease_expires_at = None
+                if (job.attempts or 0) < (job.max_attempts or 1):
+                    job.status = "queued"
+                else:
+                    job.status = "failed"
+                    job.last_error = "lease expired"
+                    job.finished_at = datetime.now()
+                    self._fail_record(db, job, "任务执行超时 (worker 无响应)，已多次重试")
+            db.commit()
+            return len(expired)
+        finally:
+            db.close()
+
+    def _fail_record(self, db, job: Job, message: str) -> None:
+        """
+        队列任务最终失败时，把仍处于 pending/processing 的解析任务或译文记录标记为 failed，
+        否则详情页会一直显示进行中并持续轮询。处理函数已写入的终态 (failed/partial 等) 保持不变。
+        """
+        if job.stage == "translate" and job.variant:
+            record = (
+                db.query(TaskTranslation)
+                .filter(TaskTranslation.task_id == job.task_id, TaskTranslation.target_lang == job.variant)
+                .first()
+            )
+        else:
+            record = db.query(Task).filter(Task.task_id == job.task_id).first()
+        if record is None or record.status not in ("pending", "processing"):
+            return
+        record.status = "failed"
+        record.message = message[:500]
+
+    def has_active_job(self, stage: str, task_id: str, variant: Optional[str] = None) -> bool:
+        db = SessionLocal()
+        try:
+            return (
+                db.query(Job.id)
+                .filter(
+                    Job.stage == stage,
+                    Job.task_id == task_id,
+                    self._variant_filter(variant),
+                    Job.status.in_(ACTIVE_STATUSES),
+                )
+                .first()
+                is not None
+            )
+        finally:
+            db.close()
+
+    def _variant_filter(self, variant: Optional[str]):
+        return Job.variant.is_(None) if variant is None else Job.variant == variant
+
+    def active_count(self, submitter: str) -> int:
+        """某提交者在所有阶段中排队或运行中的任务数"""
+        db = SessionLocal()
+        try:
+            return (
+                db.query(Job)
+                .filter(Job.submitter == submitter, Job.status.in_(ACTIVE_STATUSES))
+                .count()
+            )
+        finally:
+            db.close()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """各阶段的队列深度、运行数、最老排队时长与近期平均等待/运行时间 (秒)"""
+        db = SessionLocal()
+        try:
+            now = datetime.now()
+            result: Dict[str, Dict[str, Any]] = {}
+            for stage in STAGES:
+                queued = db.query(Job).filter(Job.stage == stage, Job.status == "queued")
+                depth = queued.count()
+                oldest = queued.with_entities(func.min(Job.enqueued_at)).scalar()
+                running = db.query(Job).filter(Job.stage == stage, Job.status == "running").count()
+                recent = (
+                    db.query(Job.enqueued_at, Job.started_at)
+                    .filter(Job.stage == stage, Job.started_at.isnot(None))
+                    .order_by(Job.id.desc())
+                    .limit(50)
+                    .all()
+                )
+                waits = [(started - enqueued).total_seconds() for enqueued, started in recent if enqueued]
+                finished = (
+                    db.query(Job.started_at, Job.finished_at)
+                    .filter(Job.stage == stage, Job.status == "done", Job.started_at.isnot(None),
+                            Job.finished_at.isnot(None))
+                    .order_by(Job.id.desc())
+                    .limit(50)
+                    .all()
+                )
+                runs = [(finished_at - started).total_seconds() for started, finished_at in finished]
+                result[stage] = {
+                    "depth": depth,
+                    "running": running,
+                    "oldestAgeSeconds": round((now - oldest).total_seconds(), 1) if oldest else 0.0,
+                    "avgWaitSeconds": round(sum(waits) / len(waits), 1) if waits else 0.0,
+                    "avgRunSeconds": round(sum(runs) / len(runs), 1) if runs else 0.0,
+                }
+            return result
+        finally:
+            db.close()
+
+    def depth(self) -> Dict[tuple, float]:
+        """各阶段排队中/运行中的任务数 ({(stage, status): 数量})，供 /metrics 抓取"""
+        db = SessionLocal()
+        try:
+            counts = {(stage, status): 0 for stage in STAGES for status in ACTIVE_STATUSES}
+            rows = (
+                db.query(Job.stage, Job.status, func.count(Job.id))
+                .filter(Job.status.in_(ACTIVE_STATUSES))
+                .group_by(Job.stage, Job.status)
+                .all()
+            )
+            for stage, status, count in rows:
+                counts[(stage, status)] = count
+            return counts
+        finally:
+            db.close()
+
+    def oldest_queued_age(self) -> Dict[tuple, float]:
+        """各阶段最早排队任务已等待的秒数 ({(stage,): 秒})"""
+        db = SessionLocal()
+        try:
+            now = datetime.now()
+            ages = {(stage,): 0.0 for stage in STAGES}
+            rows = (
+                db.query(Job.stage, func.min(Job.enqueued_at))
+                .filter(Job.status == "queued")
+                .group_by(Job.stage)
+                .all()
+            )
+            for stage, oldest in rows:
+                if oldest:
+                    ages[(stage,)] = max(0.0, (now - oldest).total_seconds())
+            return ages
+        finally:
+            db.close()
+
+    def _try_claim(self, db, job_id: int, owner: str, lease_seconds: int) -> Optional[Dict[str, Any]]:
+        now = datetime.now()
+        # 条件更新保证同一任务只会被一个 worker 认领
+        updated = (
+            db.query(Job)
+            .filter(Job.id == job_id, Job.status == "queued")
+            .update(
+                {
+                    Job.status: "running",
+                    Job.lease_owner: owner,
+                    Job.lease_expires_at: now + timedelta(seconds=lease_seconds),
+                    Job.started_at: now,
+                    Job.attempts: Job.attempts + 1,
+                },
+                synchronize_session=False,
+            )
+        )
+        db.commit()
+        if updated != 1:
+            return None
+        job = db.query(Job).filter(Job.id == job_id).first()
+        if job.enqueued_at:
+            job_wait_seconds.observe(max(0.0, (now - job.enqueued_at).total_seconds()), stage=job.stage)
+        return self._to_dict(job)
+
+    def _finish(self, job_id: int, owner: str, values: Dict) -> None:
+        db = SessionLocal()
+        try:
+            values = {**values, Job.lease_owner: None, Job.lease_expires_at: None}
+            # 只有仍持有租约的 worker 能结束任务 (租约过期被回收后 lease_owner 已清空或属于新 worker)
+            db.query(Job).filter(Job.id == job_id, Job.lease_owner == owner, Job.status == "running").update(
+                values, synchronize_session=False
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def _to_dict(self, job: Job) -> Dict[str, Any]:
+        return {
+            "id": job.id,
+            "task_id": job.task_id,
+            "stage": job.stage,
+            "attempts": job.attempts,
+            "submitter": job.submitter,
+            "size": job.size,
+            "engine": job.engine,
+            "variant": job.variant,
+            "payload": json.loads(job.payload) if job.payload else {},
+            "enqueued_at": job.enqueued_at,
+            "started_at": job.started_at,
+        }
+
+
+job_queue = JobQueue()
+
+metrics.gauge_callback("job_queue_depth", "Jobs queued or running per stage", ["stage", "status"], job_queue.depth)
+metrics.gauge_callback("job_queue_oldest_age_seconds", "Age of the oldest queued job per stage", ["stage"],
+                       job_queue.oldest_queued_age)
+
+
+class QueueConsumer:
+    """
+    从 JobQueue 认领某一阶段的任务并在线程池中执行。
+
+    handler 签名: handler(task_id, job)；正常返回视为完成，抛出异常时按尝试次数重试，
+    抛出 JobInterrupted 时归还租约，由下次启动 (或其他 worker) 继续处理，
+    抛出 JobControlled 时按暂停/取消结束。
+
+    on_control 签名: on_control(task_id, action)；调度线程轮询到运行中任务的控制请求时调用，
+    由管理器通知对应任务停止。
+
+    on_lease_lost 签名: on_lease_lost(job)；续约失败 (租约已过期并被回收) 时调用，
+    由管理器以 INTERRUPT_ACTION 停止该任务。此后本 worker 不再对该任务做任何队列状态更新。
+    """
+
+    def __init__(self, stage: str, handler: Callable[[str, Dict[str, Any]], None], max_workers: int = 2,
+                 name: str = "QueueWorker", lease_seconds: int = DEFAULT_LEASE_SECONDS,
+                 poll_interval: float = 2.0, queue: Optional[JobQueue] = None,
+                 on_control: Optional[Callable[[str, str], None]] = None,
+                 on_lease_lost: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.stage = stage
+        self.handler = handler
+        self.on_control = on_control
+        self.on_lease_lost = on_lease_lost
+        self.max_workers = max(1, max_workers)
+        self.name = name
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.queue = queue or job_queue
+        self.worker_id = make_worker_id(name)
+
+        self.running_jobs: Dict[int, Dict[str, Any]] = {}
+        self._signaled_controls: Dict[int, str] = {}
+        # 租约已丢失、处理函数仍在停止中的任务
+        self._lost_jobs: set = set()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots = threading.Semaphore(self.max_workers)
+        self._wakeup = threading.Event()
+        self._stop_event = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+
+    @property
+    def started(self) -> bool:
+        return bool(self._threads)
+
+    @property
+    def stopping(self) -> bool:
+        return self._stop_event.is_set()
+
+    def start(self, max_workers: Optional[int] = None) -> None:
+        if self.started:
+            return
+        if max_workers:
+            self.max_workers = max(1, max_workers)
+            self._slots = threading.Semaphore(self.max_workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+        self._threads = [
+            threading.Thread(target=self._dispatch_loop, name=f"{self.name}-dispatch", daemon=True),
+            threading.Thread(target=self._heartbeat_loop, name=f"{self.name}-heartbeat", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        logger.info(f"Queue consumer started: stage={self.stage}, workers={self.max_workers}, worker_id={self.worker_id}")
+
+    def notify(self) -> None:
+        """有新任务入队时唤醒调度线程"""
+        self._wakeup.set()
+
+    def is_running(self, task_id: str) -> bool:
+        with self._lock:
+            return any(job["task_id"] == task_id for job in self.running_jobs.values())
+
+    def stop(self, wait: bool = False) -> None:
+        self._stop_event.set()
+        self._wakeup.set()
+        if self._executor:
+            try:
+                # cancel_futures is available in Python 3.9+
+                self._executor.shutdown(wait=wait, cancel_futures=True)
+            except Exception:
+                self._executor.shutdown(wait=wait)
+
+    def _dispatch_loop(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                self.queue.recover_expired()
+                while not self._stop_event.is_set() and self._slots.acquire(blocking=False):
+                    job = self.queue.claim(self.stage, self.worker_id, self.lease_seconds)
+                    if job is None:
+                        self._slots.release()
+                        break
+                    with self._lock:
+                        self.running_jobs[job["id"]] = job
+                    self._executor.submit(self._run_job, job)
+                self._poll_controls()
+            except Exception as e:
+                logger.error(f"Queue dispatch error: stage={self.stage}, err={e}", exc_info=True)
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+    def _poll_controls(self) -> None:
+        """将其他进程 (API) 写入的暂停/取消请求转交给管理器"""
+        if not self.on_control:
+            return
+        with self._lock:
+            jobs = dict(self.running_jobs)
+        for job_id, action in self.queue.pending_controls(list(jobs.keys())).items():
+            if self._signaled_controls.get(job_id) == action:
+                continue
+            self._signaled_controls[job_id] = action
+            try:
+                self.on_control(jobs[job_id]["task_id"], action)
+            except Exception as e:
+                logger.error(f"Control handler failed for job {job_id}: {e}")
+
+    def _heartbeat_loop(self) -> None:
+        interval = max(1.0, self.lease_seconds / 3)
+        while not self._stop_event.wait(interval):
+            with self._lock:
+                job_ids = list(self.running_jobs.keys())
+            for job_id in job_ids:
+                try:
+                    if not self.queue.heartbeat(job_id, self.worker_id, self.lease_seconds):
+                        self._lose_lease(job_id)
+                except Exception as e:
+                    logger.error(f"Heartbeat failed for job {job_id}: {e}")
+
+    def _lose_lease(self, job_id: int) -> None:
+        """租约已被回收：停止处理函数，避免与接管该任务的 worker 同时运行"""
+        with self._lock:
+            job = self.running_jobs.pop(job_id, None)
+            if job is None:
+                return
+            self._lost_jobs.add(job_id)
+            self._signaled_controls.pop(job_id, None)
+        logger.warning(f"Lost lease for job {job_id} ({self.stage}), stopping task {job['task_id']}")
+        if self.on_lease_lost:
+            try:
+                self.on_lease_lost(job)
+            except Exception as e:
+                logger.error(f"Lease-lost handler failed for job {job_id}: {e}")
+
+    def _owns(self, job_id: int) -> bool:
+        with self._lock:
+            lost = job_id in self._lost_jobs
+        if lost:
+            logger.warning(f"Job {job_id} no longer leased by {self.worker_id}, result discarded")
+        return not lost
+
+    def _run_job(self, job: Dict[str, Any]) -> None:
+        job_id = job["id"]
+        try:
+            logger.info(
+                f"Job {job_id} started: task_id={job['task_id']}, stage={self.stage}, attempt={job['attempts']}"
+            )
+            self.handler(job["task_id"], job)
+            if self._owns(job_id):
+                self.queue.complete(job_id, self.worker_id)
+        except JobInterrupted:
+            if self._owns(job_id):
+                logger.info(f"Job {job_id} interrupted, returning to queue")
+                self.queue.release(job_id, self.worker_id)
+        except JobControlled as e:
+            if self._owns(job_id):
+                self.queue.finish_controlled(job_id, self.worker_id, e.action)
+        except Exception as e:
+            logger.error(f"Job {job_id} handler error: {e}", exc_info=True)
+            if self._owns(job_id):
+                try:
+                    if self._stop_event.is_set():
+                        # 服务停止过程中的异常多由中断引起，与 JobInterrupted 一样归还队列
+                        self.queue.release(job_id, self.worker_id)
+                    else:
+                        self.queue.fail(job_id, self.worker_id, str(e))
+                except Exception as fail_err:
+                    logger.error(f"Failed to mark job {job_id} failed: {fail_err}")
+        finally:
+            with self._lock:
+                self.running_jobs.pop(job_id, None)
+                self._signaled_controls.pop(job_id, None)
+                self._lost_jobs.discard(job_id)
+            self._slots.release()
+            self._wakeup.set()
@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import threading
+import time
+import logging
+from typing import Any, Callable, Dict, List, Optional
+
+from .config import PIPELINE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+THROTTLE_MARKERS = ("throttl", "rate limit", "ratelimit", "too many requests", "quota")
+INVALID_MARKERS = (
+    "invalidaccesskeyid", "signaturedoesnotmatch", "invalid api key", "invalid_api_key",
+    "incorrect api key", "unauthorized", "forbidden", "nopermission", "accessdenied",
+)
+
+
+def classify_error(error: BaseException) -> str:
+    """将请求异常归类为 throttled / invalid / error"""
+    status = getattr(error, "status", None) or getattr(error, "statusCode", None)
+    try:
+        status = int(status) if status is not None else None
+    except (TypeError, ValueError):
+        status = None
+    if status == 429:
+        return "throttled"
+    if status in (401, 403):
+        return "invalid"
+
+    text = f"{getattr(error, 'code', '') or ''} {error}".lower()
+    if any(marker in text for marker in THROTTLE_MARKERS):
+        return "throttled"
+    if any(marker in text for marker in INVALID_MARKERS):
+        return "invalid"
+    return "error"
+
+
+def fingerprint(secret: str) -> str:
+    return hashlib.sha256((secret or "").encode("utf-8")).hexdigest()[:12]
+
+
+class KeyState:
+    def __init__(self, key_id: str, credential: Dict[str, Any], weight: float, label: str):
+        self.key_id = key_id
+        self.credential = credential
+        self.weight = max(0.01, float(weight or 1))
+        self.label = label
+        self.outstanding = 0
+        self.requests = 0
+        self.successes = 0
+        self.failures = 0
+        self.throttled = 0
+        self.throttled_until = 0.0
+        self.disabled = False
+        self.last_error: Optional[str] = None
+
+    def available(self, now: float) -> bool:
+        return not self.disabled and self.throttled_until <= now
+
+    def snapshot(self, now: float) -> Dict[str, Any]:
+        return {
+            "key": self.label,
+            "endpoint": self.credential.get("endpoint") or "",
+            "weight": self.weight,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "successes": self.successes,
+            "failures": self.failures,
+            "throttled": self.throttled,
+            "throttledForSeconds": max(0, round(self.throttled_until - now, 1)),
+            "disabled": self.disabled,
+            "lastError": self.last_error,
+        }
+
+
+class KeyPool:
+    """
+    同一翻译引擎的多组凭据/端点。
+
+    按 (进行中请求数 + 1) / 权重 最小选择凭据；被限流的凭据冷却一段时间后重新参与轮换，
+    鉴权失败的凭据被移出轮换直到配置变更。
+    """
+
+    def __init__(self, engine: str):
+        self.engine = engine
+        self._keys: Dict[str, KeyState] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, credentials: List[Dict[str, Any]]) -> None:
+        """更新凭据列表；未变化的凭据保留统计与状态"""
+        with self._lock:
+            keys: Dict[str, KeyState] = {}
+            for credential in credentials:
+                secret = credential.get("secret") or ""
+                if not secret:
+                    continue
+                key_id = f"{fingerprint(secret)}@{credential.get('endpoint') or ''}"
+                state = self._keys.get(key_id)
+                if state is None:
+                    state = KeyState(key_id, credential, credential.get("weight") or 1, credential.get("label") or key_id)
+                else:
+                    state.credential = credential
+                    state.weight = max(0.01, float(credential.get("weight") or 1))
+                keys[key_id] = state
+            if set(keys) != set(self._keys):
+                logger.info(f"Key pool {self.engine} configured: {len(keys)} keys")
+            self._keys = keys
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def acquire(self, can_use: Optional[Callable[[KeyState], bool]] = None) -> Optional[KeyState]:
+        """选择一组可用凭据并占用，没有可用凭据时返回 None"""
+        now = time.time()
+        with self._lock:
+            candidates = sorted(
+                (key for key in self._keys.values() if key.available(now)),
+                key=lambda key: ((key.outstanding + 1) / key.weight, key.requests),
+            )
+            for key in candidates:
+                if can_use is not None and not can_use(key):
+                    continue
+                key.outstanding += 1
+                key.requests += 1
+                return key
+        return None
+
+    def throttle_remaining(self) -> Optional[float]:
+        """未被停用的凭据中最早结束限流的剩余秒数，没有被限流的凭据时返回 None"""
+        now = time.time()
+        with self._lock:
+            remaining = [
+                key.throttled_until - now
+                for key in self._keys.values()
+                if not key.disabled and key.throttled_until > now
+            ]
+        return min(remaining) if remaining else None
+
+    def release(self, key: KeyState, error: Optional[BaseException] = None,
+                retry_after: Optional[float] = None) -> None:
+        with self._lock:
+            key.outstanding = max(0, key.outstanding - 1)
+            if error is None:
+                key.successes += 1
+                return
+            key.failures += 1
+            key.last_error = str(error)[:200]
+            kind = classify_error(error)
+            if kind == "throttled":
+                key.throttled += 1
+                cooldown = (
+                    retry_after
+                    or getattr(error, "retry_after", None)
+                    or PIPELINE_CONFIG.get("key_throttle_seconds")
+                    or 30
+                )
+                key.throttled_until = time.time() + float(cooldown)
+                logger.warning(f"Key {key.label} ({self.engine}) throttled, cooling down {cooldown}s")
+            elif kind == "invalid":
+                key.disabled = True
+                logger.error(f"Key {key.label} ({self.engine}) rejected, removed from rotation: {error}")
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            return [key.snapshot(now) for key in self._keys.values()]
+
+
+class KeyPoolRegistry:
+    """进程内按翻译引擎共享的凭据池"""
+
+    def __init__(self):
+        self._pools: Dict[str, KeyPool] = {}
+        self._lock = threading.Lock()
+
+    def get(self, engine: str) -> KeyPool:
+        with self._lock:
+            pool = self._pools.get(engine)
+            if pool is None:
+                pool = KeyPool(engine)
+                self._pools[engine] = pool
+            return pool
+
+    def snapshot(self) -> Dict[str, List[Dict[str, Any]]]:
+        with self._lock:
+            pools = dict(self._pools)
+        return {engine: pool.snapshot() for engine, pool in pools.items()}
+
+
+key_pools = KeyPoolRegistry()
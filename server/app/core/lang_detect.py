@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+import re
+from typing import Dict, Optional, Tuple
+
+# 布局分类
+TRANSLATABLE = "translatable"
+ALREADY_TARGET = "target"
+UNTRANSLATABLE = "untranslatable"
+
+URL_PATTERN = re.compile(r"(?:https?://|ftp://|www\.)\S+|\b10\.\d{4,9}/\S+", re.IGNORECASE)
+EMAIL_PATTERN = re.compile(r"\b[\w.+-]+@[\w-]+(?:\.[\w-]+)+\b")
+CODE_FENCE_PATTERN = re.compile(r"```[\s\S]*?```|`[^`\n]+`")
+CITATION_PATTERN = re.compile(r"\[\s*\d+(?:\s*[-–,]\s*\d+)*\s*\]")
+NUMBER_PATTERN = re.compile(r"[+-]?\d+(?:[.,:/]\d+)*%?")
+MARKUP_PATTERN = re.compile(r"<[^>]+>|!\[[^\]]*\]\([^)]*\)|\$[^$]*\$")
+# 参考文献条目: 以 [n] 开头且包含年份
+REFERENCE_ENTRY_PATTERN = re.compile(r"^\s*\[\d+\]\s+\S[\s\S]*\b(?:19|20)\d{2}[a-z]?\b")
+CODE_LINE_PATTERN = re.compile(r"[;{}]\s*$|^\s*(?:def|class|import|from|return|for|while|if|#include|public|private)\b|[=!<>]=|->|::")
+
+HAN_PATTERN = re.compile(r"[㐀-䶿一-鿿豈-﫿]")
+KANA_PATTERN = re.compile(r"[぀-ヿ]")
+HANGUL_PATTERN = re.compile(r"[가-힯ᄀ-ᇿ]")
+LATIN_PATTERN = re.compile(r"[A-Za-zÀ-ɏ]")
+CYRILLIC_PATTERN = re.compile(r"[Ѐ-ӿ]")
+WORD_PATTERN = re.compile(r"[A-Za-z]+")
+# 含变音字母的拉丁单词 (用于判断短文本是否像人名/缩写)
+LATIN_WORD_PATTERN = re.compile(r"[A-Za-zÀ-ɏ]+")
+
+ENGLISH_STOPWORDS = {
+    "the", "of", "and", "to", "in", "is", "a", "that", "for", "we", "this", "with", "are", "on",
+    "as", "by", "be", "it", "from", "an", "which", "can", "our", "at", "or", "not", "these", "was",
+}
+
+# 文字占全部字母类字符的比例达到该值时视为该文字
+SCRIPT_RATIO = 0.6
+# 一个汉字/假名/谚文字符承载的信息约相当于若干个拉丁字母，统计比例时按此加权
+CJK_WEIGHT = 3
+# 英文停用词占单词数的比例达到该值时视为英文
+ENGLISH_STOPWORD_RATIO = 0.12
+# 去掉网址/数字/引用等后剩余字母少于该值时视为不可翻译
+MIN_LETTERS = 2
+
+
+def _strip_untranslatable(text: str) -> str:
+    for pattern in (CODE_FENCE_PATTERN, URL_PATTERN, EMAIL_PATTERN, MARKUP_PATTERN, CITATION_PATTERN, NUMBER_PATTERN):
+        text = pattern.sub(" ", text)
+    return text
+
+
+def _looks_like_code(text: str) -> bool:
+    lines = [line for line in text.splitlines() if line.strip()]
+    if len(lines) < 2:
+        return False
+    code_lines = sum(1 for line in lines if CODE_LINE_PATTERN.search(line))
+    return code_lines / len(lines) >= 0.6
+
+
+def script_counts(text: str) -> Dict[str, int]:
+    """各类文字的加权字符数"""
+    return {
+        "han": len(HAN_PATTERN.findall(text)) * CJK_WEIGHT,
+        "kana": len(KANA_PATTERN.findall(text)) * CJK_WEIGHT,
+        "hangul": len(HANGUL_PATTERN.findall(text)) * CJK_WEIGHT,
+        "latin": len(LATIN_PATTERN.findall(text)),
+        "cyrillic": len(CYRILLIC_PATTERN.findall(text)),
+    }
+
+
+def detect_language(text: str) -> str:
+    """
+    根据字符类别统计粗略判断文本语言，返回 zh / ja / ko / ru / en / latin / unknown。
+    拉丁字母文本用常见英文停用词区分英文与其他语言。
+    """
+    counts = script_counts(text)
+    letters = sum(counts.values())
+    if letters == 0:
+        return "unknown"
+    if counts["kana"] > 0 and (counts["kana"] + counts["han"]) / letters >= SCRIPT_RATIO:
+        return "ja"
+    if counts["hangul"] / letters >= SCRIPT_RATIO:
+        return "ko"
+    if counts["han"] / letters >= SCRIPT_RATIO:
+        return "zh"
+    if counts["cyrillic"] / letters >= SCRIPT_RATIO:
+        return "ru"
+    if counts["latin"] / letters >= SCRIPT_RATIO:
+        words = [w.lower() for w in WORD_PATTERN.findall(text)]
+        if words and sum(1 for w in words if w in ENGLISH_STOPWORDS) / len(words) >= ENGLISH_STOPWORD_RATIO:
+            return "en"
+        return "latin"
+    return "unknown"
+
+
+def _target_code(target_lang: str) -> str:
+    low = (target_lang or "").strip().lower()
+    return {
+        "chinese": "zh",
+        "english": "en",
+        "japanese": "ja",
+        "korean": "ko",
+        "russian": "ru",
+    }.get(low, low)
+
+
+def _looks_like_names(text: str) -> bool:
+    """
+    短拉丁文本是否像人名列表或缩写：每个单词都是全大写缩写，或不少于两个单词且全部首字母大写。
+    小写的虚词 (und / y / del / de ...) 说明是普通短语，例如其他语言的章节标题。
+    """
+    words = LATIN_WORD_PATTERN.findall(text)
+    if not words:
+        return False
+    if all(len(w) >= 2 and w.isupper() for w in words):
+        return True
+    return len(words) >= 2 and all(w[0].isupper() for w in words)
+
+
+def classify_layout(text: str, target_lang: str, skip_references: bool = True,
+                    source_lang: Optional[str] = None) -> Tuple[str, str]:
+    """
+    在发起网络请求前对布局分类，返回 (分类, 检测到的语言)：
+    - untranslatable: 只有数字、网址、代码、引用标记等，或参考文献条目 (skip_references 为 True 时)
+    - target: 已经是目标语言
+    - translatable: 需要翻译
+
+    source_lang 为任务的源语言 (可为空或 auto)，用于判断没有英文停用词的短拉丁文本。
+    """
+    text = text or ""
+    if _looks_like_code(text):
+        return UNTRANSLATABLE, "code"
+    if skip_references and REFERENCE_ENTRY_PATTERN.match(text):
+        return UNTRANSLATABLE, detect_language(_strip_untranslatable(text))
+    remaining = _strip_untranslatable(text)
+    if sum(script_counts(remaining).values()) < MIN_LETTERS:
+        return UNTRANSLATABLE, "unknown"
+
+    detected = detect_language(remaining)
+    target = _target_code(target_lang)
+    if detected == target:
+        return ALREADY_TARGET, detected
+    if detected == "latin" and target == "en":
+        # 没有停用词的短拉丁文本：源语言为英文时 (如短标题) 或像作者名、缩写时无需翻译；
+        # 其他源语言的短标题 (Einleitung und Motivation) 仍需翻译
+        words = WORD_PATTERN.findall(remaining)
+        if len(words) <= 6 and (_target_code(source_lang) == "en" or _looks_like_names(remaining)):
+            return ALREADY_TARGET, detected
+    return TRANSLATABLE, detected
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+import re
+from typing import Dict, List, Optional, Sequence
+
+# 可能被拆成多段的正文布局类型
+MERGEABLE_TYPES = {"text", "para", "paragraph", "list", "reference", "footnote"}
+# 段落跨栏/跨页时夹在两段之间、可以越过的布局类型 (页眉页脚、图表等)
+PASS_THROUGH_TYPES = {
+    "head", "header", "foot", "footer", "page_number", "pagenum", "figure", "figure_name",
+    "table", "table_name", "formula", "equation", "image", "picture",
+}
+# 两个片段之间最多越过的布局数
+MAX_PASS_THROUGH = 4
+# 一组最多合并的片段数
+MAX_GROUP_SIZE = 4
+
+TERMINAL_PATTERN = re.compile(r"[.!?。！？:：;；…\"'”’)）\]】》>]\s*$")
+HEADING_START_PATTERN = re.compile(r"^\s*(?:#{1,6}\s|[-*+]\s|\d+[.)、]\s|[(（]?\d+[)）]\s|[•·▪●○]\s?)")
+CJK_PATTERN = re.compile(r"[぀-ヿ㐀-䶿一-鿿가-힯]")
+SOFT_HYPHEN_END = re.compile(r"[A-Za-z]-$")
+CUT_AFTER_CHARS = set("。！？；，、,;:：.!? ")
+
+
+def _layout_type(item: Dict) -> str:
+    return (item.get("type") or "").strip().lower()
+
+
+def _page(item: Dict) -> Optional[int]:
+    page_num = item.get("pageNum")
+    if isinstance(page_num, list):
+        return page_num[-1] if page_num else None
+    return page_num
+
+
+def _first_page(item: Dict) -> Optional[int]:
+    page_num = item.get("pageNum")
+    if isinstance(page_num, list):
+        return page_num[0] if page_num else None
+    return page_num
+
+
+def is_fragment_end(text: str) -> bool:
+    """文本末尾没有结束标点，可能在下一个布局中继续"""
+    stripped = (text or "").rstrip()
+    return stripped != "" and not TERMINAL_PATTERN.search(stripped)
+
+
+def is_continuation_start(text: str) -> bool:
+    """文本开头不像新段落 (标题、列表项、大写开头的新句子)"""
+    stripped = (text or "").lstrip()
+    if stripped == "" or HEADING_START_PATTERN.match(stripped):
+        return False
+    first = stripped[0]
+    if first.isalpha() and first.isascii():
+        return first.islower()
+    return True
+
+
+def _compatible(a: Dict, b: Dict) -> bool:
+    if _layout_type(a) != _layout_type(b):
+        return False
+    if (a.get("subType") or "") != (b.get("subType") or ""):
+        return False
+    page_a, page_b = _page(a), _first_page(b)
+    if page_a is not None and page_b is not None and page_b not in (page_a, page_a + 1):
+        return False
+    return True
+
+
+def find_merge_groups(layouts: Sequence[Dict], candidate: Optional[Sequence[bool]] = None) -> List[List[int]]:
+    """
+    找出被栏/页分隔的段落片段，返回多于一个片段的下标组 (按原顺序)。
+
+    片段判定：前一段末尾没有结束标点，后一段开头不像新段落，二者类型/子类型一致，
+    页码相同或相邻；两段之间只允许出现页眉页脚、图表等布局。
+    candidate[i] 为 False 的布局不参与合并。
+    """
+    groups: List[List[int]] = []
+    grouped = set()
+    total = len(layouts)
+    for start in range(total):
+        if start in grouped or (candidate is not None and not candidate[start]):
+            continue
+        if _layout_type(layouts[start]) not in MERGEABLE_TYPES:
+            continue
+        group = [start]
+        current = start
+        while len(group) < MAX_GROUP_SIZE and is_fragment_end(layouts[current].get("markdownContent") or ""):
+            nxt = _next_body(layouts, current, candidate)
+            if nxt is None:
+                break
+            if not _compatible(layouts[current], layouts[nxt]):
+                break
+            if not is_continuation_start(layouts[nxt].get("markdownContent") or ""):
+                break
+            group.append(nxt)
+            current = nxt
+        if len(group) > 1:
+            groups.append(group)
+            grouped.update(group)
+    return groups
+
+
+def _next_body(layouts: Sequence[Dict], idx: int, candidate: Optional[Sequence[bool]]) -> Optional[int]:
+    passed = 0
+    for nxt in range(idx + 1, len(layouts)):
+        if _layout_type(layouts[nxt]) in PASS_THROUGH_TYPES:
+            passed += 1
+            if passed > MAX_PASS_THROUGH:
+                return None
+            continue
+        if candidate is not None and not candidate[nxt]:
+            return None
+        return nxt
+    return None
+
+
+def join_fragments(texts: Sequence[str]) -> str:
+    """拼接片段：英文断词连字符去掉后直接相连，中日韩文字直接相连，其余以空格分隔"""
+    result = ""
+    for text in texts:
+        part = (text or "").strip()
+        if not result:
+            result = part
+        elif SOFT_HYPHEN_END.search(result) and part[:1].islower():
+            result = result[:-1] + part
+        elif CJK_PATTERN.match(result[-1]) or CJK_PATTERN.match(part[:1] or " "):
+            result += part
+        else:
+            result += " " + part
+    return result
+
+
+def split_translation(translated: str, source_lengths: Sequence[int]) -> List[str]:
+    """
+    按各片段原文长度的比例把合并后的译文切回多段。
+    切分点优先落在标点或空白之后 (在目标位置附近的窗口内寻找)，保证每段非空时尽量不切断词语。
+    """
+    count = len(source_lengths)
+    if count <= 1:
+        return [translated]
+    text = translated.strip()
+    total_source = sum(max(1, n) for n in source_lengths)
+    length = len(text)
+    window = max(4, length // 8)
+
+    cuts: List[int] = []
+    consumed = 0
+    previous = 0
+    for n in source_lengths[:-1]:
+        consumed += max(1, n)
+        target = round(length * consumed / total_source)
+        cut = _best_cut(text, target, window, previous)
+        cuts.append(cut)
+        previous = cut
+
+    parts = []
+    start = 0
+    for cut in cuts + [length]:
+        parts.append(text[start:cut].strip())
+        start = cut
+    return parts
+
+
+def _best_cut(text: str, target: int, window: int, lower: int) -> int:
+    length = len(text)
+    target = min(max(target, lower), length)
+    best = None
+    for offset in range(0, window + 1):
+        for pos in (target - offset, target + offset):
+            if lower < pos < length and text[pos - 1] in CUT_AFTER_CHARS:
+                best = pos
+                break
+        if best is not None:
+            break
+    if best is None:
+        best = target
+        # 拉丁文字不在单词中间切开
+        while lower < best < length and text[best - 1].isascii() and text[best - 1].isalnum() and text[best].isalnum():
+            best += 1
+    return best
+
+
+def merge_index(groups: List[List[int]]) -> Dict[int, List[int]]:
+    """组首下标 -> 组内全部下标"""
+    return {group[0]: group for group in groups}
@@ -3,25 +3,56 @@ import logging
 import os
 import re
 import time
-from pprint import pformat
-from typing import Callable, Dict, List, Optional, Tuple, Union, Any
+from typing import Callable, Collection, Dict, List, Optional, Tuple, Union, Any
 from urllib.error import HTTPError, URLError
 from urllib.request import Request, urlopen
 import threading
 
 import yaml
-from .aliyun_mt_client import AliyunMTClient
+from .client_pool import aliyun_client_pool
+from .circuit_breaker import circuit_breakers, CircuitOpenError
+from .hedging import request_hedger
+from .key_pool import key_pools, classify_error, KeyPool, KeyState
+from .model_router import ModelRouter, model_stats
+from .single_flight import FlightAborted, translation_flight
+from .lang_detect import classify_layout, TRANSLATABLE
+from .layout_merger import find_merge_groups, join_fragments, merge_index, split_translation
+from .result_store import source_hash, is_stale
+from .viewport_order import ViewportOrder
 from .task_logger import log_task_network
+from .debug_capture import debug_capture
+from .metrics import translation_request_seconds, translation_requests, translation_retries
 
 logger = logging.getLogger(__name__)
 IMAGE_MARKDOWN_PATTERN = re.compile(r"!\[[^\]]*?\]\([^\)]*?\)")
 IMAGE_HTML_PATTERN = re.compile(r"<img\b[^>]*>", re.IGNORECASE)
+INLINE_WHITESPACE_PATTERN = re.compile(r"[ \t\u00a0\u3000]+")
+# 阿里云机器翻译的语言代码
+ALIYUN_LANG_CODES = {
+    "Chinese": "zh", "English": "en", "Japanese": "ja", "Korean": "ko",
+    "French": "fr", "German": "de", "Spanish": "es", "Russian": "ru",
+}
 FORMULA_BLOCK_PATTERN = re.compile(
     r"\$\$[\s\S]*?\$\$|\\\[[\s\S]*?\\\]|\\begin\{(?:equation|align|aligned|eqnarray|math)\}[\s\S]*?\\end\{(?:equation|align|aligned|eqnarray|math)\}",
     re.IGNORECASE,
 )
 
 
+class TranslationHTTPError(RuntimeError):
+    """翻译接口返回的 HTTP 错误，保留状态码与 Retry-After 以便区分限流与鉴权失败"""
+
+    def __init__(self, message: str, status: int, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+def _mask_secret(secret: str) -> str:
+    if len(secret) <= 8:
+        return "***"
+    return f"{secret[:4]}***{secret[-4:]}"
+
+
 class LayoutTranslator:
     def __init__(
         self,
@@ -36,6 +67,15 @@ class LayoutTranslator:
         request_timeout_seconds: int = 60,
         max_retries: int = 3,
         retry_backoff_seconds: float = 1.0,
+        deferred_max_retries: int = 2,
+        deferred_backoff_seconds: float = 15.0,
+        fallback_engine: Optional[str] = None,
+        llm_extra_keys: Optional[List[Dict[str, Any]]] = None,
+        aliyun_mt_extra_keys: Optional[List[Dict[str, Any]]] = None,
+        model_routes: Optional[List[Dict[str, Any]]] = None,
+        detect_language: bool = True,
+        skip_references: bool = True,
+        merge_fragments: bool = True,
         debug: bool = False,
         debug_output_path: str = "layout_translator_debug.log",
     ):
@@ -43,6 +83,13 @@ class LayoutTranslator:
         self.source_lang = source_lang
         self.target_lang = target_lang
         self.model = model
+        # LLM 按布局类型/长度/难度选择模型，未配置规则时全部使用 model
+        self.model_router = ModelRouter(model, model_routes)
+        # 请求前本地识别已是目标语言或无需翻译 (网址、代码、参考文献等) 的布局
+        self.detect_language = bool(detect_language)
+        self.skip_references = bool(skip_references)
+        # 被栏/页打断的段落片段合并为一个翻译单元，译文按原文长度比例切回各片段
+        self.merge_fragments = bool(merge_fragments)
         self.base_url = (base_url or "").rstrip("/")
         self.translation_engine = translation_engine
         self.aliyun_access_key_id = aliyun_access_key_id
@@ -51,16 +98,73 @@ class LayoutTranslator:
         self.request_timeout_seconds = int(request_timeout_seconds)
         self.max_retries = int(max_retries)
         self.retry_backoff_seconds = float(retry_backoff_seconds)
+        # continue_on_error 模式下，失败布局在主循环结束后以更长退避再重试
+        self.deferred_max_retries = int(deferred_max_retries)
+        self.deferred_backoff_seconds = float(deferred_backoff_seconds)
         self.debug = bool(debug)
         self.debug_output_path = debug_output_path or "layout_translator_debug.log"
         self.current_task_id = None
 
-        self.aliyun_mt_client = None
-        if self.translation_engine == "aliyun":
-            if not self.aliyun_access_key_id or not self.aliyun_access_key_secret:
+        # 主引擎熔断或重试耗尽时切换到的备用引擎 (llm <-> aliyun)，None 表示不切换
+        self.fallback_engine = fallback_engine if fallback_engine and fallback_engine != translation_engine else None
+
+        # 每个引擎的凭据池：主凭据加上额外配置的凭据，按进行中请求数与权重分摊请求
+        self.key_pools: Dict[str, KeyPool] = {}
+        llm_credentials = self._llm_credentials(llm_extra_keys or [])
+        aliyun_credentials = self._aliyun_credentials(aliyun_mt_extra_keys or [])
+        if "llm" in (self.translation_engine, self.fallback_engine) and llm_credentials:
+            self.key_pools["llm"] = key_pools.get("llm")
+            self.key_pools["llm"].configure(llm_credentials)
+        if "aliyun" in (self.translation_engine, self.fallback_engine):
+            if not aliyun_credentials:
                 logger.warning("Translation engine is 'aliyun' but credentials missing.")
             else:
-                self.aliyun_mt_client = AliyunMTClient(self.aliyun_access_key_id, self.aliyun_access_key_secret)
+                self.key_pools["aliyun"] = key_pools.get("aliyun")
+                self.key_pools["aliyun"].configure(aliyun_credentials)
+
+        self.aliyun_mt_client = None
+        if self.aliyun_access_key_id and self.aliyun_access_key_secret and "aliyun" in self.key_pools:
+            self.aliyun_mt_client = aliyun_client_pool.get_mt_client(
+                self.aliyun_access_key_id, self.aliyun_access_key_secret
+            )
+        if self.fallback_engine and self.fallback_engine not in self.key_pools:
+            self.fallback_engine = None
+
+    def _llm_credentials(self, extra_keys: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        entries = [{"apiKey": self.api_key, "endpoint": self.base_url, "weight": 1}] + list(extra_keys)
+        credentials = []
+        for entry in entries:
+            api_key = entry.get("apiKey") or ""
+            if not api_key:
+                continue
+            credentials.append({
+                "secret": api_key,
+                "endpoint": (entry.get("endpoint") or self.base_url).rstrip("/"),
+                "weight": entry.get("weight") or 1,
+                "label": _mask_secret(api_key),
+            })
+        return credentials
+
+    def _aliyun_credentials(self, extra_keys: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        entries = [{
+            "accessKeyId": self.aliyun_access_key_id,
+            "accessKeySecret": self.aliyun_access_key_secret,
+            "weight": 1,
+        }] + list(extra_keys)
+        credentials = []
+        for entry in entries:
+            access_key_id = entry.get("accessKeyId") or ""
+            access_key_secret = entry.get("accessKeySecret") or ""
+            if not access_key_id or not access_key_secret:
+                continue
+            credentials.append({
+                "secret": f"{access_key_id}:{access_key_secret}",
+                "access_key_id": access_key_id,
+                "access_key_secret": access_key_secret,
+                "weight": entry.get("weight") or 1,
+                "label": _mask_secret(access_key_id),
+            })
+        return credentials
 
     def translate_yaml_file(
         self,
@@ -119,44 +223,151 @@ class LayoutTranslator:
         on_item: Optional[Callable[[int, str, bool], None]] = None,
         on_finish: Optional[Callable[[Optional[str], str, Dict[str, Any]], None]] = None,
         stop_event: Optional[threading.Event] = None,
+        pages: Optional[Collection[int]] = None,
+        skip_translated: bool = False,
+        continue_on_error: bool = False,
+        viewport: Optional[Callable[[], Optional[Collection[int]]]] = None,
+        viewport_poll_seconds: float = 2.0,
     ) -> List[Dict]:
+        """
+        pages 不为空时只翻译 pageNum 落在其中的布局 (从 0 开始的页码)；
+        skip_translated 为 True 时跳过已有译文的布局 (暂停/中断后恢复)；
+        原文在翻译后被修改 (sourceHash 不一致) 的布局及其所在合并组仍会重新翻译。
+
+        continue_on_error 为 True 时单个布局失败不终止任务：失败布局记录 translationError 后继续，
+        主循环结束后以更长的退避再重试一轮，仍失败的以 "partial" 状态结束，
+        info 中 failed_indices 为失败布局的下标。
+
+        规范化后原文相同 (且路由到同一模型) 的布局只翻译一次，译文复用到其余副本 (页眉页脚、重复单元格等)。
+        merge_fragments 开启时，跨栏/跨页的段落片段合并翻译，各片段记录 mergeGroup (组内全部下标)。
+
+        viewport 返回用户正在查看的页码时，剩余布局优先翻译这些页及其附近的页 (每 viewport_poll_seconds 秒查询一次)，
+        因此 on_item 的下标不一定递增。
+        """
         self.current_task_id = task_id
         safe_layouts: List[Dict] = layouts or []
         total = len(safe_layouts)
         translated_count = 0
         skipped_count = 0
+        deduplicated_count = 0
+        failed_indices: List[int] = []
+        # 本次任务内已翻译/已失败的原文: dedup key -> (译文, 引擎, 模型) / 错误信息
+        translated_units: Dict[Tuple[str, str], Tuple[str, str, str]] = {}
+        failed_units: Dict[Tuple[str, str], str] = {}
+        # 随组首一起翻译完成、等待主循环推进到其位置再上报进度的片段下标
+        merged_pending = set()
+        # 组首翻译失败的片段下标：不单独翻译，随组首在延迟重试中合并翻译
+        merged_failed = set()
+        # 恢复时可直接沿用译文的布局下标
+        current: set = set()
 
         try:
-            if self.translation_engine == "llm" and self.api_key == "":
+            if self.translation_engine == "llm" and "llm" not in self.key_pools:
                 raise ValueError("LLM API Key 不能为空")
-            if self.translation_engine == "aliyun" and not self.aliyun_mt_client:
+            if self.translation_engine == "aliyun" and "aliyun" not in self.key_pools:
                 raise ValueError("Aliyun Access Key 配置缺失")
 
+            distinct = len({self._normalize_source(item.get("markdownContent") or "") for item in safe_layouts})
             logger.info(
-                f"Translate layouts start: task_id={task_id}, total={total}, engine={self.translation_engine}, source={self.source_lang}, target={self.target_lang}"
+                f"Translate layouts start: task_id={task_id}, total={total}, distinct={distinct}, engine={self.translation_engine}, source={self.source_lang}, target={self.target_lang}"
             )
-            for idx, item in enumerate(safe_layouts):
+            if skip_translated:
+                current = self._current_translations(safe_layouts)
+                # 恢复时已有译文的布局也可作为重复原文的译文来源
+                for idx in sorted(current):
+                    item = safe_layouts[idx]
+                    key = self._dedup_key(item.get("markdownContent") or "", self.model_router.route(item))
+                    translated_units.setdefault(key, (
+                        item["translatedMarkdownContent"],
+                        item.get("translationEngine") or self.translation_engine,
+                        item.get("translationModel") or self.model,
+                    ))
+
+            merge_groups: Dict[int, List[int]] = {}
+            if self.merge_fragments:
+                candidate = [
+                    not self._should_skip_layout(item)
+                    and self._in_pages(item, pages)
+                    and idx not in current
+                    for idx, item in enumerate(safe_layouts)
+                ]
+                merge_groups = merge_index(find_merge_groups(safe_layouts, candidate))
+                if merge_groups:
+                    logger.info(f"Task {task_id} merged fragments: groups={len(merge_groups)}")
+
+            member_head = {member: head for head, group in merge_groups.items() for member in group[1:]}
+            order = ViewportOrder(safe_layouts, member_head, viewport, viewport_poll_seconds)
+            while True:
+                idx = order.next()
+                if idx is None:
+                    break
+                item = safe_layouts[idx]
                 if stop_event and stop_event.is_set():
                     logger.info(f"Task {task_id} stopped by user/system.")
                     if on_finish:
                          on_finish(task_id, "stopped", {"translated": translated_count, "total": total})
                     return safe_layouts
 
-                if self._should_skip_layout(item):
-                    content = item.get("markdownContent") or ""
+                if idx in merged_failed:
+                    continue
+
+                if idx in merged_pending:
+                    merged_pending.discard(idx)
+                    translated_count += 1
+                    if on_item:
+                        on_item(idx, item["translatedMarkdownContent"], False)
+                    continue
+
+                if idx in current:
                     skipped_count += 1
                     if on_item:
-                        on_item(idx, content, True)
+                        on_item(idx, item["translatedMarkdownContent"], True)
                     continue
 
+                group = merge_groups.get(idx)
                 content = item.get("markdownContent") or ""
+                if group:
+                    content = join_fragments([safe_layouts[i].get("markdownContent") or "" for i in group])
+                if (
+                    self._should_skip_layout(item)
+                    or not self._in_pages(item, pages)
+                    or not self._classify_layout(item, content)
+                ):
+                    skipped_count += 1
+                    if on_item:
+                        on_item(idx, item.get("markdownContent") or "", True)
+                    continue
+
+                model = self.model_router.route({**item, "markdownContent": content})
+                key = self._dedup_key(content, model)
+                if key in translated_units:
+                    translated, engine, model = translated_units[key]
+                    if group:
+                        translated = self._fan_out(safe_layouts, group, translated, engine, model, merged_pending)
+                    self._apply_translation(item, translated, engine, model)
+                    if group:
+                        item["mergeGroup"] = list(group)
+                    translated_count += 1
+                    deduplicated_count += 1
+                    if on_item:
+                        on_item(idx, translated, False)
+                    continue
+                if continue_on_error and key in failed_units:
+                    # 相同原文已失败，不重复请求，交给延迟重试统一处理
+                    self._mark_failed(safe_layouts, idx, group, failed_units[key], failed_indices, merged_failed)
+                    continue
+
                 try:
-                    translated = self._translate_text(content)
+                    translated, engine = self._translate_unit(content, model=model)
                 except Exception as e:
                     logger.error(
                         f"Translate item failed: task_id={task_id}, idx={idx}, total={total}, err={e}",
                         exc_info=True,
                     )
+                    if continue_on_error:
+                        failed_units[key] = str(e)
+                        self._mark_failed(safe_layouts, idx, group, str(e), failed_indices, merged_failed)
+                        continue
                     if on_finish:
                         on_finish(
                             task_id,
@@ -165,20 +376,61 @@ class LayoutTranslator:
                         )
                     return safe_layouts
 
-                item["translatedMarkdownContent"] = translated
+                translated_units[key] = (translated, engine, model)
+                if group:
+                    translated = self._fan_out(safe_layouts, group, translated, engine, model, merged_pending)
+                self._apply_translation(item, translated, engine, model)
+                if group:
+                    item["mergeGroup"] = list(group)
                 translated_count += 1
 
                 if on_item:
                     on_item(idx, translated, False)
 
+            if failed_indices:
+                still_failed = self._retry_failed_layouts(
+                    safe_layouts, failed_indices, task_id, stop_event, merge_groups, on_item
+                )
+                translated_count += len(failed_indices) - len(still_failed)
+                failed_indices = still_failed
+                if stop_event and stop_event.is_set():
+                    logger.info(f"Task {task_id} stopped during deferred retries.")
+                    if on_finish:
+                        on_finish(task_id, "stopped", {"translated": translated_count, "total": total})
+                    return safe_layouts
+
+            if failed_indices:
+                logger.warning(
+                    f"Translate layouts finished: task_id={task_id}, status=partial, total={total}, failed={len(failed_indices)}"
+                )
+                self.current_task_id = None
+                if on_finish:
+                    on_finish(
+                        task_id,
+                        "partial",
+                        {
+                            "total": total,
+                            "translated": translated_count,
+                            "skipped": skipped_count,
+                            "deduplicated": deduplicated_count,
+                            "failed_indices": failed_indices,
+                        },
+                    )
+                return safe_layouts
+
             if on_finish:
                 on_finish(
                     task_id,
                     "success",
-                    {"total": total, "translated": translated_count, "skipped": skipped_count},
+                    {
+                        "total": total,
+                        "translated": translated_count,
+                        "skipped": skipped_count,
+                        "deduplicated": deduplicated_count,
+                    },
                 )
             logger.info(
-                f"Translate layouts finished: task_id={task_id}, status=success, total={total}, translated={translated_count}, skipped={skipped_count}"
+                f"Translate layouts finished: task_id={task_id}, status=success, total={total}, translated={translated_count}, skipped={skipped_count}, deduplicated={deduplicated_count}"
             )
             self.current_task_id = None
             return safe_layouts
@@ -192,6 +444,158 @@ class LayoutTranslator:
                 on_finish(task_id, "fail", {"error": str(e), "total": total, "translated": translated_count})
             return safe_layouts
 
+    def translate_layout(self, item: Dict, max_retries: Optional[int] = None) -> str:
+        """
+        交互式翻译单个布局并写入译文字段，返回译文。
+        用户明确要求翻译，因此不做语言识别与片段合并；不可翻译的类型 (图片、公式) 抛出 ValueError。
+        """
+        if self._should_skip_layout(item):
+            raise ValueError("该布局类型无需翻译")
+        content = item.get("markdownContent") or ""
+        if not content.strip():
+            raise ValueError("布局原文为空")
+        model = self.model_router.route(item)
+        translated, engine = self._translate_unit(
+            content, max_retries=max_retries, backoff_seconds=self.retry_backoff_seconds, model=model
+        )
+        self._apply_translation(item, translated, engine, model)
+        return translated
+
+    def translate_text(self, text: str, max_retries: Optional[int] = None) -> Tuple[str, str, str]:
+        """交互式翻译任意文本，返回 (译文, 引擎, 模型)"""
+        if not (text or "").strip():
+            raise ValueError("待翻译文本为空")
+        model = self.model_router.route({"markdownContent": text})
+        translated, engine = self._translate_unit(
+            text, max_retries=max_retries, backoff_seconds=self.retry_backoff_seconds, model=model
+        )
+        return translated, engine, model if engine == "llm" else ""
+
+    def _mark_failed(self, layouts: List[Dict], idx: int, group: Optional[List[int]], error: str,
+                     failed_indices: List[int], merged_failed: set) -> None:
+        """记录失败布局；合并组的片段一并记为失败，延迟重试时整组重新合并翻译"""
+        for member in group or [idx]:
+            layouts[member]["translationError"] = error
+            layouts[member].pop("mergeGroup", None)
+            failed_indices.append(member)
+            if member != idx:
+                merged_failed.add(member)
+
+    def _retry_failed_layouts(
+        self,
+        layouts: List[Dict],
+        failed_indices: List[int],
+        task_id: Optional[str],
+        stop_event: Optional[threading.Event],
+        merge_groups: Optional[Dict[int, List[int]]] = None,
+        on_item: Optional[Callable[[int, str, bool], None]] = None,
+    ) -> List[int]:
+        """延迟重试主循环中失败的布局 (合并组按组首整组重试)，成功的布局同样通过 on_item 上报，返回仍然失败的下标"""
+        logger.info(
+            f"Retrying failed layouts: task_id={task_id}, count={len(failed_indices)}, backoff={self.deferred_backoff_seconds}s"
+        )
+        merge_groups = merge_groups or {}
+        failed = set(failed_indices)
+        # 组首也失败的片段随组首处理
+        members = {
+            member for head, group in merge_groups.items() if head in failed for member in group[1:]
+        }
+        still_failed: List[int] = []
+        results: Dict[Tuple[str, str], Union[Tuple[str, str], Exception]] = {}
+        for idx in failed_indices:
+            if idx in members:
+                continue
+            group = merge_groups.get(idx)
+            indices = group or [idx]
+            if stop_event and stop_event.is_set():
+                still_failed.extend(indices)
+                continue
+            item = layouts[idx]
+            content = item.get("markdownContent") or ""
+            if group:
+                content = join_fragments([layouts[i].get("markdownContent") or "" for i in group])
+            model = self.model_router.route({**item, "markdownContent": content})
+            key = self._dedup_key(content, model)
+            if key not in results:
+                try:
+                    results[key] = self._translate_unit(
+                        content,
+                        max_retries=self.deferred_max_retries,
+                        backoff_seconds=self.deferred_backoff_seconds,
+                        stop_event=stop_event,
+                        model=model,
+                    )
+                except Exception as e:
+                    logger.error(f"Deferred translate failed: task_id={task_id}, idx={idx}, err={e}")
+                    results[key] = e
+            result = results[key]
+            if isinstance(result, Exception):
+                for i in indices:
+                    layouts[i]["translationError"] = str(result)
+                still_failed.extend(indices)
+                continue
+            translated, engine = result
+            if group:
+                translated = self._fan_out(layouts, group, translated, engine, model, set())
+            self._apply_translation(item, translated, engine, model)
+            if group:
+                item["mergeGroup"] = list(group)
+            if on_item:
+                for i in indices:
+                    on_item(i, layouts[i]["translatedMarkdownContent"], False)
+        return sorted(still_failed)
+
+    def _fan_out(self, layouts: List[Dict], group: List[int], translated: str, engine: str,
+                 model: str, merged_pending: set) -> str:
+        """把合并翻译的译文按原文长度切回各片段，返回组首的译文；其余片段立即写入并登记待上报"""
+        parts = split_translation(
+            translated, [len((layouts[i].get("markdownContent") or "").strip()) for i in group]
+        )
+        for member, part in zip(group[1:], parts[1:]):
+            self._apply_translation(layouts[member], part, engine, model)
+            layouts[member]["mergeGroup"] = list(group)
+            merged_pending.add(member)
+        return parts[0]
+
+    def _current_translations(self, layouts: List[Dict]) -> set:
+        """已有译文且原文未修改的布局下标；合并组中任一片段过期时整组重新翻译"""
+        current = {
+            idx for idx, item in enumerate(layouts)
+            if item.get("translatedMarkdownContent") and "translationError" not in item and not is_stale(item)
+        }
+        for idx, item in enumerate(layouts):
+            group = item.get("mergeGroup")
+            if idx in current and group and any(
+                not (0 <= member < len(layouts)) or member not in current for member in group
+            ):
+                current.discard(idx)
+        stale = sum(1 for item in layouts if is_stale(item))
+        if stale:
+            logger.info(f"Stale translations to refresh: stale={stale}, keep={len(current)}")
+        return current
+
+    def _apply_translation(self, item: Dict, translated: str, engine: str, model: str) -> None:
+        item["translatedMarkdownContent"] = translated
+        item["sourceHash"] = source_hash(item.get("markdownContent") or "")
+        item["translationEngine"] = engine
+        self._set_translation_model(item, engine, model)
+        item.pop("translationError", None)
+        item.pop("mergeGroup", None)
+
+    def _normalize_source(self, text: str) -> str:
+        """去掉行首尾空白并合并行内连续空白，保留换行 (表格/列表结构依赖换行)"""
+        lines = [INLINE_WHITESPACE_PATTERN.sub(" ", line).strip() for line in (text or "").splitlines()]
+        return "\n".join(line for line in lines if line)
+
+    def _dedup_key(self, text: str, model: str) -> Tuple[str, str]:
+        return self._normalize_source(text), model
+
+    def _set_translation_model(self, item: Dict, engine: str, model: str) -> None:
+        if engine == "llm":
+            item["translationModel"] = model
+        else:
+            item.pop("translationModel", None)
+
     def _should_skip_layout(self, item: Dict) -> bool:
         layout_type = (item.get("type") or "").strip().lower()
         if layout_type in {"figure", "formula", "equation", "math", "latex"}:
@@ -205,6 +609,27 @@ class LayoutTranslator:
             return True
         return False
 
+    def _classify_layout(self, item: Dict, content: Optional[str] = None) -> bool:
+        """记录布局的语言分类 (layoutClass / sourceLanguage)，返回是否需要翻译"""
+        if not self.detect_language:
+            return True
+        if content is None:
+            content = item.get("markdownContent") or ""
+        label, detected = classify_layout(
+            content, self.target_lang, skip_references=self.skip_references, source_lang=self.source_lang
+        )
+        item["layoutClass"] = label
+        item["sourceLanguage"] = detected
+        return label == TRANSLATABLE
+
+    def _in_pages(self, item: Dict, pages: Optional[Collection[int]]) -> bool:
+        if pages is None:
+            return True
+        page_num = item.get("pageNum")
+        if isinstance(page_num, list):
+            return any(p in pages for p in page_num)
+        return page_num in pages
+
     def _is_image_only(self, content: str) -> bool:
         stripped = IMAGE_MARKDOWN_PATTERN.sub("", content)
         stripped = IMAGE_HTML_PATTERN.sub("", stripped)
@@ -214,63 +639,191 @@ class LayoutTranslator:
         stripped = FORMULA_BLOCK_PATTERN.sub("", content)
         return stripped.strip() == ""
 
-    def _translate_text(self, text: str) -> str:
-        # Aliyun Machine Translation
-        if self.translation_engine == "aliyun":
-            if not self.aliyun_mt_client:
-                raise ValueError("Aliyun MT client not initialized")
-
-            src_map = {"Chinese": "zh", "English": "en"}
-            tgt_map = {"Chinese": "zh", "English": "en"}
-
-            # Default to auto/zh if not mapped
-            s_code = src_map.get(self.source_lang, "auto")
-            t_code = tgt_map.get(self.target_lang, "zh")
+    def _translate_unit(self, text: str, max_retries: Optional[int] = None,
+                        backoff_seconds: Optional[float] = None,
+                        stop_event: Optional[threading.Event] = None,
+                        model: Optional[str] = None) -> Tuple[str, str]:
+        """
+        翻译一个去重后的文本单元；进程内相同请求 (含相同的重试设置) 正在进行时等待并共享其结果。
+        本调用因自己的 stop_event 中止时，等待者不共享该失败，而是各自重新翻译。
+        """
+        max_retries = self.max_retries if max_retries is None else int(max_retries)
+        backoff_seconds = self.retry_backoff_seconds if backoff_seconds is None else float(backoff_seconds)
+        flight_key = (
+            self.translation_engine,
+            self.fallback_engine,
+            model or self.model,
+            self.source_lang,
+            self.target_lang,
+            max_retries,
+            backoff_seconds,
+            self._normalize_source(text),
+        )
+
+        def run() -> Tuple[str, str]:
+            try:
+                return self._translate_with_engine(text, max_retries, backoff_seconds, stop_event, model)
+            except Exception as e:
+                if stop_event is not None and stop_event.is_set():
+                    raise FlightAborted(e) from e
+                raise
+
+        return translation_flight.do(flight_key, run)
+
+    def _translate_with_engine(self, text: str, max_retries: Optional[int] = None,
+                               backoff_seconds: Optional[float] = None,
+                               stop_event: Optional[threading.Event] = None,
+                               model: Optional[str] = None) -> Tuple[str, str]:
+        """
+        依次尝试主引擎与备用引擎，返回 (译文, 实际使用的引擎)。
+
+        熔断器打开的引擎直接跳过；单个引擎内失败时按线性退避重试。
+        model 只对 LLM 引擎生效，为空时使用默认模型。
+        """
+        engines = [self.translation_engine] + ([self.fallback_engine] if self.fallback_engine else [])
+        last_error: Optional[Exception] = None
+        for engine in engines:
+            try:
+                return self._translate_with_retries(engine, text, max_retries, backoff_seconds, stop_event, model), engine
+            except Exception as e:
+                last_error = e
+                if engine != engines[-1]:
+                    logger.warning(f"Engine {engine} unavailable, failing over: err={e}")
+            if stop_event is not None and stop_event.is_set():
+                break
+        raise RuntimeError(f"翻译失败: {last_error}") from last_error
 
-            # Special case: if source is auto, Aliyun MT accepts "auto"
+    def _translate_with_retries(self, engine: str, text: str, max_retries: Optional[int] = None,
+                                backoff_seconds: Optional[float] = None,
+                                stop_event: Optional[threading.Event] = None,
+                                model: Optional[str] = None) -> str:
+        pool = self.key_pools[engine]
+        max_retries = self.max_retries if max_retries is None else int(max_retries)
+        backoff_seconds = self.retry_backoff_seconds if backoff_seconds is None else float(backoff_seconds)
 
+        last_error: Optional[Exception] = None
+        for attempt in range(1, max_retries + 1):
+            key = self._acquire_key(engine, pool, stop_event)
+            if key is None:
+                # 所有凭据被限流/停用或端点熔断时不再重试等待，直接交给备用引擎
+                raise CircuitOpenError(f"{engine} 没有可用的凭据或端点 (熔断/限流中)") from last_error
+            breaker = circuit_breakers.get(self._breaker_name(engine, key))
+            if attempt > 1:
+                translation_retries.inc(engine=engine)
+            start = time.time()
             try:
-                # Reuse retry logic inside client or wrap here?
-                # The client implementation I wrote uses requests with timeout but no retries.
-                # I'll implement simple retry here to be robust.
-                last_err = None
-                for i in range(self.max_retries):
-                    try:
-                        # Log request before calling
-                        log_task_network(
-                            task_id=self.current_task_id,
-                            action="aliyun_mt_translate",
-                            service="aliyun_mt",
-                            request={"text": text, "source": s_code, "target": t_code}
-                        )
-                        result = self.aliyun_mt_client.translate_general(text, s_code, t_code)
-                        # Log success
-                        log_task_network(
-                            task_id=self.current_task_id,
-                            action="aliyun_mt_translate",
-                            service="aliyun_mt",
-                            response={"translated": result}
-                        )
-                        return result
-                    except Exception as e:
-                        last_err = e
-                        # Log error
-                        log_task_network(
-                            task_id=self.current_task_id,
-                            action="aliyun_mt_translate",
-                            service="aliyun_mt",
-                            error=str(e)
-                        )
-                        logger.warning(f"Aliyun MT attempt {i+1} failed: {e}")
-                        time.sleep(self.retry_backoff_seconds * (i+1))
-                raise last_err
+                if engine == "llm":
+                    result = self._translate_once_llm(text, attempt, max_retries, key.credential, model)
+                else:
+                    result = self._translate_once_aliyun(text, attempt, max_retries, key.credential)
             except Exception as e:
-                raise RuntimeError(f"Aliyun MT failed: {e}")
+                kind = classify_error(e)
+                translation_requests.inc(engine=engine, outcome="rejected" if kind == "invalid" else kind)
+                pool.release(key, e)
+                last_error = e
+                logger.warning(
+                    f"Translate attempt failed: engine={engine}, key={key.label}, attempt={attempt}/{max_retries}, kind={kind}, err={e}"
+                )
+                if kind == "error":
+                    breaker.record_failure()
+                else:
+                    # 单个凭据被限流或拒绝不代表端点故障，换一组凭据立即重试
+                    breaker.record_ignored()
+                    continue
+                if attempt >= max_retries:
+                    break
+                sleep_seconds = backoff_seconds * attempt
+                if stop_event is not None:
+                    if stop_event.wait(sleep_seconds):
+                        break
+                else:
+                    time.sleep(sleep_seconds)
+                continue
+            elapsed = time.time() - start
+            translation_request_seconds.observe(elapsed, engine=engine)
+            translation_requests.inc(engine=engine, outcome="ok")
+            pool.release(key)
+            breaker.record_success(elapsed)
+            return result
+
+        raise RuntimeError(f"{engine}: {last_error}") from last_error
+
+    def _acquire_key(self, engine: str, pool: KeyPool,
+                     stop_event: Optional[threading.Event] = None) -> Optional[KeyState]:
+        """选择一组凭据；全部被限流时等待最早恢复的一组 (不超过请求超时)"""
+        can_use = lambda key: circuit_breakers.get(self._breaker_name(engine, key)).allow()
+        key = pool.acquire(can_use)
+        if key is not None:
+            return key
+        wait_seconds = pool.throttle_remaining()
+        if wait_seconds is None or wait_seconds > self.request_timeout_seconds:
+            return None
+        logger.info(f"All {engine} keys throttled, waiting {wait_seconds:.1f}s")
+        if stop_event is not None:
+            if stop_event.wait(wait_seconds):
+                return None
+        else:
+            time.sleep(wait_seconds)
+        return pool.acquire(can_use)
+
+    def _breaker_name(self, engine: str, key: Optional[KeyState] = None) -> str:
+        if engine == "aliyun":
+            return "aliyun_mt"
+        endpoint = (key.credential.get("endpoint") if key else None) or self.base_url
+        return f"llm:{endpoint}"
 
+    def _translate_once_aliyun(self, text: str, attempt: int, max_retries: int,
+                               credential: Optional[Dict[str, Any]] = None) -> str:
+        # Aliyun Machine Translation
+        client = self.aliyun_mt_client
+        if credential:
+            client = aliyun_client_pool.get_mt_client(credential["access_key_id"], credential["access_key_secret"])
+        if not client:
+            raise ValueError("Aliyun MT client not initialized")
+
+        # Default to auto/zh if not mapped
+        s_code = ALIYUN_LANG_CODES.get(self.source_lang, "auto")
+        t_code = ALIYUN_LANG_CODES.get(self.target_lang, "zh")
+
+        # Special case: if source is auto, Aliyun MT accepts "auto"
+        request = {"text": text, "source": s_code, "target": t_code}
+        started = time.time()
+        try:
+            result = client.translate_general(text, s_code, t_code)
+            # 每次调用只记录一条日志 (请求与结果合并)
+            log_task_network(
+                task_id=self.current_task_id,
+                action="aliyun_mt_translate",
+                service="aliyun_mt",
+                request=request,
+                response={"translated": result},
+                elapsedMs=int((time.time() - started) * 1000),
+            )
+            return result
+        except Exception as e:
+            log_task_network(
+                task_id=self.current_task_id,
+                action="aliyun_mt_translate",
+                service="aliyun_mt",
+                request=request,
+                error=str(e),
+                elapsedMs=int((time.time() - started) * 1000),
+            )
+            error = RuntimeError(f"Aliyun MT failed: {e}")
+            # 保留 SDK 错误码，供凭据池区分限流与鉴权失败
+            error.code = getattr(e, "code", None)
+            error.statusCode = getattr(e, "statusCode", None)
+            raise error from e
+
+    def _translate_once_llm(self, text: str, attempt: int, max_retries: int,
+                            credential: Optional[Dict[str, Any]] = None, model: Optional[str] = None) -> str:
         # LLM Translation
-        url = f"{self.base_url}/chat/completions"
+        model = model or self.model
+        api_key = credential["secret"] if credential else self.api_key
+        base_url = (credential.get("endpoint") if credential else None) or self.base_url
+        url = f"{base_url}/chat/completions"
         payload = {
-            "model": self.model,
+            "model": model,
             "messages": [{"role": "user", "content": text}],
             "extra_body": {
                 "translation_options": {
@@ -283,46 +836,42 @@ class LayoutTranslator:
 
         headers = {
             "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.api_key}",
+            "Authorization": f"Bearer {api_key}",
         }
 
-        last_error: Optional[Exception] = None
-        for attempt in range(1, self.max_retries + 1):
-            try:
-                start = time.time()
-                safe_text_len = len(text or "")
-                logger.debug(
-                    f"Translate request: model={self.model}, attempt={attempt}/{self.max_retries}, url={url}, text_len={safe_text_len}"
-                )
-                response = self._post_json(url, payload, headers=headers)
-                content = (
-                    response.get("choices", [{}])[0]
-                    .get("message", {})
-                    .get("content", "")
-                )
-                if not isinstance(content, str) or content == "":
-                    raise ValueError("模型返回为空")
-                elapsed_ms = int((time.time() - start) * 1000)
-                logger.debug(f"Translate success: model={self.model}, elapsed_ms={elapsed_ms}, text_len={safe_text_len}")
-                return content
-            except Exception as e:
-                last_error = e
-                logger.warning(
-                    f"Translate attempt failed: model={self.model}, attempt={attempt}/{self.max_retries}, err={e}"
-                )
-                self._log_http_debug(
-                    action="translate_fail",
-                    request={"url": url, "payload": payload, "headers": headers, "attempt": attempt},
-                    error=e,
-                )
-                if attempt >= self.max_retries:
-                    break
-                sleep_seconds = self.retry_backoff_seconds * attempt
-                time.sleep(sleep_seconds)
-
-        raise RuntimeError(f"翻译失败: {last_error}") from last_error
+        start = time.time()
+        try:
+            safe_text_len = len(text or "")
+            logger.debug(
+                f"Translate request: model={model}, attempt={attempt}/{max_retries}, url={url}, text_len={safe_text_len}"
+            )
+            response = self._post_json(url, payload, headers=headers)
+            content = (
+                response.get("choices", [{}])[0]
+                .get("message", {})
+                .get("content", "")
+            )
+            if not isinstance(content, str) or content == "":
+                raise ValueError("模型返回为空")
+            elapsed = time.time() - start
+            usage = response.get("usage") or {}
+            model_stats.record(model, elapsed, tokens=usage.get("total_tokens") or 0)
+            logger.debug(f"Translate success: model={model}, elapsed_ms={int(elapsed * 1000)}, text_len={safe_text_len}")
+            return content
+        except Exception as e:
+            model_stats.record(model, time.time() - start, failed=True)
+            self._log_http_debug(
+                action="translate_fail",
+                request={"url": url, "payload": payload, "headers": headers, "attempt": attempt},
+                error=e,
+            )
+            raise
 
     def _post_json(self, url: str, payload: Dict, headers: Dict) -> Dict:
+        # 翻译请求是幂等的，可在慢请求时发出对冲请求
+        return request_hedger.call(url, lambda: self._send_json(url, payload, headers))
+
+    def _send_json(self, url: str, payload: Dict, headers: Dict) -> Dict:
         data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
         req = Request(url=url, data=data, headers=headers, method="POST")
         try:
@@ -348,7 +897,12 @@ class LayoutTranslator:
                 status=getattr(e, "code", None),
                 error=e,
             )
-            raise RuntimeError(f"HTTP {e.code}: {raw}") from e
+            retry_after = None
+            try:
+                retry_after = float(e.headers.get("Retry-After")) if e.headers else None
+            except (TypeError, ValueError):
+                pass
+            raise TranslationHTTPError(f"HTTP {e.code}: {raw}", e.code, retry_after) from e
         except URLError as e:
             self._log_http_debug(
                 action="http_post_json_url_error",
@@ -385,38 +939,17 @@ class LayoutTranslator:
         except Exception as e:
             logger.error(f"Error logging task network: {e}")
 
-        # Keep existing debug log
-        debug_path = self.debug_output_path
-        if not self.debug:
-            return
-        try:
-            os.makedirs(os.path.dirname(debug_path) or ".", exist_ok=True)
-            safe_request = request or {}
-            safe_headers = dict(safe_request.get("headers") or {})
-            if "Authorization" in safe_headers:
-                safe_headers["Authorization"] = "Bearer ***"
-            if "authorization" in safe_headers:
-                safe_headers["authorization"] = "Bearer ***"
-            if request is not None:
-                safe_request = {**safe_request, "headers": safe_headers}
-
-            timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
-            lines: List[str] = []
-            lines.append(f"{timestamp} - layout_translator - DEBUG_HTTP - action={action} status={status}")
-            if request is not None:
-                lines.append("REQUEST:")
-                lines.extend(["  " + line for line in pformat(safe_request, width=160).splitlines()])
-            if response is not None:
-                lines.append("RESPONSE:")
-                lines.extend(["  " + line for line in pformat(response, width=160).splitlines()])
-            if error is not None:
-                lines.append(f"ERROR: {type(error).__name__}: {error}")
-            lines.append("-" * 120)
-
-            with open(debug_path, "a", encoding="utf-8") as f:
-                f.write("\n".join(lines) + "\n")
-        except Exception as e:
-            logger.error(f"Error logging debug: {e}")
+        # 调试日志按采集策略写入，未写入的交互保留在内存中，任务失败时补写
+        if self.debug:
+            debug_capture.record(
+                self.debug_output_path,
+                "layout_translator",
+                action,
+                request=request,
+                response=response,
+                status=status,
+                error=error,
+            )
 
     def _load_yaml_layouts(self, yaml_path: str) -> Tuple[Union[Dict, List], List[Dict]]:
         with open(yaml_path, "r", encoding="utf-8") as f:
@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+import os
+import threading
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from statistics import median
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import pymupdf
+except ImportError:  # 未安装时只能使用 DocMind
+    pymupdf = None
+
+logger = logging.getLogger(__name__)
+
+# 平均每页字符数低于该值视为扫描件 (无文本层)
+TEXT_LAYER_MIN_CHARS_PER_PAGE = 50
+# 字号超过正文字号该倍数且较短的文本块视为标题
+HEADING_FONT_RATIO = 1.2
+HEADING_MAX_CHARS = 200
+
+
+def is_available() -> bool:
+    return pymupdf is not None
+
+
+def has_text_layer(file_path: str, sample_pages: int = 5) -> bool:
+    """抽样检查 PDF 是否为带文本层的电子文档"""
+    if pymupdf is None:
+        return False
+    with pymupdf.open(file_path) as doc:
+        if doc.page_count == 0:
+            return False
+        step = max(1, doc.page_count // sample_pages)
+        sampled = list(range(0, doc.page_count, step))[:sample_pages]
+        chars = sum(len(doc[i].get_text("text").strip()) for i in sampled)
+        return chars / len(sampled) >= TEXT_LAYER_MIN_CHARS_PER_PAGE
+
+
+def _block_text(block: Dict) -> Tuple[str, float]:
+    """返回文本块内容与最大字号"""
+    lines: List[str] = []
+    max_size = 0.0
+    for line in block.get("lines", []):
+        text = "".join(span.get("text", "") for span in line.get("spans", []))
+        for span in line.get("spans", []):
+            max_size = max(max_size, float(span.get("size") or 0))
+        if text.strip():
+            lines.append(text.strip())
+    return " ".join(lines), max_size
+
+
+def _table_markdown(rows: List[List[Optional[str]]]) -> str:
+    if not rows:
+        return ""
+    cells = [[(cell or "").replace("\n", " ").replace("|", "\\|").strip() for cell in row] for row in rows]
+    width = max(len(row) for row in cells)
+    cells = [row + [""] * (width - len(row)) for row in cells]
+    lines = ["| " + " | ".join(cells[0]) + " |", "|" + "---|" * width]
+    lines.extend("| " + " | ".join(row) + " |" for row in cells[1:])
+    return "\n".join(lines)
+
+
+def _inside(bbox, area) -> bool:
+    x0, y0, x1, y1 = bbox
+    cx, cy = (x0 + x1) / 2, (y0 + y1) / 2
+    return area[0] <= cx <= area[2] and area[1] <= cy <= area[3]
+
+
+def extract_page_layouts(file_path: str, page_indices: List[int], figures_dir: str, task_id: str) -> List[Tuple[int, List[dict]]]:
+    """
+    在子进程中提取若干页的布局，输出与 DocMind 相同的布局字段
+
+    Returns:
+        List[Tuple[int, List[dict]]]: (页码, 该页按阅读顺序排列的布局)
+    """
+    results: List[Tuple[int, List[dict]]] = []
+    with pymupdf.open(file_path) as doc:
+        for page_index in page_indices:
+            page = doc[page_index]
+            items: List[Tuple[float, float, dict]] = []
+
+            # 表格
+            table_areas = []
+            try:
+                tables = page.find_tables().tables
+            except Exception as e:
+                logger.debug(f"find_tables failed on page {page_index}: {e}")
+                tables = []
+            for table in tables:
+                markdown = _table_markdown(table.extract())
+                if not markdown:
+                    continue
+                table_areas.append(tuple(table.bbox))
+                items.append((table.bbox[1], table.bbox[0], {
+                    "type": "table",
+                    "subType": "table",
+                    "markdownContent": markdown,
+                    "pageNum": page_index,
+                }))
+
+            blocks = page.get_text("dict").get("blocks", [])
+            text_blocks = []
+            for block in blocks:
+                if any(_inside(block["bbox"], area) for area in table_areas):
+                    continue
+                if block.get("type") == 0:
+                    text, size = _block_text(block)
+                    if text:
+                        text_blocks.append((block, text, size))
+                elif block.get("type") == 1 and block.get("image"):
+                    os.makedirs(figures_dir, exist_ok=True)
+                    filename = f"p{page_index + 1}_img{len(items)}.{block.get('ext') or 'png'}"
+                    with open(os.path.join(figures_dir, filename), "wb") as f:
+                        f.write(block["image"])
+                    items.append((block["bbox"][1], block["bbox"][0], {
+                        "type": "figure",
+                        "subType": "picture",
+                        "markdownContent": f"![{filename}](/api/task/{task_id}/figures/{filename})",
+                        "pageNum": page_index,
+                    }))
+
+            # 以该页文本块字号的中位数作为正文字号
+            body_size = median([size for _, _, size in text_blocks]) if text_blocks else 0
+            for block, text, size in text_blocks:
+                is_heading = (
+                    body_size > 0
+                    and size >= body_size * HEADING_FONT_RATIO
+                    and len(text) <= HEADING_MAX_CHARS
+                )
+                items.append((block["bbox"][1], block["bbox"][0], {
+                    "type": "title" if is_heading else "text",
+                    "subType": "para_title" if is_heading else "para",
+                    "markdownContent": f"## {text}" if is_heading else text,
+                    "pageNum": page_index,
+                }))
+
+            items.sort(key=lambda item: (round(item[0], 1), item[1]))
+            results.append((page_index, [layout for _, _, layout in items]))
+    return results
+
+
+class LocalPDFParser:
+    """
+    基于 PyMuPDF 的本地解析后端，无需网络，适用于带文本层的电子 PDF。
+
+    对外接口与 PDFParser 保持一致，页面在进程池中并行提取。
+    """
+
+    def __init__(self,
+                 task_id: str,
+                 file_path: str,
+                 output_path: str,
+                 figures_dir: str,
+                 page_indices: Optional[List[int]] = None,
+                 max_workers: Optional[int] = None,
+                 pages_per_job: int = 8,
+                 on_update: Optional[Callable] = None,
+                 on_data: Optional[Callable] = None,
+                 on_finish: Optional[Callable] = None):
+        """
+        Args:
+            task_id (str): 本地任务 ID
+            file_path (str): PDF 文件路径
+            output_path (str): 输出结果路径
+            figures_dir (str): 图片保存目录
+            page_indices (List[int], optional): 只解析这些页 (从 0 开始)，默认全部页
+            max_workers (int, optional): 进程池大小，默认 CPU 核数
+            pages_per_job (int): 每个子进程任务处理的页数
+            on_update (callable, optional): 状态更新回调, signature: (task_id, old_status, new_status, processing)
+            on_data (callable, optional): 数据更新回调, signature: (task_id, new_layouts)
+            on_finish (callable, optional): 任务结束回调, signature: (task_id, status, result_info)
+        """
+        self.task_id = task_id
+        self.file_path = file_path
+        self.output_path = output_path
+        self.figures_dir = figures_dir
+        self.page_indices = page_indices
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.pages_per_job = max(1, pages_per_job)
+
+        self._on_update_callback = on_update
+        self._on_data_callback = on_data
+        self._on_finish_callback = on_finish
+
+        self.task_status = "idle"  # idle, init, processing, success, fail
+        self.total_layout_num = 0
+        self.processed_layout_num = 0
+        self.all_layouts: List[dict] = []
+
+        self._stop_event = threading.Event()
+
+    def run(self, interval=5, stop_event: Optional[threading.Event] = None):
+        """同步运行本地解析（阻塞直到完成或停止），interval 仅为兼容 PDFParser 接口"""
+        self._stop_event.clear()
+        try:
+            if pymupdf is None:
+                raise RuntimeError("未安装 PyMuPDF，无法使用本地解析")
+            self._run_task_sync(stop_event)
+        except Exception as e:
+            logger.error(f"本地解析失败: task_id={self.task_id}, err={e}", exc_info=True)
+            self._set_status("fail", 0.0)
+            if self._on_finish_callback:
+                self._on_finish_callback(self.task_id, "fail", {"error": str(e)})
+
+    def stop(self):
+        """发送停止信号"""
+        self._stop_event.set()
+        logger.info("本地解析任务已收到停止信号")
+
+    def _run_task_sync(self, external_stop_event=None):
+        pages = self.page_indices
+        if pages is None:
+            with pymupdf.open(self.file_path) as doc:
+                pages = list(range(doc.page_count))
+        batches = [pages[i:i + self.pages_per_job] for i in range(0, len(pages), self.pages_per_job)]
+        logger.info(
+            f"开始本地解析: task_id={self.task_id}, pages={len(pages)}, jobs={len(batches)}, workers={self.max_workers}"
+        )
+        self._set_status("init", 0.0)
+
+        page_layouts: Dict[int, List[dict]] = {}
+        next_pos = 0
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [
+                executor.submit(extract_page_layouts, self.file_path, batch, self.figures_dir, self.task_id)
+                for batch in batches
+            ]
+            for future in as_completed(futures):
+                if self._stop_event.is_set() or (external_stop_event and external_stop_event.is_set()):
+                    logger.info(f"本地解析任务 {self.task_id} 已停止")
+                    for f in futures:
+                        f.cancel()
+                    self.stop()
+                    return
+
+                for page_index, layouts in future.result():
+                    page_layouts[page_index] = layouts
+
+                # 按页码顺序输出已连续完成的页
+                new_layouts: List[dict] = []
+                while next_pos < len(pages) and pages[next_pos] in page_layouts:
+                    new_layouts.extend(page_layouts.pop(pages[next_pos]))
+                    next_pos += 1
+                for layout in new_layouts:
+                    layout["index"] = len(self.all_layouts)
+                    self.all_layouts.append(layout)
+                self.processed_layout_num = self.total_layout_num = len(self.all_layouts)
+
+                self._set_status("processing", round(next_pos * 100.0 / max(1, len(pages)), 2))
+                if new_layouts and self._on_data_callback:
+                    self._on_data_callback(self.task_id, new_layouts)
+
+        self._set_status("success", 100.0)
+        logger.info(f"本地解析任务 {self.task_id} 完成，共获取 {self.processed_layout_num} 个布局")
+        if self._on_finish_callback:
+            self._on_finish_callback(self.task_id, "success", {
+                "status": "success",
+                "output_path": self.output_path,
+                "total_layouts": self.processed_layout_num,
+            })
+
+    def _set_status(self, status: str, processing: float):
+        old_status = self.task_status
+        self.task_status = status
+        if self._on_update_callback:
+            self._on_update_callback(self.task_id, old_status, status, processing)
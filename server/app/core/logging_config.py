@@ -5,14 +5,14 @@ from logging.handlers import RotatingFileHandler
 from pathlib import Path
 from .config import LOG_DIR, LOG_CONFIG
 
-def setup_logging():
+def setup_logging(log_name: str = "server.log"):
     """配置日志系统，使用轮转日志文件"""
     
     # 确保日志目录存在
     LOG_DIR.mkdir(exist_ok=True)
     
-    # 日志文件名固定为 server.log
-    log_file = LOG_DIR / "server.log"
+    # API 进程使用 server.log，独立 worker 进程使用各自的日志文件，避免多进程轮转冲突
+    log_file = LOG_DIR / log_name
     
     # 定义日志格式
     log_format = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
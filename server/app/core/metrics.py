@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+import math
+import time
+import threading
+import logging
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+METRIC_PREFIX = "pdf_translator_"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 外部 API 调用耗时的默认分桶 (秒)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# 排队等待时间的分桶 (秒)
+WAIT_BUCKETS = (0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{_escape(extra[1])}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = METRIC_PREFIX + name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {sorted(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """只增不减的计数器"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(values.items())
+        ]
+
+
+class Histogram(_Metric):
+    """累计分桶直方图，附带 _sum 与 _count"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(float(b) for b in buckets)) + (math.inf,)
+        # 每组标签: [各桶计数 (非累计)..., 总和]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = next(i for i, bound in enumerate(self.buckets) if value <= bound)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = [0.0] * (len(self.buckets) + 1)
+                self._values[key] = series
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """记录代码块的耗时 (抛出异常时同样记录)"""
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(time.monotonic() - start, **labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = {key: list(series) for key, series in self._values.items()}
+        lines: List[str] = []
+        for key, series in sorted(values.items()):
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {_format_value(cumulative)}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{labels} {_format_value(cumulative)}")
+        return lines
+
+
+class GaugeCallback(_Metric):
+    """抓取时才计算的仪表 (如从数据库统计的队列深度)，callback 返回 {标签值元组: 数值}"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str],
+                 callback: Callable[[], Dict[LabelValues, float]]):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def _samples(self) -> List[str]:
+        values = self.callback()
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(values.items())
+        ]
+
+
+class MetricsRegistry:
+    """进程内指标注册表，按 Prometheus 文本格式输出"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge_callback(self, name: str, documentation: str, labelnames: Sequence[str],
+                       callback: Callable[[], Dict[LabelValues, float]]) -> GaugeCallback:
+        return self.register(GaugeCallback(name, documentation, labelnames, callback))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                # 单个指标 (如数据库不可用时的队列深度) 失败不影响其余指标
+                logger.warning(f"Failed to collect metric {metric.name}: {e}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+# DocMind 解析
+docmind_request_seconds = metrics.histogram(
+    "docmind_request_seconds", "DocMind API call latency in seconds", ["call"])
+docmind_request_errors = metrics.counter(
+    "docmind_request_errors_total", "DocMind API calls that raised an error", ["call"])
+parse_layouts = metrics.counter(
+    "parse_layouts_total", "Layouts received from the parser", ["engine"])
+figure_downloads = metrics.counter(
+    "figure_downloads_total", "Figure downloads by outcome", ["outcome"])
+figure_download_bytes = metrics.counter(
+    "figure_download_bytes_total", "Bytes of figures downloaded")
+figure_download_seconds = metrics.histogram(
+    "figure_download_seconds", "Figure download time in seconds")
+
+# 翻译
+translation_request_seconds = metrics.histogram(
+    "translation_request_seconds", "Translation engine call latency in seconds", ["engine"])
+translation_requests = metrics.counter(
+    "translation_requests_total", "Translation engine calls by outcome (ok / error / throttled / rejected)",
+    ["engine", "outcome"])
+translation_retries = metrics.counter(
+    "translation_retries_total", "Translation attempts after the first one", ["engine"])
+
+# 队列与持久化
+job_wait_seconds = metrics.histogram(
+    "job_wait_seconds", "Time jobs spent queued before being claimed", ["stage"], buckets=WAIT_BUCKETS)
+yaml_write_seconds = metrics.histogram(
+    "yaml_write_seconds", "Time spent writing result YAML files", ["writer"])
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+import re
+import threading
+import logging
+from typing import Any, Dict, List, Optional
+
+from .config import PIPELINE_CONFIG
+from .hedging import LatencyTracker
+
+logger = logging.getLogger(__name__)
+
+TABLE_PATTERN = re.compile(r"<table\b|^\s*\|.*\|\s*$", re.IGNORECASE | re.MULTILINE)
+INLINE_FORMULA_PATTERN = re.compile(r"\$[^$\n]+\$|\\\([\s\S]*?\\\)")
+SENTENCE_SPLIT_PATTERN = re.compile(r"[.!?。！？;；]+\s*")
+CJK_PATTERN = re.compile(r"[一-鿿]")
+
+
+def layout_complexity(text: str) -> float:
+    """
+    粗略估计一段文本的翻译难度 (0~1)：
+    表格结构、行内公式占比以及长句都会提高难度，短标签接近 0。
+    """
+    text = text or ""
+    if not text.strip():
+        return 0.0
+    score = 0.0
+    if TABLE_PATTERN.search(text):
+        score += 0.4
+    formula_chars = sum(len(m) for m in INLINE_FORMULA_PATTERN.findall(text))
+    score += min(0.3, formula_chars / max(1, len(text)))
+
+    sentences = [s for s in SENTENCE_SPLIT_PATTERN.split(text) if s.strip()]
+    if sentences:
+        # 中文按字数、其他语言按词数计算句长
+        lengths = [
+            len(CJK_PATTERN.findall(s)) / 2 if CJK_PATTERN.search(s) else len(s.split())
+            for s in sentences
+        ]
+        avg_length = sum(lengths) / len(lengths)
+        score += min(0.3, max(0.0, (avg_length - 12) / 60))
+    return round(min(1.0, score), 3)
+
+
+class ModelRouter:
+    """
+    按布局类型、长度与难度选择 LLM 模型。
+
+    rules 按顺序匹配，第一条满足全部条件的规则生效；都不匹配时使用 default_model。
+    每条规则: {model, types, minChars, maxChars, minComplexity, maxComplexity}，除 model 外均可省略。
+    """
+
+    def __init__(self, default_model: str, rules: Optional[List[Dict[str, Any]]] = None):
+        self.default_model = default_model
+        self.rules = [rule for rule in (rules or []) if rule.get("model")]
+
+    def route(self, item: Dict[str, Any]) -> str:
+        if not self.rules:
+            return self.default_model
+        text = item.get("markdownContent") or ""
+        layout_type = (item.get("type") or "").strip().lower()
+        length = len(text.strip())
+        complexity = None
+        for rule in self.rules:
+            types = [t.strip().lower() for t in rule.get("types") or [] if t]
+            if types and layout_type not in types:
+                continue
+            if rule.get("minChars") is not None and length < int(rule["minChars"]):
+                continue
+            if rule.get("maxChars") is not None and length > int(rule["maxChars"]):
+                continue
+            if rule.get("minComplexity") is not None or rule.get("maxComplexity") is not None:
+                if complexity is None:
+                    complexity = layout_complexity(text)
+                if rule.get("minComplexity") is not None and complexity < float(rule["minComplexity"]):
+                    continue
+                if rule.get("maxComplexity") is not None and complexity > float(rule["maxComplexity"]):
+                    continue
+            return rule["model"]
+        return self.default_model
+
+
+class _ModelStats:
+    def __init__(self, window_size: int):
+        self.latency = LatencyTracker(window_size)
+        self.requests = 0
+        self.failures = 0
+        self.tokens = 0
+        self.cost = 0.0
+
+
+class ModelStatsRegistry:
+    """进程内按模型统计请求数、耗时、token 用量与估算费用"""
+
+    def __init__(self, window_size: int = 200):
+        self.window_size = window_size
+        self._stats: Dict[str, _ModelStats] = {}
+        self._lock = threading.Lock()
+
+    def record(self, model: str, latency_seconds: float, tokens: int = 0, failed: bool = False) -> None:
+        # model_prices: {模型名: 每千 token 价格}，未配置的模型不计费用
+        price = float((PIPELINE_CONFIG.get("model_prices") or {}).get(model) or 0)
+        with self._lock:
+            stats = self._stats.get(model)
+            if stats is None:
+                stats = _ModelStats(self.window_size)
+                self._stats[model] = stats
+            stats.requests += 1
+            if failed:
+                stats.failures += 1
+            else:
+                stats.tokens += int(tokens or 0)
+                stats.cost += price * int(tokens or 0) / 1000.0
+        if not failed:
+            stats.latency.record(latency_seconds)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            stats = dict(self._stats)
+        return {
+            model: {
+                "requests": s.requests,
+                "failures": s.failures,
+                "tokens": s.tokens,
+                "cost": round(s.cost, 6),
+                "latencyP50": s.latency.percentile(50),
+                "latencyP95": s.latency.percentile(95),
+            }
+            for model, s in stats.items()
+        }
+
+
+model_stats = ModelStatsRegistry()
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+import os
+import logging
+from typing import List, Optional, Tuple
+
+from pypdf import PdfReader, PdfWriter
+
+logger = logging.getLogger(__name__)
+
+
+def get_page_count(file_path: str) -> int:
+    """返回 PDF 页数"""
+    reader = PdfReader(file_path)
+    return len(reader.pages)
+
+
+def extract_pages(file_path: str, output_path: str, page_indices: List[int]) -> str:
+    """
+    将指定页 (从 0 开始的页码) 按顺序抽取为新的 PDF 文件
+
+    Args:
+        file_path (str): 源 PDF 路径
+        output_path (str): 输出 PDF 路径
+        page_indices (List[int]): 需要抽取的页码列表
+    """
+    reader = PdfReader(file_path)
+    writer = PdfWriter()
+    for page_index in page_indices:
+        writer.add_page(reader.pages[page_index])
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    with open(output_path, "wb") as f:
+        writer.write(f)
+    return output_path
+
+
+def split_pdf(
+    file_path: str,
+    output_dir: str,
+    chunk_pages: int,
+    page_indices: Optional[List[int]] = None,
+) -> List[Tuple[str, List[int]]]:
+    """
+    按页数将 PDF 拆分为多个子文件，纯本地操作
+
+    Args:
+        file_path (str): 源 PDF 路径
+        output_dir (str): 子文件输出目录
+        chunk_pages (int): 每个子文件包含的页数
+        page_indices (List[int], optional): 只拆分这些页，默认全部页
+
+    Returns:
+        List[Tuple[str, List[int]]]: (子文件路径, 子文件每一页对应的源文件页码)
+    """
+    if chunk_pages <= 0:
+        raise ValueError("chunk_pages 必须大于 0")
+
+    reader = PdfReader(file_path)
+    if page_indices is None:
+        page_indices = list(range(len(reader.pages)))
+
+    os.makedirs(output_dir, exist_ok=True)
+    chunks: List[Tuple[str, List[int]]] = []
+    for chunk_no, start in enumerate(range(0, len(page_indices), chunk_pages)):
+        pages = page_indices[start:start + chunk_pages]
+        writer = PdfWriter()
+        for page_index in pages:
+            writer.add_page(reader.pages[page_index])
+
+        chunk_path = os.path.join(
+            output_dir, f"chunk_{chunk_no:03d}_p{pages[0] + 1}-{pages[-1] + 1}.pdf"
+        )
+        with open(chunk_path, "wb") as f:
+            writer.write(f)
+        chunks.append((chunk_path, pages))
+
+    logger.info(f"Split {file_path} into {len(chunks)} chunks of {chunk_pages} pages: output_dir={output_dir}")
+    return chunks
+
+
+def parse_page_range(spec: Optional[str], page_count: int) -> Optional[List[int]]:
+    """
+    解析用户输入的页码范围 (从 1 开始，如 "1-5,8,10-12")
+
+    Returns:
+        Optional[List[int]]: 从 0 开始的有序页码列表；"all" 或空值返回 None 表示全部页
+    """
+    spec = (spec or "").strip().lower()
+    if spec in {"", "all", "*"}:
+        return None
+
+    pages = set()
+    for part in spec.replace("，", ",").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            start_str, end_str = [p.strip() for p in part.split("-", 1)]
+            start = int(start_str) if start_str else 1
+            end = int(end_str) if end_str else page_count
+        else:
+            start = end = int(part)
+        if start < 1 or end < start:
+            raise ValueError(f"无效的页码范围: {part}")
+        if page_count and end > page_count:
+            raise ValueError(f"页码超出范围: {part} (共 {page_count} 页)")
+        pages.update(range(start - 1, end))
+
+    if not pages:
+        raise ValueError("页码范围为空")
+    return sorted(pages)
+
+
+def format_page_range(page_indices: Optional[List[int]]) -> str:
+    """将从 0 开始的页码列表格式化为紧凑的范围字符串 (从 1 开始)"""
+    if not page_indices:
+        return "all"
+
+    parts: List[str] = []
+    pages = sorted(set(page_indices))
+    start = prev = pages[0]
+    for page in pages[1:] + [None]:
+        if page is not None and page == prev + 1:
+            prev = page
+            continue
+        parts.append(f"{start + 1}" if start == prev else f"{start + 1}-{prev + 1}")
+        if page is not None:
+            start = prev = page
+    return ",".join(parts)
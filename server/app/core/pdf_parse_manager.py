@@ -1,21 +1,38 @@
 # -*- coding: utf-8 -*-
 import threading
 import os
+import json
 import logging
 import yaml
 import requests
 import re
 import time
 import random
-from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 
 from ..core.database import SessionLocal
 from ..models.sql_models import Task, Config
-from ..core.pdf_parser import PDFParser
+from ..core.config import PIPELINE_CONFIG
+from ..core.pdf_parser import PDFParser, STATUS_QUERY_ERROR
+from ..core.chunked_pdf_parser import ChunkedPDFParser
+from ..core.local_pdf_parser import LocalPDFParser, has_text_layer, is_available as local_parser_available
+from ..core.pdf_pages import get_page_count, parse_page_range, extract_pages
+from ..core.job_queue import job_queue, QueueConsumer, JobInterrupted, JobControlled, INTERRUPT_ACTION
+from ..core.debug_capture import debug_capture
+from ..core.metrics import (
+    figure_download_bytes, figure_download_seconds, figure_downloads, parse_layouts, yaml_write_seconds,
+)
 
 logger = logging.getLogger(__name__)
 
 
+class ParseStatusUnavailable(RuntimeError):
+    """云端解析状态持续无法查询，检查点已保留，由队列重试时继续接管"""
+
+
+PARSER_DEBUG_LOG = "pdf_parser_debug.log"
+
+
 class PDFParseManager:
     _instance = None
     _lock = threading.Lock()
@@ -31,26 +48,62 @@ class PDFParseManager:
     def __init__(self):
         if self.initialized:
             return
-        self.executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="PDFParseWorker")
-        self.active_tasks = {}
+        self.consumer = QueueConsumer(
+            stage="parse",
+            handler=self._handle_job,
+            max_workers=int(PIPELINE_CONFIG.get("parse_workers") or 2),
+            name="PDFParseWorker",
+            lease_seconds=int(PIPELINE_CONFIG.get("job_lease_seconds") or 60),
+            on_control=self.control_task,
+            on_lease_lost=self.interrupt_job,
+        )
         self.active_parsers = {}
+        # 收到暂停/取消请求的任务 {task_id: action}
+        self.task_controls = {}
         self.initialized = True
         self.stop_requested = False
 
-    def submit_task(self, task_id: str):
+    def start(self, max_workers: Optional[int] = None):
+        """开始从持久化队列消费解析任务，并重新入队未完成的任务"""
+        self.consumer.start(max_workers)
+        self.resume_tasks()
+
+    def submit_task(self, task_id: str, size: Optional[int] = None, engine: Optional[str] = None):
+        """
+        入队解析任务。size (待解析页数) 与 engine 已知时直接传入，
+        否则由任务记录推算；未传入 engine 且配置为 auto 时需要读取 PDF 判断文本层 (阻塞调用)。
+        """
         if self.stop_requested:
             logger.warning(f"Cannot submit task {task_id}: manager is stopping")
             return
 
-        if task_id in self.active_tasks and not self.active_tasks[task_id].done():
-            logger.warning(f"Task {task_id} is already running")
-            return
+        job_queue.enqueue("parse", task_id, **self._job_meta(task_id, size, engine))
+        self.consumer.notify()
+        logger.info(f"Task {task_id} submitted to queue")
 
-        future = self.executor.submit(self._execute_task, task_id)
-        self.active_tasks[task_id] = future
-        logger.info(f"Task {task_id} submitted to pool")
+    def _job_meta(self, task_id: str, size: Optional[int] = None, engine: Optional[str] = None) -> dict:
+        """调度所需的任务信息: 提交者、待解析页数与解析引擎"""
+        db = SessionLocal()
+        try:
+            task = db.query(Task).filter(Task.task_id == task_id).first()
+            if not task:
+                return {}
+            if size is None:
+                # page_range 入库时已规范化为闭区间，无需打开 PDF 即可解析
+                page_indices = parse_page_range(task.page_range, 0)
+                size = len(page_indices) if page_indices is not None else (task.page_count or None)
+            if task.parse_job_id or task.parse_checkpoint:
+                engine = "docmind"
+            elif engine is None:
+                engine = self.resolve_parse_engine(db.query(Config).first(), task.file_path)
+            return {"submitter": task.submitter, "size": size, "engine": engine}
+        except Exception as e:
+            logger.warning(f"Failed to collect job meta for task {task_id}: {e}")
+            return {}
+        finally:
+            db.close()
 
-    def stop_all(self):
+    def stop_all(self, wait: bool = False):
         """Stops all running PDF parse tasks."""
         self.stop_requested = True
         logger.info("Stopping all PDF parse tasks...")
@@ -60,31 +113,69 @@ class PDFParseManager:
             except Exception as e:
                 logger.error(f"Error stopping parser {task_id}: {e}")
 
-        try:
-             # cancel_futures is available in Python 3.9+
-             self.executor.shutdown(wait=False, cancel_futures=True)
-        except Exception:
-             self.executor.shutdown(wait=False)
-
-        self.active_tasks.clear()
+        self.consumer.stop(wait=wait)
         self.active_parsers.clear()
 
-    def _execute_task(self, task_id: str):
+    def control_task(self, task_id: str, action: str):
+        """暂停/取消单个解析任务 (action: pause / cancel)，只影响在本进程运行的任务"""
+        self.task_controls[task_id] = action
+        parser = self.active_parsers.get(task_id)
+        if parser:
+            logger.info(f"Stopping parse task {task_id}: {action}")
+            parser.stop()
+
+    def interrupt_job(self, job: dict):
+        """队列租约丢失时停止解析，保留检查点由接管的 worker 继续 (不重新提交云端任务)"""
+        self.control_task(job["task_id"], INTERRUPT_ACTION)
+
+    def _handle_job(self, task_id: str, job: dict):
+        self.task_controls.pop(task_id, None)
         if self.stop_requested:
-            logger.info(f"Task {task_id} skipped due to shutdown")
-            return
+            raise JobInterrupted()
+        try:
+            self._execute_task(task_id, job.get("engine"))
+        finally:
+            action = self.task_controls.pop(task_id, None)
+        if action:
+            raise JobControlled(action)
+        if self.stop_requested:
+            # 服务停止导致解析中断，检查点已保存，归还队列等待恢复
+            raise JobInterrupted()
 
+    def _execute_task(self, task_id: str, engine: Optional[str] = None):
+        """engine 为入队时确定的解析引擎 (与调度的引擎并发上限一致)，为空时重新判断"""
         logger.info(f"Starting execution for task {task_id}")
         db = SessionLocal()
         task = None
+        retry_error: Optional[str] = None
         try:
             task = db.query(Task).filter(Task.task_id == task_id).first()
             if not task:
                 logger.error(f"Task {task_id} not found in database")
                 return
 
+            if (task.parse_progress or 0) >= 100:
+                logger.info(f"Task {task_id} already parsed, skipping")
+                return
+
             config = db.query(Config).first()
-            if not config or not config.aliyun_access_key_id or not config.aliyun_access_key_secret:
+            checkpoint = self._load_checkpoint(task)
+            resuming = bool(task.parse_job_id or checkpoint.get("chunks"))
+            if resuming:
+                # 已有云端任务，沿用 DocMind 接管而不是重新解析
+                parse_engine = "docmind"
+                logger.info(
+                    f"Task {task_id} resuming DocMind job: job_id={task.parse_job_id}, layouts={task.parse_layout_num}, chunks={len(checkpoint.get('chunks') or [])}"
+                )
+            elif engine in ("docmind", "local"):
+                # 沿用入队时判断的引擎，不再读取 PDF；worker 进程未安装 PyMuPDF 时回退 DocMind
+                parse_engine = engine if engine == "docmind" or local_parser_available() else "docmind"
+            else:
+                parse_engine = self.resolve_parse_engine(config, task.file_path)
+            logger.info(f"Task {task_id} parse engine: {parse_engine}")
+            if parse_engine == "docmind" and (
+                not config or not config.aliyun_access_key_id or not config.aliyun_access_key_secret
+            ):
                 logger.warning(f"Task {task_id} missing Aliyun AccessKey config")
                 task.status = "failed"
                 task.message = "系统配置缺失 (请在设置页面配置阿里云AccessKey)"
@@ -92,8 +183,11 @@ class PDFParseManager:
                 return
 
             task.status = "processing"
-            task.message = "正在初始化解析器..."
-            task.parse_progress = 0
+            if resuming:
+                task.message = "正在恢复解析..."
+            else:
+                task.message = "正在初始化解析器..."
+                task.parse_progress = 0
             db.commit()
 
             output_dir = os.path.dirname(task.file_path)
@@ -104,6 +198,10 @@ class PDFParseManager:
                 f"Task {task_id} parse paths: file={task.file_path}, output={output_path}, figures_dir={figures_dir}"
             )
 
+            stage_label = "本地解析" if parse_engine == "local" else "云端解析"
+            downloaded_figures = set(checkpoint.get("figures") or [])
+            initial_layouts = self._load_fetched_layouts(output_path, task.parse_layout_num) if resuming else None
+
             def on_update(tid, old_status, new_status, processing):
                 try:
                     logger.debug(
@@ -113,14 +211,14 @@ class PDFParseManager:
                         task.status = "processing"
                         cloud_percent = float(processing)
                         task.parse_progress = min(85, max(0, int(cloud_percent * 0.85)))
-                        task.message = f"云端解析中... {processing}%"
+                        task.message = f"{stage_label}中... {processing}%"
                     elif new_status == "success":
                         if task.parse_progress < 85:
                             task.parse_progress = 85
-                        task.message = "云端解析完成，正在拉取结果..."
+                        task.message = f"{stage_label}完成，正在拉取结果..."
                     elif new_status == "fail":
                         task.status = "failed"
-                        task.message = "云端解析失败"
+                        task.message = f"{stage_label}失败"
 
                     db.commit()
                 except Exception as e:
@@ -129,6 +227,7 @@ class PDFParseManager:
             def on_data(tid, new_layouts):
                 try:
                     logger.debug(f"Task {tid} received layouts: count={len(new_layouts or [])}")
+                    parse_layouts.inc(len(new_layouts or []), engine=parse_engine)
                     if not os.path.exists(figures_dir):
                         os.makedirs(figures_dir, exist_ok=True)
 
@@ -149,20 +248,33 @@ class PDFParseManager:
                                             )
 
                                         local_path = os.path.join(figures_dir, safe_filename)
+                                        rel_path = f"/api/task/{task_id}/figures/{safe_filename}"
+                                        if safe_filename in downloaded_figures and os.path.exists(local_path):
+                                            layout["markdownContent"] = layout["markdownContent"].replace(url, rel_path)
+                                            continue
+
+                                        download_start = time.monotonic()
                                         resp = requests.get(url, stream=True, timeout=30)
                                         if resp.status_code == 200:
+                                            size = 0
                                             with open(local_path, "wb") as f:
                                                 for chunk in resp.iter_content(1024):
                                                     f.write(chunk)
+                                                    size += len(chunk)
+                                            figure_download_seconds.observe(time.monotonic() - download_start)
+                                            figure_download_bytes.inc(size)
+                                            figure_downloads.inc(outcome="ok")
 
-                                            rel_path = f"/api/task/{task_id}/figures/{safe_filename}"
+                                            downloaded_figures.add(safe_filename)
                                             layout["markdownContent"] = layout["markdownContent"].replace(url, rel_path)
                                             logger.info(f"Downloaded figure {safe_filename} for task {tid}")
                                         else:
+                                            figure_downloads.inc(outcome="http_error")
                                             logger.warning(
                                                 f"Failed to download figure {url}: status {resp.status_code}"
                                             )
                                     except Exception as e:
+                                        figure_downloads.inc(outcome="error")
                                         logger.error(f"Error downloading figure {url}: {e}", exc_info=True)
 
                     if parser.total_layout_num > 0 and task.parse_progress >= 85:
@@ -177,39 +289,55 @@ class PDFParseManager:
                         "layouts": parser.all_layouts,
                         "total": parser.total_layout_num,
                     }
-                    with open(output_path, "w", encoding="utf-8") as f:
+                    with yaml_write_seconds.time(writer="parse"), open(output_path, "w", encoding="utf-8") as f:
                         yaml.safe_dump(result_data, f, allow_unicode=True, sort_keys=False)
                     logger.debug(
                         f"Task {tid} wrote parse_result.yaml: output={output_path}, total_layouts={parser.total_layout_num}, processed={parser.processed_layout_num}"
                     )
+                    # 结果落盘后再推进已拉取水位
+                    self._save_checkpoint(task, parser, downloaded_figures)
+                    db.commit()
                 except Exception as e:
                     logger.error(f"Error updating data callback: {e}", exc_info=True)
 
-            endpoint = config.aliyun_endpoint or "docmind-api.cn-hangzhou.aliyuncs.com"
-            if endpoint.startswith("https://"):
-                endpoint = endpoint[8:]
-            elif endpoint.startswith("http://"):
-                endpoint = endpoint[7:]
-            logger.info(f"Task {task_id} parser endpoint: {endpoint}")
-
-            parser = PDFParser(
-                task_id=task_id,
-                file_path=task.file_path,
-                output_path=output_path,
-                access_key_id=config.aliyun_access_key_id,
-                access_key_secret=config.aliyun_access_key_secret,
-                endpoint=endpoint,
-                on_update=on_update,
-                on_data=on_data,
-                debug_output_path=os.path.join(output_dir, "pdf_parser_debug.log"),
-                debug=True
-            )
+            def on_submit(tid, job_id):
+                try:
+                    logger.info(f"Task {task_id} submitted DocMind job: job_id={job_id}")
+                    self._save_checkpoint(task, parser, downloaded_figures)
+                    db.commit()
+                except Exception as e:
+                    logger.error(f"Error saving parse checkpoint: {e}", exc_info=True)
+
+            page_count = task.page_count or self._get_page_count(task.file_path)
+            page_indices = parse_page_range(task.page_range, page_count)
+            if page_indices is not None:
+                logger.info(f"Task {task_id} page range: {task.page_range} ({len(page_indices)}/{page_count} pages)")
+                page_count = len(page_indices)
+
+            if parse_engine == "local":
+                parser = LocalPDFParser(
+                    task_id=task_id,
+                    file_path=task.file_path,
+                    output_path=output_path,
+                    figures_dir=figures_dir,
+                    page_indices=page_indices,
+                    max_workers=int(PIPELINE_CONFIG.get("local_parse_workers") or 0) or None,
+                    on_update=on_update,
+                    on_data=on_data,
+                )
+            else:
+                parser = self._create_docmind_parser(
+                    task_id, task.file_path, output_path, output_dir, config,
+                    page_indices, page_count, on_update, on_data, on_submit,
+                    task.parse_job_id, checkpoint.get("chunks"), initial_layouts
+                )
 
             self.active_parsers[task_id] = parser
 
             logger.info(f"Running parser for {task_id}")
             try:
-                parser.run()
+                if task_id not in self.task_controls:
+                    parser.run()
             finally:
                 if task_id in self.active_parsers:
                     del self.active_parsers[task_id]
@@ -218,21 +346,49 @@ class PDFParseManager:
                 f"Task {task_id} parser run finished: status={parser.task_status}, total={parser.total_layout_num}, processed={parser.processed_layout_num}"
             )
 
-            if parser.task_status == "success":
+            if self.task_controls.get(task_id) == INTERRUPT_ACTION:
+                # 租约已丢失，任务由其他 worker 接管：不写结果文件与任务状态
+                logger.warning(f"Task {task_id} lease lost, parse left to the new owner: job_id={task.parse_job_id}")
+            elif parser.task_status == "success":
                 result_data = {
                     "task_id": task_id,
                     "layouts": parser.all_layouts,
                     "total": parser.total_layout_num,
                 }
-                with open(output_path, "w", encoding="utf-8") as f:
+                with yaml_write_seconds.time(writer="parse"), open(output_path, "w", encoding="utf-8") as f:
                     yaml.safe_dump(result_data, f, allow_unicode=True, sort_keys=False)
 
                 task.status = "completed"
                 task.parse_progress = 100
+                task.layout_count = parser.total_layout_num
                 task.message = "解析完成"
+                # 解析已完成时忽略迟到的暂停/取消请求
+                self.task_controls.pop(task_id, None)
+                self._clear_checkpoint(task)
                 db.commit()
                 logger.info(f"Task {task_id} completed successfully")
+            elif task_id in self.task_controls:
+                # 暂停/取消时保留检查点，恢复后接管云端任务 (本地解析从头开始)
+                action = self.task_controls[task_id]
+                task.status = "paused" if action == "pause" else "cancelled"
+                task.message = "解析已暂停" if action == "pause" else "解析已取消"
+                db.commit()
+                logger.info(f"Task {task_id} parse {task.status}: job_id={task.parse_job_id}")
+            elif self.stop_requested and parse_engine == "docmind":
+                # 服务停止时保留检查点，重启后接管云端任务
+                task.status = "pending"
+                task.message = "服务已停止，等待恢复解析"
+                db.commit()
+                logger.info(f"Task {task_id} interrupted by shutdown, checkpoint kept: job_id={task.parse_job_id}")
+            elif parser.task_status == STATUS_QUERY_ERROR:
+                # 云端任务可能仍在运行：保留检查点，交给队列重试接管而不是重新提交 (避免重复计费)
+                task.status = "pending"
+                task.message = "暂时无法查询云端解析状态，稍后重试"
+                db.commit()
+                retry_error = f"DocMind status unavailable: job_id={task.parse_job_id}"
+                logger.warning(f"Task {task_id} status query kept failing, checkpoint kept: job_id={task.parse_job_id}")
             else:
+                self._clear_checkpoint(task)
                 task.status = "failed"
                 if task.message == "正在云端解析中..." or not task.message:
                     task.message = "解析失败"
@@ -241,16 +397,163 @@ class PDFParseManager:
         except Exception as e:
             logger.error(f"Task execution exception for {task_id}: {e}", exc_info=True)
             try:
-                if task is not None:
+                if task is not None and self.task_controls.get(task_id) != INTERRUPT_ACTION:
                     task.status = "failed"
                     task.message = f"内部错误: {str(e)}"
                     db.commit()
             except Exception:
                 pass
+        finally:
+            if task is not None:
+                try:
+                    # 失败时补写内存中最近的 HTTP 交互，便于排查
+                    debug_capture.finish(
+                        os.path.join(os.path.dirname(task.file_path), PARSER_DEBUG_LOG),
+                        failed=task.status == "failed" or retry_error is not None,
+                    )
+                except Exception as e:
+                    logger.error(f"Error finishing debug capture for task {task_id}: {e}")
+            db.close()
+        if retry_error:
+            # 抛出后由队列按最大尝试次数重新排队，重试时从检查点接管云端任务
+            raise ParseStatusUnavailable(retry_error)
+
+    def resolve_parse_engine(self, config, file_path: str) -> str:
+        """docmind / local / auto (电子文档本地解析，扫描件走 DocMind)"""
+        parse_engine = (config.parse_engine if config else None) or "docmind"
+        if parse_engine == "auto":
+            try:
+                parse_engine = "local" if has_text_layer(file_path) else "docmind"
+            except Exception as e:
+                logger.warning(f"Failed to detect text layer of {file_path}: {e}")
+                parse_engine = "docmind"
+        if parse_engine == "local" and not local_parser_available():
+            logger.warning("PyMuPDF not installed, falling back to DocMind")
+            parse_engine = "docmind"
+        return parse_engine
+
+    def _create_docmind_parser(self, task_id, file_path, output_path, output_dir, config,
+                               page_indices, page_count, on_update, on_data, on_submit,
+                               job_id=None, resume_chunks=None, initial_layouts=None):
+        endpoint = config.aliyun_endpoint or "docmind-api.cn-hangzhou.aliyuncs.com"
+        if endpoint.startswith("https://"):
+            endpoint = endpoint[8:]
+        elif endpoint.startswith("http://"):
+            endpoint = endpoint[7:]
+        logger.info(f"Task {task_id} parser endpoint: {endpoint}")
+
+        parser_kwargs = dict(
+            access_key_id=config.aliyun_access_key_id,
+            access_key_secret=config.aliyun_access_key_secret,
+            endpoint=endpoint,
+            max_status_errors=int(PIPELINE_CONFIG.get("parse_status_max_errors") or 10),
+            debug_output_path=os.path.join(output_dir, PARSER_DEBUG_LOG),
+            debug=debug_capture.enabled,
+        )
+
+        split_min_pages = int(PIPELINE_CONFIG.get("parse_split_min_pages") or 0)
+        if resume_chunks or (not job_id and split_min_pages > 0 and page_count > split_min_pages):
+            logger.info(f"Task {task_id} has {page_count} pages, parsing in chunks")
+            parser = ChunkedPDFParser(
+                task_id=task_id,
+                file_path=file_path,
+                output_path=output_path,
+                chunk_dir=os.path.join(output_dir, "chunks"),
+                chunk_pages=int(PIPELINE_CONFIG.get("parse_chunk_pages") or 50),
+                max_workers=int(PIPELINE_CONFIG.get("parse_chunk_workers") or 4),
+                max_chunk_retries=int(PIPELINE_CONFIG.get("parse_chunk_retries") or 0),
+                page_indices=page_indices,
+                resume_chunks=resume_chunks,
+                initial_layouts=initial_layouts,
+                on_update=on_update,
+                on_data=on_data,
+                on_submit=on_submit,
+                **parser_kwargs
+            )
+        else:
+            parse_file_path = file_path
+            if page_indices is not None:
+                # 只把选中的页发送到 DocMind
+                parse_file_path = extract_pages(
+                    file_path, os.path.join(output_dir, "selected_pages.pdf"), page_indices
+                )
+            parser = PDFParser(
+                task_id=task_id,
+                file_path=parse_file_path,
+                output_path=output_path,
+                page_map=page_indices,
+                job_id=job_id,
+                initial_layouts=initial_layouts,
+                on_update=on_update,
+                on_data=on_data,
+                on_submit=on_submit,
+                **parser_kwargs
+            )
+        return parser
+
+    def resume_tasks(self):
+        """启动时为未完成且不在队列中的解析任务重新入队，已有云端任务的会直接接管"""
+        db = SessionLocal()
+        try:
+            tasks = (
+                db.query(Task)
+                .filter(Task.status.in_(["pending", "processing"]), Task.parse_progress < 100)
+                .order_by(Task.created_at)
+                .all()
+            )
+            task_ids = [task.task_id for task in tasks]
         finally:
             db.close()
-            if task_id in self.active_tasks:
-                del self.active_tasks[task_id]
+
+        for task_id in task_ids:
+            if job_queue.has_active_job("parse", task_id):
+                continue
+            logger.info(f"Resuming parse task {task_id}")
+            self.submit_task(task_id)
+
+    def _load_checkpoint(self, task: Task) -> dict:
+        if not task.parse_checkpoint:
+            return {}
+        try:
+            return json.loads(task.parse_checkpoint) or {}
+        except Exception as e:
+            logger.warning(f"Task {task.task_id} has invalid parse checkpoint: {e}")
+            return {}
+
+    def _save_checkpoint(self, task: Task, parser, downloaded_figures) -> None:
+        if not hasattr(parser, "get_checkpoint"):
+            return
+        state = parser.get_checkpoint()
+        task.parse_job_id = state.get("job_id")
+        task.parse_layout_num = parser.processed_layout_num
+        task.parse_checkpoint = json.dumps(
+            {"chunks": state.get("chunks"), "figures": sorted(downloaded_figures)},
+            ensure_ascii=False,
+        )
+
+    def _clear_checkpoint(self, task: Task) -> None:
+        task.parse_job_id = None
+        task.parse_layout_num = 0
+        task.parse_checkpoint = None
+
+    def _load_fetched_layouts(self, output_path: str, layout_num: int) -> list:
+        """读取已落盘的布局，作为接管云端任务时的起点"""
+        if not layout_num or not os.path.exists(output_path):
+            return []
+        try:
+            with open(output_path, "r", encoding="utf-8") as f:
+                data = yaml.safe_load(f) or {}
+            return (data.get("layouts") or [])[:layout_num]
+        except Exception as e:
+            logger.warning(f"Failed to load fetched layouts from {output_path}: {e}")
+            return []
+
+    def _get_page_count(self, file_path: str) -> int:
+        try:
+            return get_page_count(file_path)
+        except Exception as e:
+            logger.warning(f"Failed to count pages of {file_path}: {e}")
+            return 0
 
 
 pdf_parse_manager = PDFParseManager()
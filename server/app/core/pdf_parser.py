@@ -1,21 +1,22 @@
 # -*- coding: utf-8 -*-
 import os
 import json
-import time
 import threading
-from pprint import pformat
 from typing import Dict, List, Optional, Callable
-from alibabacloud_docmind_api20220711.client import Client as docmind_api20220711Client
-from alibabacloud_tea_openapi import models as open_api_models
 from alibabacloud_docmind_api20220711 import models as docmind_api20220711_models
 from alibabacloud_tea_util import models as util_models
-from alibabacloud_credentials.client import Client as CredClient
 
 import logging
 from .task_logger import log_task_network
+from .debug_capture import debug_capture
+from .metrics import docmind_request_seconds, docmind_request_errors
+from .client_pool import aliyun_client_pool
 
 logger = logging.getLogger(__name__)
 
+# 查询云端任务状态时发生网络/鉴权等异常，云端任务本身未必失败，不能据此重新提交
+STATUS_QUERY_ERROR = "error"
+
 class PDFParser:
     def __init__(self, 
                  task_id: str,
@@ -27,9 +28,14 @@ class PDFParser:
                  debug: bool = False, 
                  debug_output_path: str = "pdf_parser_debug.log", 
                  layout_step_size: int = 10,
+                 max_status_errors: int = 10,
+                 page_map: Optional[List[int]] = None,
+                 job_id: Optional[str] = None,
+                 initial_layouts: Optional[List[dict]] = None,
                  on_update: Optional[Callable] = None,
                  on_data: Optional[Callable] = None,
-                 on_finish: Optional[Callable] = None):
+                 on_finish: Optional[Callable] = None,
+                 on_submit: Optional[Callable] = None):
         """
         初始化PDF解析器
         
@@ -39,12 +45,17 @@ class PDFParser:
             endpoint (str): API端点地址
             access_key_id (str, optional): 阿里云 AccessKey ID
             access_key_secret (str, optional): 阿里云 AccessKey Secret
-            debug (bool): 是否开启调试模式
+            debug (bool): 是否采集 HTTP 调试信息 (写入策略见 pipeline.debug_capture_mode)
             debug_output_path (str): 调试信息输出路径
             layout_step_size (int): 增量获取结果的步长
+            max_status_errors (int): 连续查询状态失败达到该次数时结束轮询 (状态为 error，保留云端任务 ID)
+            page_map (List[int], optional): 当前文件每一页对应的源文件页码，用于修正拆分/抽取后布局的 pageNum
+            job_id (str, optional): 已提交的 DocMind 任务 ID，传入时优先重新接管该任务而不是重新上传
+            initial_layouts (List[dict], optional): 接管任务时已拉取的布局，从其数量处继续增量拉取
             on_update (callable, optional): 状态更新回调, signature: (task_id, old_status, new_status, processing)
             on_data (callable, optional): 数据更新回调, signature: (task_id, new_layouts)
             on_finish (callable, optional): 任务结束回调, signature: (task_id, status, result_info)
+            on_submit (callable, optional): 云端任务提交成功回调, signature: (task_id, job_id)
         """
         self.file_path = file_path
         self.output_path = output_path
@@ -54,21 +65,26 @@ class PDFParser:
         self.debug = debug
         self.debug_output_path = debug_output_path
         self.layout_step_size = layout_step_size
+        self.max_status_errors = max(1, int(max_status_errors))
+        self.status_errors = 0
+        self.page_map = page_map
         
         # 回调函数
         self._on_update_callback = on_update
         self._on_data_callback = on_data
         self._on_finish_callback = on_finish
+        self._on_submit_callback = on_submit
         
-        # 初始化客户端
+        # 初始化客户端 (进程内按端点与凭据复用)
         self.client = self._init_client()
         
         # 单任务状态管理
         self.task_id = task_id
-        self.task_status = "idle"  # idle, init, processing, success, fail
-        self.total_layout_num = 0       # 从服务端获取的总解析成功数量
-        self.processed_layout_num = 0   # 本地已处理（获取）的数量
-        self.all_layouts = []           # 存储所有获取到的布局
+        self.job_id = job_id            # DocMind 云端任务 ID
+        self.task_status = "idle"  # idle, init, processing, success, fail, error (状态查询持续失败)
+        self.all_layouts = list(initial_layouts or [])  # 存储所有获取到的布局
+        self.total_layout_num = len(self.all_layouts)       # 从服务端获取的总解析成功数量
+        self.processed_layout_num = len(self.all_layouts)   # 本地已处理（获取）的数量
         
         # 线程控制
         self._stop_event = threading.Event()
@@ -100,20 +116,8 @@ class PDFParser:
         logger.info("任务已收到停止信号")
 
     def _init_client(self):
-        """初始化API客户端"""
-        config = open_api_models.Config(endpoint=self.endpoint)
-        if self.access_key_id and self.access_key_secret:
-            config.access_key_id = self.access_key_id
-            config.access_key_secret = self.access_key_secret
-            config.type = "access_key"
-        else:
-            cred = CredClient()
-            try:
-                config.access_key_id = cred.get_credential().get_access_key_id()
-                config.access_key_secret = cred.get_credential().get_access_key_secret()
-            except Exception:
-                pass
-        return docmind_api20220711Client(config)
+        """获取 (共享的) API 客户端"""
+        return aliyun_client_pool.get_docmind_client(self.endpoint, self.access_key_id, self.access_key_secret)
 
     def _safe_serialize(self, obj: any, depth: int = 5):
         if depth <= 0:
@@ -163,15 +167,20 @@ class PDFParser:
 
     def _run_task_sync(self, interval, external_stop_event=None):
         """任务主流程（同步阻塞）"""
-        # 1. 提交任务
-        task_id = self._submit_job()
+        # 1. 接管已提交的云端任务，失效时重新提交
+        task_id = self.job_id if self._can_reattach() else None
         if not task_id:
-            # 提交失败，触发回调（如果需要）或直接结束
-            if self._on_finish_callback:
-                self._on_finish_callback(None, "fail", {"error": "Submit failed"})
-            return
+            self._reset_progress()
+            task_id = self._submit_job()
+            if not task_id:
+                # 提交失败，触发回调（如果需要）或直接结束
+                if self._on_finish_callback:
+                    self._on_finish_callback(None, "fail", {"error": "Submit failed"})
+                return
+            self.job_id = task_id
+            if self._on_submit_callback:
+                self._on_submit_callback(self.task_id, task_id)
 
-        self.task_id = task_id
         self.task_status = "init"
         logger.info(f"任务进入轮询阶段: task_id={task_id}, interval={interval}s, step={self.layout_step_size}")
         
@@ -193,6 +202,33 @@ class PDFParser:
             # 使用 wait 代替 sleep，支持响应 stop()
             self._stop_event.wait(interval)
 
+    def _can_reattach(self) -> bool:
+        """检查已保存的云端任务是否仍然有效"""
+        if not self.job_id:
+            return False
+        status, num_successful, _ = self._check_status(self.job_id)
+        if status == STATUS_QUERY_ERROR:
+            # 暂时无法确认云端状态，继续接管，由轮询重试查询
+            logger.warning(f"暂时无法查询云端任务状态，继续接管: job_id={self.job_id}")
+            return True
+        if status == "fail" or num_successful < self.processed_layout_num:
+            logger.warning(
+                f"云端任务不可接管，将重新提交: job_id={self.job_id}, status={status}, successful={num_successful}, local_processed={self.processed_layout_num}"
+            )
+            return False
+        logger.info(f"接管云端任务: job_id={self.job_id}, status={status}, 从第 {self.processed_layout_num} 个布局继续拉取")
+        return True
+
+    def _reset_progress(self):
+        self.job_id = None
+        self.all_layouts = []
+        self.total_layout_num = 0
+        self.processed_layout_num = 0
+
+    def get_checkpoint(self) -> Dict:
+        """返回可持久化的恢复信息"""
+        return {"job_id": self.job_id, "layout_num": self.processed_layout_num}
+
     def _submit_job(self) -> Optional[str]:
         """提交PDF解析任务"""
         try:
@@ -208,7 +244,8 @@ class PDFParser:
             )
             runtime = util_models.RuntimeOptions()
             
-            response = self.client.submit_doc_parser_job_advance(request, runtime)
+            with docmind_request_seconds.time(call="submit"):
+                response = self.client.submit_doc_parser_job_advance(request, runtime)
             self._log_http_debug("submit_doc_parser_job_advance", request, response)
             
             task_id = response.body.data.id
@@ -216,17 +253,28 @@ class PDFParser:
             return task_id
             
         except Exception as error:
+            docmind_request_errors.inc(call="submit")
             logger.error(f"提交任务失败 {self.file_path}: {error}")
             self._log_http_debug("submit_doc_parser_job_advance", request if 'request' in locals() else None, error=error)
             return None
 
     def _update_and_fetch(self) -> bool:
         """更新状态并增量获取结果，返回是否完成"""
-        task_id = self.task_id
+        task_id = self.job_id
         if not task_id: return True
 
         # 1. 查询状态
         status, num_successful, processing = self._check_status(task_id)
+        if status == STATUS_QUERY_ERROR:
+            self.status_errors += 1
+            if self.status_errors < self.max_status_errors:
+                return False
+            logger.error(f"连续 {self.status_errors} 次查询状态失败，停止轮询: task_id={task_id}")
+            self.task_status = STATUS_QUERY_ERROR
+            if self._on_finish_callback:
+                self._on_finish_callback(task_id, STATUS_QUERY_ERROR, {"error": "Status query failed"})
+            return True
+        self.status_errors = 0
         logger.debug(
             f"状态查询: task_id={task_id}, status={status}, successful={num_successful}, processing={processing}, local_processed={self.processed_layout_num}"
         )
@@ -254,7 +302,10 @@ class PDFParser:
             )
 
             if not layouts: break
-            
+
+            # 响应对象由日志线程稍后序列化，页码映射与图片地址替换只作用于副本
+            layouts = [dict(layout) if isinstance(layout, dict) else layout for layout in layouts]
+            self._remap_page_num(layouts)
             self.processed_layout_num += len(layouts)
             self.all_layouts.extend(layouts)
             
@@ -284,11 +335,26 @@ class PDFParser:
             
         return False
 
+    def _remap_page_num(self, layouts: List[dict]):
+        """将子文件中的 pageNum (从 0 开始) 映射回源文件页码"""
+        if not self.page_map:
+            return
+        for layout in layouts:
+            page_num = layout.get("pageNum")
+            if isinstance(page_num, int) and 0 <= page_num < len(self.page_map):
+                layout["pageNum"] = self.page_map[page_num]
+            elif isinstance(page_num, list):
+                layout["pageNum"] = [
+                    self.page_map[p] if isinstance(p, int) and 0 <= p < len(self.page_map) else p
+                    for p in page_num
+                ]
+
     def _check_status(self, task_id: str):
         """内部查询状态"""
         try:
             request = docmind_api20220711_models.QueryDocParserStatusRequest(id=task_id)
-            response = self.client.query_doc_parser_status(request)
+            with docmind_request_seconds.time(call="status"):
+                response = self.client.query_doc_parser_status(request)
             self._log_http_debug("query_doc_parser_status", request, response)
             
             data = response.body.data
@@ -300,9 +366,10 @@ class PDFParser:
                 status = "fail"
             return status, num, processing
         except Exception as e:
+            docmind_request_errors.inc(call="status")
             self._log_http_debug("query_doc_parser_status", None, error=e)
             logger.error(f"查询状态失败: task_id={task_id}, err={e}", exc_info=True)
-            return "fail", 0, 0.0
+            return STATUS_QUERY_ERROR, 0, 0.0
 
     def _get_result(self, task_id: str, start_num: int, step: int) -> List[dict]:
         """内部获取结果"""
@@ -310,11 +377,13 @@ class PDFParser:
             request = docmind_api20220711_models.GetDocParserResultRequest(
                 id=task_id, layout_step_size=step, layout_num=start_num
             )
-            response = self.client.get_doc_parser_result(request)
+            with docmind_request_seconds.time(call="result"):
+                response = self.client.get_doc_parser_result(request)
             self._log_http_debug("get_doc_parser_result", request, response)
             layouts = response.body.data['layouts'] if (response.body.data and response.body.data['layouts']) else []
             return layouts
         except Exception as e:
+            docmind_request_errors.inc(call="result")
             self._log_http_debug("get_doc_parser_result", request if 'request' in locals() else None, error=e)
             logger.error(f"获取结果失败: task_id={task_id}, start={start_num}, step={step}, err={e}", exc_info=True)
             return []
@@ -327,33 +396,24 @@ class PDFParser:
                 task_id=self.task_id,
                 action=action,
                 service="aliyun_docmind",
-                request=self._safe_serialize(req) if req else None,
-                response=self._safe_serialize(resp) if resp else None,
-                error=str(error) if error else None
+                request=req,
+                response=resp,
+                error=str(error) if error else None,
+                # SDK 对象的序列化放到日志写入线程
+                serializer=self._safe_serialize,
             )
         except Exception as e:
             logger.error(f"Error logging task network: {e}")
 
-        # Keep existing debug log logic if debug is enabled
-        debug_path = self.debug_output_path
-        if not self.debug: return
-        try:
-            os.makedirs(os.path.dirname(debug_path) or ".", exist_ok=True)
-            status = self._get_response_status(resp) if resp is not None else None
-            timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
-            lines: List[str] = []
-            lines.append(
-                f"{timestamp} - pdf_parser - DEBUG_HTTP - task_id={self.task_id} action={action} status={status}"
+        # 调试日志按采集策略写入，序列化推迟到真正写入文件时
+        if self.debug:
+            debug_capture.record(
+                self.debug_output_path,
+                "pdf_parser",
+                f"{action} task_id={self.task_id}",
+                request=req,
+                response=resp,
+                status=(lambda: self._get_response_status(resp)) if resp is not None else None,
+                error=error,
+                serializer=self._safe_serialize,
             )
-            lines.append("REQUEST:")
-            lines.extend(["  " + line for line in pformat(self._safe_serialize(req), width=160).splitlines()])
-            if resp is not None:
-                lines.append("RESPONSE:")
-                lines.extend(["  " + line for line in pformat(self._safe_serialize(resp), width=160).splitlines()])
-            if error is not None:
-                lines.append(f"ERROR: {type(error).__name__}: {error}")
-            lines.append("-" * 120)
-            with open(debug_path, 'a', encoding='utf-8') as f:
-                f.write("\n".join(lines) + "\n")
-        except Exception as e: 
-            logger.error(f"Error logging debug: {e}")
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+import os
+import hashlib
+import tempfile
+import threading
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import yaml
+
+from .metrics import yaml_write_seconds
+
+# 翻译写入的布局字段 (原文 markdownContent 之外)
+TRANSLATION_FIELDS = (
+    "translatedMarkdownContent", "translationError", "translationEngine", "translationModel",
+    "mergeGroup", "layoutClass", "sourceLanguage", "sourceHash",
+)
+
+_locks: Dict[str, threading.RLock] = {}
+_locks_guard = threading.Lock()
+
+
+def source_hash(text: str) -> str:
+    """译文对应原文的摘要，原文修改后与记录的 sourceHash 不一致即译文过期"""
+    return hashlib.sha1((text or "").strip().encode("utf-8")).hexdigest()[:16]
+
+
+def is_stale(item: Dict[str, Any]) -> bool:
+    """已有译文但原文在翻译之后被修改 (没有 sourceHash 的旧结果视为未过期)"""
+    recorded = item.get("sourceHash")
+    if not recorded or not item.get("translatedMarkdownContent"):
+        return False
+    return recorded != source_hash(item.get("markdownContent") or "")
+
+
+def path_lock(path: str) -> threading.RLock:
+    """同一结果文件的读写互斥 (翻译任务逐条保存与接口编辑可能同时发生)"""
+    key = os.path.abspath(path)
+    with _locks_guard:
+        lock = _locks.get(key)
+        if lock is None:
+            lock = threading.RLock()
+            _locks[key] = lock
+        return lock
+
+
+def load_result(path: str) -> Tuple[Union[Dict, List], List[Dict[str, Any]]]:
+    """读取解析/翻译结果，返回 (根节点, layouts)"""
+    with path_lock(path):
+        with open(path, "r", encoding="utf-8") as f:
+            data = yaml.safe_load(f)
+
+    if isinstance(data, dict):
+        layouts = data.get("layouts", [])
+        if layouts is None:
+            layouts = []
+        if not isinstance(layouts, list):
+            raise ValueError("YAML 的 layouts 字段不是数组")
+        return data, layouts
+
+    if isinstance(data, list):
+        return data, data
+
+    raise ValueError("YAML 根节点必须是 dict 或 list")
+
+
+def save_result(path: str, data: Union[Dict, List], layouts: List[Dict[str, Any]]) -> int:
+    """先写临时文件再替换，读取方不会看到写了一半的文件；返回写入后文件的修改时间 (ns)"""
+    if isinstance(data, dict):
+        data["layouts"] = layouts
+        to_write: Union[Dict, List] = data
+    else:
+        to_write = layouts
+
+    directory = os.path.dirname(path) or "."
+    with path_lock(path):
+        fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".yaml", dir=directory)
+        try:
+            with yaml_write_seconds.time(writer="result_store"), os.fdopen(fd, "w", encoding="utf-8") as f:
+                yaml.safe_dump(to_write, f, allow_unicode=True, sort_keys=False)
+            os.replace(tmp_path, path)
+            return os.stat(path).st_mtime_ns
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+
+def translation_snapshot(layouts: List[Dict[str, Any]]) -> List[Tuple]:
+    """各布局译文字段的快照，用于判断文件中的译文是否在本写入方保存之后被其他写入方修改"""
+    return [
+        tuple(item.get(field) for field in TRANSLATION_FIELDS) if isinstance(item, dict) else ()
+        for item in layouts
+    ]
+
+
+def merge_external_edits(path: str, layouts: List[Dict[str, Any]], saved_mtime: Optional[int],
+                         saved_translations: Optional[List[Tuple]] = None) -> Tuple[int, int]:
+    """
+    文件在 saved_mtime (本写入方上次保存) 之后被其他写入方修改时，把修改合并到内存中的 layouts，
+    避免长时间运行的翻译任务保存时覆盖期间的编辑：
+    - 原文 (markdownContent) 只由接口编辑修改，与内存不同即合并；
+    - 译文字段与上次保存时的快照 saved_translations 不同，说明被单独翻译或手动编辑过，以文件为准。
+    返回 (合并原文的布局数, 合并译文的布局数)。
+    """
+    if saved_mtime is None or not os.path.exists(path):
+        return 0, 0
+    with path_lock(path):
+        if os.stat(path).st_mtime_ns == saved_mtime:
+            return 0, 0
+        _, current = load_result(path)
+    sources = translations = 0
+    for idx, (item, disk) in enumerate(zip(layouts, current)):
+        if not isinstance(item, dict) or not isinstance(disk, dict):
+            continue
+        if disk.get("markdownContent") != item.get("markdownContent"):
+            item["markdownContent"] = disk.get("markdownContent")
+            if not item.get("sourceHash") and disk.get("sourceHash"):
+                item["sourceHash"] = disk["sourceHash"]
+            sources += 1
+        if saved_translations is None or idx >= len(saved_translations):
+            continue
+        disk_fields = tuple(disk.get(field) for field in TRANSLATION_FIELDS)
+        if disk_fields == saved_translations[idx]:
+            continue
+        for field, value in zip(TRANSLATION_FIELDS, disk_fields):
+            if value is None:
+                item.pop(field, None)
+            else:
+                item[field] = value
+        translations += 1
+    return sources, translations
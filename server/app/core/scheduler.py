@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class JobCandidate:
+    def __init__(self, job_id: int, submitter: Optional[str], size: Optional[int], engine: Optional[str],
+                 enqueued_at: Optional[datetime]):
+        self.job_id = job_id
+        self.submitter = submitter or "anonymous"
+        self.size = max(1, int(size or 1))
+        self.engine = engine or ""
+        self.enqueued_at = enqueued_at
+
+
+class FairShareScheduler:
+    """
+    决定排队任务的认领顺序。
+
+    1. 引擎并发已达上限的任务暂不认领；
+    2. 等待超过 max_wait_seconds 的任务按入队顺序最先认领 (防饿死)；
+    3. 其余任务先按提交者当前运行中的任务数排序 (公平分享)，
+       再按随等待时间衰减的有效大小排序 (短作业优先)，最后按入队顺序。
+    """
+
+    def __init__(self, engine_limits: Optional[Dict[str, int]] = None, aging_seconds: float = 600,
+                 max_wait_seconds: float = 3600):
+        self.engine_limits = engine_limits or {}
+        self.aging_seconds = max(1.0, float(aging_seconds or 1))
+        self.max_wait_seconds = float(max_wait_seconds or 0)
+
+    def order(self, candidates: List[JobCandidate], running_by_submitter: Dict[str, int],
+              running_by_engine: Dict[str, int], now: Optional[datetime] = None) -> List[JobCandidate]:
+        """返回可认领任务的优先顺序"""
+        now = now or datetime.now()
+        starved: List[JobCandidate] = []
+        others: List[JobCandidate] = []
+        for candidate in candidates:
+            limit = int(self.engine_limits.get(candidate.engine) or 0)
+            if limit > 0 and running_by_engine.get(candidate.engine, 0) >= limit:
+                continue
+            if self.max_wait_seconds > 0 and self._wait_seconds(candidate, now) >= self.max_wait_seconds:
+                starved.append(candidate)
+            else:
+                others.append(candidate)
+
+        starved.sort(key=lambda c: c.job_id)
+        others.sort(key=lambda c: (
+            running_by_submitter.get(c.submitter, 0),
+            self.effective_size(c, now),
+            c.job_id,
+        ))
+        return starved + others
+
+    def effective_size(self, candidate: JobCandidate, now: Optional[datetime] = None) -> float:
+        wait = self._wait_seconds(candidate, now or datetime.now())
+        return candidate.size / (1.0 + wait / self.aging_seconds)
+
+    def _wait_seconds(self, candidate: JobCandidate, now: datetime) -> float:
+        if not candidate.enqueued_at:
+            return 0.0
+        return max(0.0, (now - candidate.enqueued_at).total_seconds())
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+import threading
+import logging
+from typing import Any, Callable, Dict, Hashable, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class FlightAborted(Exception):
+    """
+    领头调用因自身原因中止 (如所属任务被暂停)，由 fn 抛出并包装原异常：
+    领头调用者收到原异常，等待者不共享它，而是重新发起调用。
+    """
+
+    def __init__(self, error: BaseException):
+        super().__init__(str(error))
+        self.error = error
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+        self.aborted = False
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    合并相同 key 的并发调用：同一时刻只有第一个调用者真正执行 fn，
+    其余调用者等待并共享其结果 (或异常)。调用结束后不缓存结果。
+    fn 抛出 FlightAborted 时等待者重新调用 (其中一个成为新的领头调用者)。
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                if call is not None:
+                    call.waiters += 1
+                    self.coalesced += 1
+                    leader = False
+                else:
+                    call = _Call()
+                    self._calls[key] = call
+                    self.executed += 1
+                    leader = True
+
+            if not leader:
+                call.done.wait()
+                if call.aborted:
+                    continue
+                if call.error is not None:
+                    raise call.error
+                return call.result
+
+            try:
+                call.result = fn()
+                return call.result
+            except FlightAborted as e:
+                call.aborted = True
+                raise e.error
+            except BaseException as e:
+                call.error = e
+                raise
+            finally:
+                with self._lock:
+                    self._calls.pop(key, None)
+                call.done.set()
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {"executed": self.executed, "coalesced": self.coalesced, "inFlight": len(self._calls)}
+
+
+translation_flight = SingleFlight()
@@ -1,28 +1,208 @@
 import os
+import json
+import gzip
+import queue
+import atexit
+import threading
 import yaml
 import logging
 import datetime
 from pathlib import Path
-from .config import TASKS_DIR
+from typing import Any, Callable, Dict, List, Optional
+from .config import TASKS_DIR, PIPELINE_CONFIG
+from .debug_capture import redact_headers, redact_secrets
 
 logger = logging.getLogger(__name__)
 
-class TaskLogger:
-    def __init__(self, task_id: str):
-        self.task_id = task_id
-        self.task_dir = TASKS_DIR / task_id
-        self.log_file = self.task_dir / "network.log.yaml"
+LOG_BASENAME = "network.log"
+# 旧版本写入的 YAML 日志 (多文档，以 --- 分隔)，只读
+LEGACY_LOG_NAME = "network.log.yaml"
+
+
+def _log_path(task_dir: Path, compress: bool, generation: int = 0) -> Path:
+    """generation 为 0 表示正在写入的文件，1..N 为轮转后的旧文件 (数字越大越旧)"""
+    suffix = ".jsonl.gz" if compress else ".jsonl"
+    if generation == 0:
+        return task_dir / f"{LOG_BASENAME}{suffix}"
+    return task_dir / f"{LOG_BASENAME}.{generation}{suffix}"
+
+
+class _FlushMarker:
+    def __init__(self):
+        self.done = threading.Event()
+
+
+class NetworkLogWriter:
+    """
+    任务网络日志的后台写入器。
+
+    调用方只把日志条目放入有界队列 (队列已满时丢弃并计数)，不在网络请求线程上做序列化与文件 IO；
+    条目中的请求/响应可以是 SDK 对象，由提交时给出的 serializer 在后台线程转换，写入前隐藏鉴权信息。
+    后台线程按批取出，按任务分组追加为 JSON Lines，可选 gzip 压缩，单个文件超过大小上限时轮转。
+    """
+
+    def __init__(self):
+        self._queue: Optional[queue.Queue] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._closed = False
+        self.dropped = 0
+        self.written = 0
 
-        # Ensure directory exists
-        if not self.task_dir.exists():
+    def _ensure_started(self) -> bool:
+        if self._thread is not None:
+            return True
+        with self._lock:
+            if self._closed:
+                return False
+            if self._thread is None:
+                self._queue = queue.Queue(maxsize=int(PIPELINE_CONFIG.get("network_log_queue_size") or 10000))
+                thread = threading.Thread(target=self._run, name="NetworkLogWriter", daemon=True)
+                thread.start()
+                self._thread = thread
+        return True
+
+    def submit(self, task_id: str, entry: Dict[str, Any],
+               serializer: Optional[Callable[[Any], Any]] = None) -> None:
+        if not self._ensure_started():
+            return
+        try:
+            self._queue.put_nowait((task_id, entry, serializer))
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                logger.warning(f"Network log queue full, dropped={self.dropped}")
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """等待此前提交的日志全部写入文件"""
+        if self._thread is None or not self._thread.is_alive():
+            return True
+        marker = _FlushMarker()
+        try:
+            self._queue.put(marker, timeout=timeout)
+        except queue.Full:
+            return False
+        return marker.done.wait(timeout)
+
+    def close(self, timeout: float = 5.0) -> None:
+        """写完队列中的日志后停止后台线程"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        if self._thread is None:
+            return
+        self.flush(timeout)
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        batch_size = int(PIPELINE_CONFIG.get("network_log_batch_size") or 500)
+        flush_seconds = float(PIPELINE_CONFIG.get("network_log_flush_seconds") or 0.5)
+        while True:
+            item = self._queue.get()
+            batch = [item]
+            # 短暂等待攒批，减少同一任务文件的反复打开
+            deadline = datetime.datetime.now() + datetime.timedelta(seconds=flush_seconds)
+            while len(batch) < batch_size and isinstance(batch[-1], tuple):
+                remaining = (deadline - datetime.datetime.now()).total_seconds()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            pending: Dict[str, List[Dict[str, Any]]] = {}
+            for entry in batch:
+                if isinstance(entry, tuple):
+                    task_id, item, serializer = entry
+                    pending.setdefault(task_id, []).append(self._prepare(item, serializer))
+                    continue
+                # 刷新标记/停止信号：先写出之前收到的日志
+                self._write_batches(pending)
+                pending = {}
+                if entry is None:
+                    return
+                entry.done.set()
+            self._write_batches(pending)
+
+    def _prepare(self, entry: Dict[str, Any], serializer: Optional[Callable[[Any], Any]]) -> Dict[str, Any]:
+        for field in ("request", "response"):
+            if field not in entry:
+                continue
+            value = entry[field]
+            if serializer is not None:
+                try:
+                    value = serializer(value)
+                except Exception as e:
+                    value = f"<unserializable: {e}>"
+            entry[field] = redact_secrets(value)
+        return entry
+
+    def _write_batches(self, pending: Dict[str, List[Dict[str, Any]]]) -> None:
+        for task_id, entries in pending.items():
             try:
-                self.task_dir.mkdir(parents=True, exist_ok=True)
+                self._write_task(task_id, entries)
+                self.written += len(entries)
             except Exception as e:
-                logger.error(f"Failed to create task dir for logging: {e}")
+                logger.error(f"Failed to write network log for task {task_id}: {e}")
+
+    def _write_task(self, task_id: str, entries: List[Dict[str, Any]]) -> None:
+        compress = bool(PIPELINE_CONFIG.get("network_log_compress"))
+        task_dir = TASKS_DIR / task_id
+        task_dir.mkdir(parents=True, exist_ok=True)
+        path = _log_path(task_dir, compress)
+        self._rotate_if_needed(task_dir, path, compress)
 
-    def log(self, action: str, request: dict = None, response: dict = None, error: str = None, service: str = None):
+        lines = "".join(json.dumps(entry, ensure_ascii=False, default=str) + "\n" for entry in entries)
+        if compress:
+            # 追加写入产生多成员 gzip 文件，gzip 读取时按一个连续流处理
+            with gzip.open(path, "at", encoding="utf-8") as f:
+                f.write(lines)
+        else:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(lines)
+
+    def _rotate_if_needed(self, task_dir: Path, path: Path, compress: bool) -> None:
+        max_bytes = int(PIPELINE_CONFIG.get("network_log_max_bytes") or 0)
+        if max_bytes <= 0 or not path.exists() or path.stat().st_size < max_bytes:
+            return
+        backups = max(1, int(PIPELINE_CONFIG.get("network_log_backups") or 3))
+        oldest = _log_path(task_dir, compress, backups)
+        if oldest.exists():
+            oldest.unlink()
+        for generation in range(backups - 1, 0, -1):
+            src = _log_path(task_dir, compress, generation)
+            if src.exists():
+                os.replace(src, _log_path(task_dir, compress, generation + 1))
+        os.replace(path, _log_path(task_dir, compress, 1))
+
+
+network_log_writer = NetworkLogWriter()
+atexit.register(network_log_writer.close)
+
+
+def _redact_request(request: Any) -> Any:
+    if isinstance(request, dict) and isinstance(request.get("headers"), dict):
+        headers = redact_headers(request["headers"])
+        if headers is not request["headers"]:
+            return {**request, "headers": headers}
+    return request
+
+
+class TaskLogger:
+    def __init__(self, task_id: str):
+        self.task_id = task_id
+
+    def log(self, action: str, request: dict = None, response: dict = None, error: str = None, service: str = None,
+            serializer: Optional[Callable[[Any], Any]] = None, **extra):
         """
-        Logs a network action to the task's network log file.
+        Logs a network action to the task's network log file (written asynchronously).
+        serializer: 把 request/response (如 SDK 对象) 转为可 JSON 化的结构，在后台写入线程调用
         """
         entry = {
             "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f"),
@@ -30,23 +210,67 @@ class TaskLogger:
             "service": service,
         }
 
+        # 鉴权头在入队前替换，日志文件与日志接口都不会出现密钥
         if request:
-            entry["request"] = request
+            entry["request"] = _redact_request(request)
         if response:
             entry["response"] = response
         if error:
             entry["error"] = str(error)
+        entry.update({key: value for key, value in extra.items() if value is not None})
 
-        try:
-            with open(self.log_file, "a", encoding="utf-8") as f:
-                f.write("---\n")
-                yaml.safe_dump(entry, f, allow_unicode=True, sort_keys=False)
-                f.write("\n")
-        except Exception as e:
-            logger.error(f"Failed to write to task log: {e}")
+        network_log_writer.submit(self.task_id, entry, serializer)
 
 # Helper function for easy usage
 def log_task_network(task_id: str, action: str, **kwargs):
     if not task_id:
         return
     TaskLogger(task_id).log(action, **kwargs)
+
+
+def read_task_network(task_id: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    按时间顺序读取任务的网络日志：旧版 YAML 日志、轮转后的 JSON Lines 文件 (含 gzip) 与当前文件。
+    limit 不为空时只返回最后 limit 条。
+    """
+    task_dir = TASKS_DIR / task_id
+    entries: List[Dict[str, Any]] = []
+
+    legacy = task_dir / LEGACY_LOG_NAME
+    if legacy.exists():
+        try:
+            with open(legacy, "r", encoding="utf-8") as f:
+                entries.extend(doc for doc in yaml.safe_load_all(f) if isinstance(doc, dict))
+        except Exception as e:
+            logger.warning(f"Failed to read legacy network log {legacy}: {e}")
+
+    backups = max(1, int(PIPELINE_CONFIG.get("network_log_backups") or 3))
+    paths: List[Path] = []
+    for generation in range(backups, -1, -1):
+        for compress in (False, True):
+            path = _log_path(task_dir, compress, generation)
+            if path.exists():
+                paths.append(path)
+    # 压缩设置可能变化过，按修改时间排序保证先旧后新
+    paths.sort(key=lambda p: p.stat().st_mtime)
+
+    for path in paths:
+        opener = gzip.open if path.suffix == ".gz" else open
+        try:
+            with opener(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        # 进程中断时可能留下不完整的最后一行
+                        continue
+        except (OSError, EOFError) as e:
+            logger.warning(f"Failed to read network log {path}: {e}")
+
+    if limit is not None and limit >= 0:
+        entries = entries[-limit:] if limit else []
+    # 旧版本写入的日志可能含有未隐藏的鉴权头
+    return [redact_secrets(entry) for entry in entries]
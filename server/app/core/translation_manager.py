@@ -1,19 +1,54 @@
 # -*- coding: utf-8 -*-
 import os
+import re
+import json
+import time
 import threading
 import logging
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
 from typing import Any, Dict, List, Optional, Tuple, Union
 
-import yaml
-
 from ..core.database import SessionLocal
-from ..models.sql_models import Task, Config
+from ..models.sql_models import Task, Config, TaskTranslation
 from ..core.layout_translator import LayoutTranslator
+from ..core.pdf_pages import parse_page_range
+from ..core.config import PIPELINE_CONFIG
+from ..core.job_queue import job_queue, QueueConsumer, JobInterrupted, JobControlled, INTERRUPT_ACTION
+from ..core.debug_capture import debug_capture
+from ..core.result_store import (
+    TRANSLATION_FIELDS, load_result, save_result, merge_external_edits, translation_snapshot, path_lock, is_stale,
+)
 
 logger = logging.getLogger(__name__)
 
 
+def translation_yaml_path(task_dir: str, lang: Optional[str] = None) -> str:
+    """主目标语言的译文与解析结果同在 parse_result.yaml，附加目标语言在 translations/<lang>.yaml"""
+    if not lang:
+        return os.path.join(task_dir, "parse_result.yaml")
+    safe_lang = re.sub(r"[^A-Za-z0-9_-]", "_", lang)
+    return os.path.join(task_dir, "translations", f"{safe_lang}.yaml")
+
+
+def translation_debug_log_path(task_dir: str, lang: Optional[str] = None) -> str:
+    """翻译 HTTP 调试日志，附加目标语言各自一个文件"""
+    if not lang:
+        return os.path.join(task_dir, "layout_translator_debug.log")
+    safe_lang = re.sub(r"[^A-Za-z0-9_-]", "_", lang)
+    return os.path.join(task_dir, "translations", f"{safe_lang}_debug.log")
+
+
+def interactive_debug_log_path(task_dir: str, lang: Optional[str] = None) -> str:
+    """交互翻译的 HTTP 调试日志，与批量翻译分开 (各自的内存缓冲区互不影响)"""
+    root, ext = os.path.splitext(translation_debug_log_path(task_dir, lang))
+    return f"{root}_interactive{ext}"
+
+
+class InteractiveLaneBusy(RuntimeError):
+    """交互翻译通道已满"""
+
+
 class TranslationManager:
     _instance = None
     _lock = threading.Lock()
@@ -29,187 +64,632 @@ class TranslationManager:
     def __init__(self):
         if self.initialized:
             return
-        self.executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="TranslateWorker")
-        self.active_tasks = {}
+        self.consumer = QueueConsumer(
+            stage="translate",
+            handler=self._handle_job,
+            max_workers=int(PIPELINE_CONFIG.get("translate_workers") or 2),
+            name="TranslateWorker",
+            lease_seconds=int(PIPELINE_CONFIG.get("job_lease_seconds") or 60),
+            on_control=self.control_task,
+            on_lease_lost=self.interrupt_job,
+        )
+        # 全局停止 (服务关闭)；单个任务通过各自的 stop event 停止
+        # task_events / task_controls 以运行标识为键: 主目标语言为 task_id，附加目标语言为 "task_id:lang"
         self.stop_event = threading.Event()
+        self.task_events: Dict[str, threading.Event] = {}
+        self.task_controls: Dict[str, str] = {}
+        # 原文修改后延迟触发的译文刷新，以运行标识为键
+        self.refresh_timers: Dict[str, threading.Timer] = {}
+        self.refresh_lock = threading.Lock()
+        # 翻译任务上次保存结果文件后的修改时间，用于发现期间的外部编辑
+        self.saved_mtimes: Dict[str, int] = {}
+        # 上次保存时各布局译文字段的快照，文件中与之不同的译文来自单独翻译或手动编辑
+        self.saved_translations: Dict[str, List[Tuple]] = {}
+        # 交互式单段翻译的预留通道，不经过批量翻译队列；排队与执行中的请求总数不超过 interactive_translate_queue
+        interactive_workers = int(PIPELINE_CONFIG.get("interactive_translate_workers") or 2)
+        self.interactive_executor = ThreadPoolExecutor(
+            max_workers=interactive_workers, thread_name_prefix="InteractiveTranslate"
+        )
+        self.interactive_slots = threading.BoundedSemaphore(
+            max(interactive_workers, int(PIPELINE_CONFIG.get("interactive_translate_queue") or 8))
+        )
         self.initialized = True
 
-    def submit_task(self, task_id: str):
+    def start(self, max_workers: Optional[int] = None):
+        """开始从持久化队列消费翻译任务，并重新入队未完成的任务"""
+        self.consumer.start(max_workers)
+        self.resume_tasks()
+
+    def submit_task(self, task_id: str, resume: bool = False, lang: Optional[str] = None,
+                    size: Optional[int] = None):
+        """
+        resume 为 True 时保留已翻译的布局，只翻译剩余部分。
+        lang 为附加目标语言时单独入队，与其他语言的翻译并发执行。
+        size 覆盖调度用的任务大小 (默认为布局数)。
+        """
         if self.stop_event.is_set():
             logger.warning(f"Cannot submit task {task_id}: manager is stopping")
             return
 
-        if task_id in self.active_tasks and not self.active_tasks[task_id].done():
-            logger.warning(f"Task {task_id} is already running")
-            return
-
-        future = self.executor.submit(self._execute_task, task_id)
-        self.active_tasks[task_id] = future
-        logger.info(f"Task {task_id} submitted to pool")
+        payload: Dict[str, Any] = {}
+        if resume:
+            payload["resume"] = True
+        if lang:
+            payload["lang"] = lang
+        meta = self._job_meta(task_id)
+        if size:
+            meta["size"] = size
+        job_queue.enqueue("translate", task_id, payload or None, variant=lang, **meta)
+        self.consumer.notify()
+        logger.info(f"Task {task_id} submitted to queue: lang={lang or 'primary'}")
+
+    def _job_meta(self, task_id: str) -> dict:
+        """调度所需的任务信息: 提交者、布局数与翻译引擎"""
+        db = SessionLocal()
+        try:
+            task = db.query(Task).filter(Task.task_id == task_id).first()
+            if not task:
+                return {}
+            config = db.query(Config).first()
+            return {
+                "submitter": task.submitter,
+                "size": task.layout_count or 1,
+                "engine": (config.translation_engine if config else None) or "llm",
+            }
+        finally:
+            db.close()
 
-    def stop_all(self):
+    def stop_all(self, wait: bool = False):
         """Stops all running translation tasks."""
         logger.info("Stopping all translation tasks...")
         self.stop_event.set()
+        with self.refresh_lock:
+            for timer in self.refresh_timers.values():
+                timer.cancel()
+            self.refresh_timers.clear()
+        for event in list(self.task_events.values()):
+            event.set()
+        self.interactive_executor.shutdown(wait=False)
+        self.consumer.stop(wait=wait)
+
+    def control_task(self, task_id: str, action: str):
+        """暂停/取消任务的全部目标语言翻译 (action: pause / cancel)，只影响在本进程运行的任务"""
+        for run_key, event in list(self.task_events.items()):
+            if run_key != task_id and not run_key.startswith(f"{task_id}:"):
+                continue
+            self.task_controls[run_key] = action
+            logger.info(f"Stopping translation {run_key}: {action}")
+            event.set()
+
+    def interrupt_job(self, job: dict):
+        """队列租约丢失时停止该次翻译 (只停对应目标语言)，停止后不再写入状态与结果文件"""
+        lang = (job.get("payload") or {}).get("lang") or None
+        run_key = self._run_key(job["task_id"], lang)
+        self.task_controls[run_key] = INTERRUPT_ACTION
+        event = self.task_events.get(run_key)
+        if event:
+            logger.warning(f"Stopping translation {run_key}: lease lost")
+            event.set()
+
+    def translate_interactive(self, task_id: str, index: Optional[int] = None, text: Optional[str] = None,
+                              lang: Optional[str] = None) -> Future:
+        """
+        在预留通道中立即翻译任务的一个布局 (index) 或任意文本 (text)，使用任务的语言与系统翻译配置。
+        布局译文原地写回结果文件。通道已满时抛出 InteractiveLaneBusy。
+        """
+        if not self.interactive_slots.acquire(blocking=False):
+            raise InteractiveLaneBusy("交互翻译繁忙，请稍后重试")
         try:
-            # cancel_futures is available in Python 3.9+
-            self.executor.shutdown(wait=False, cancel_futures=True)
+            future = self.interactive_executor.submit(self._translate_interactive, task_id, index, text, lang)
         except Exception:
-            self.executor.shutdown(wait=False)
+            self.interactive_slots.release()
+            raise
+        future.add_done_callback(lambda _: self.interactive_slots.release())
+        return future
+
+    def _translate_interactive(self, task_id: str, index: Optional[int], text: Optional[str],
+                               lang: Optional[str]) -> Dict[str, Any]:
+        started = time.time()
+        db = SessionLocal()
+        try:
+            task = db.query(Task).filter(Task.task_id == task_id).first()
+            if not task:
+                raise LookupError("任务不存在")
+            config = db.query(Config).first()
+            config_error = self._config_error(config)
+            if config_error:
+                raise ValueError(config_error)
+            if lang == task.target_lang:
+                lang = None
+            output_dir = os.path.dirname(task.file_path)
+            translator = self.build_translator(
+                config, task, lang, output_dir, debug_output_path=interactive_debug_log_path(output_dir, lang)
+            )
+        finally:
+            db.close()
 
-        # Clear active tasks tracking
-        self.active_tasks.clear()
+        failed = True
+        try:
+            result = self._run_interactive(translator, task_id, output_dir, index, text, lang, started)
+            failed = False
+            return result
+        finally:
+            # 失败时补写内存中最近的 HTTP 交互，否则丢弃
+            debug_capture.finish(translator.debug_output_path, failed=failed)
+
+    def _run_interactive(self, translator: LayoutTranslator, task_id: str, output_dir: str,
+                         index: Optional[int], text: Optional[str], lang: Optional[str],
+                         started: float) -> Dict[str, Any]:
+        max_retries = int(PIPELINE_CONFIG.get("interactive_translate_retries") or 0)
+        if index is None:
+            translated, engine, model = translator.translate_text(text or "", max_retries=max_retries)
+            return {
+                "translatedMarkdownContent": translated,
+                "engine": engine,
+                "model": model,
+                "elapsedMs": int((time.time() - started) * 1000),
+            }
+
+        yaml_path = translation_yaml_path(output_dir, lang)
+        if not os.path.exists(yaml_path):
+            raise LookupError("未找到翻译结果")
+        _, layouts = load_result(yaml_path)
+        if index < 0 or index >= len(layouts):
+            raise ValueError("Invalid index")
+        item = dict(layouts[index])
+        translated = translator.translate_layout(item, max_retries=max_retries)
+
+        # 翻译期间文件可能已被批量任务或编辑更新，重新读取后只写入该布局的译文字段
+        with path_lock(yaml_path):
+            data, layouts = load_result(yaml_path)
+            target = layouts[index]
+            for field in ("translatedMarkdownContent", "translationEngine", "translationModel", "sourceHash"):
+                if field in item:
+                    target[field] = item[field]
+                else:
+                    target.pop(field, None)
+            target.pop("translationError", None)
+            target.pop("mergeGroup", None)
+            save_result(yaml_path, data, layouts)
+        self._clear_failed_layout(task_id, lang, index)
+
+        logger.info(f"Interactive translation done: task={self._run_key(task_id, lang)}, index={index}")
+        return {
+            "index": index,
+            "translatedMarkdownContent": translated,
+            "engine": item.get("translationEngine"),
+            "model": item.get("translationModel") or "",
+            "elapsedMs": int((time.time() - started) * 1000),
+        }
+
+    def _clear_failed_layout(self, task_id: str, lang: Optional[str], index: int) -> None:
+        """单独翻译成功的布局从失败列表移除，全部补齐后部分完成的任务转为已完成"""
+        db = SessionLocal()
+        try:
+            if lang:
+                record = (
+                    db.query(TaskTranslation)
+                    .filter(TaskTranslation.task_id == task_id, TaskTranslation.target_lang == lang)
+                    .first()
+                )
+            else:
+                record = db.query(Task).filter(Task.task_id == task_id).first()
+            if record is None or not record.failed_layouts:
+                return
+            failed = [i for i in json.loads(record.failed_layouts) if i != index]
+            record.failed_layouts = json.dumps(failed) if failed else None
+            if not failed and record.status == "partial":
+                record.status = "completed"
+                record.message = "翻译完成"
+            db.commit()
+        finally:
+            db.close()
 
-    def _execute_task(self, task_id: str):
-        if self.stop_event.is_set():
-            logger.info(f"Task {task_id} skipped due to shutdown")
+    def schedule_refresh(self, task_id: str, lang: Optional[str] = None):
+        """
+        原文被编辑后延迟刷新译文：连续编辑只在最后一次编辑
+        translate_refresh_debounce_seconds 秒后触发一次，配置为 0 时不自动刷新。
+        """
+        delay = float(PIPELINE_CONFIG.get("translate_refresh_debounce_seconds") or 0)
+        if delay <= 0 or self.stop_event.is_set():
             return
+        run_key = self._run_key(task_id, lang)
+        timer = threading.Timer(delay, self._refresh_due, args=(task_id, lang))
+        timer.daemon = True
+        with self.refresh_lock:
+            previous = self.refresh_timers.pop(run_key, None)
+            if previous:
+                previous.cancel()
+            self.refresh_timers[run_key] = timer
+        timer.start()
+
+    def _refresh_due(self, task_id: str, lang: Optional[str]):
+        with self.refresh_lock:
+            self.refresh_timers.pop(self._run_key(task_id, lang), None)
+        try:
+            self.refresh_stale(task_id, lang)
+        except Exception as e:
+            logger.error(f"Refresh stale translations failed for {self._run_key(task_id, lang)}: {e}", exc_info=True)
+
+    def refresh_stale(self, task_id: str, lang: Optional[str] = None) -> int:
+        """
+        只重新翻译原文在翻译后被修改的布局 (以恢复方式入队，未修改的译文直接沿用)。
+        翻译仍在进行时推迟到其结束后；暂停/取消的任务不自动启动。返回过期布局数。
+        """
+        run_key = self._run_key(task_id, lang)
+        db = SessionLocal()
+        try:
+            task = db.query(Task).filter(Task.task_id == task_id).first()
+            if not task or (task.parse_progress or 0) < 100:
+                return 0
+            if lang:
+                record = (
+                    db.query(TaskTranslation)
+                    .filter(TaskTranslation.task_id == task_id, TaskTranslation.target_lang == lang)
+                    .first()
+                )
+            else:
+                record = task
+            if record is None:
+                return 0
+
+            yaml_path = translation_yaml_path(os.path.dirname(task.file_path), lang)
+            if not os.path.exists(yaml_path):
+                return 0
+            _, layouts = load_result(yaml_path)
+            stale = sum(1 for item in layouts if isinstance(item, dict) and is_stale(item))
+            if stale == 0:
+                return 0
+
+            if job_queue.has_active_job("translate", task_id, variant=lang):
+                logger.info(f"Task {run_key} translation in progress, refresh postponed: stale={stale}")
+                self.schedule_refresh(task_id, lang)
+                return stale
+            if record.status not in ("completed", "partial", "failed"):
+                logger.info(f"Task {run_key} is {record.status}, skip refreshing stale translations")
+                return stale
+
+            record.status = "pending"
+            record.message = f"等待更新 {stale} 个已修改布局的译文..."
+            db.commit()
+        finally:
+            db.close()
+
+        logger.info(f"Refreshing stale translations: task={run_key}, stale={stale}")
+        self.submit_task(task_id, resume=True, lang=lang, size=stale)
+        return stale
+
+    def _run_key(self, task_id: str, lang: Optional[str]) -> str:
+        return f"{task_id}:{lang}" if lang else task_id
 
-        logger.info(f"Starting translation for task {task_id}")
+    def resume_tasks(self):
+        """启动时为翻译中且不在队列中的任务重新入队"""
+        db = SessionLocal()
+        try:
+            tasks = (
+                db.query(Task)
+                .filter(
+                    Task.status.in_(["pending", "processing"]),
+                    Task.parse_progress >= 100,
+                    Task.translate_progress < 100,
+                )
+                .all()
+            )
+            task_ids = [task.task_id for task in tasks]
+            translations = [
+                (row.task_id, row.target_lang)
+                for row in db.query(TaskTranslation)
+                .filter(TaskTranslation.status.in_(["pending", "processing"]), TaskTranslation.translate_progress < 100)
+                .all()
+            ]
+        finally:
+            db.close()
+
+        for task_id in task_ids:
+            if job_queue.has_active_job("translate", task_id):
+                continue
+            logger.info(f"Resuming translation task {task_id}")
+            self.submit_task(task_id, resume=True)
+        for task_id, lang in translations:
+            if job_queue.has_active_job("translate", task_id, variant=lang):
+                continue
+            logger.info(f"Resuming translation task {task_id}: lang={lang}")
+            self.submit_task(task_id, resume=True, lang=lang)
+
+    def _handle_job(self, task_id: str, job: dict):
+        payload = job.get("payload") or {}
+        lang = payload.get("lang") or None
+        run_key = self._run_key(task_id, lang)
+        self.task_controls.pop(run_key, None)
+        if self.stop_event.is_set():
+            raise JobInterrupted()
+        task_event = threading.Event()
+        self.task_events[run_key] = task_event
+        try:
+            self._execute_task(task_id, resume=bool(payload.get("resume")), lang=lang, task_event=task_event)
+        finally:
+            self.task_events.pop(run_key, None)
+            action = self.task_controls.pop(run_key, None)
+        if action:
+            raise JobControlled(action)
+        if self.stop_event.is_set():
+            # 服务停止导致翻译中断，归还队列等待恢复
+            raise JobInterrupted()
+
+    def _execute_task(self, task_id: str, resume: bool = False, lang: Optional[str] = None,
+                      task_event: Optional[threading.Event] = None):
+        """
+        lang 为空时翻译主目标语言 (Task.target_lang)，结果写回 parse_result.yaml；
+        否则以 parse_result.yaml 为原文翻译到附加目标语言，状态记录在 TaskTranslation。
+        """
+        run_key = self._run_key(task_id, lang)
+        logger.info(f"Starting translation for task {task_id}: resume={resume}, lang={lang or 'primary'}")
         db = SessionLocal()
-        task: Optional[Task] = None
+        # record 为 Task 或 TaskTranslation，二者的状态/进度字段同名
+        record: Optional[Union[Task, TaskTranslation]] = None
+        task_event = task_event or threading.Event()
         try:
             task = db.query(Task).filter(Task.task_id == task_id).first()
             if not task:
                 logger.error(f"Task {task_id} not found in database")
                 return
 
+            if lang:
+                record = (
+                    db.query(TaskTranslation)
+                    .filter(TaskTranslation.task_id == task_id, TaskTranslation.target_lang == lang)
+                    .first()
+                )
+                if record is None:
+                    record = TaskTranslation(task_id=task_id, target_lang=lang, status="pending", translate_progress=0)
+                    db.add(record)
+                    db.commit()
+            else:
+                record = task
+
             if (task.parse_progress or 0) < 100:
                 logger.warning(f"Task {task_id} parse not finished: parse_progress={task.parse_progress}")
-                task.status = "failed"
-                task.message = "解析未完成，无法开始翻译"
+                record.status = "failed"
+                record.message = "解析未完成，无法开始翻译"
                 db.commit()
                 return
 
             config = db.query(Config).first()
-            if not config:
-                logger.warning(f"Task {task_id} missing config")
-                task.status = "failed"
-                task.message = "系统配置缺失"
+            config_error = self._config_error(config)
+            if config_error:
+                logger.warning(f"Task {task_id} invalid config: {config_error}")
+                record.status = "failed"
+                record.message = config_error
                 db.commit()
                 return
 
-            translation_engine = config.translation_engine or "llm"
-            if translation_engine == "llm":
-                if not config.llm_api_key:
-                    logger.warning(f"Task {task_id} missing LLM config")
-                    task.status = "failed"
-                    task.message = "系统配置缺失 (请在设置页面配置 LLM API Key)"
-                    db.commit()
-                    return
-            elif translation_engine == "aliyun":
-                if not config.aliyun_access_key_id or not config.aliyun_access_key_secret:
-                    logger.warning(f"Task {task_id} missing Aliyun MT config")
-                    task.status = "failed"
-                    task.message = "系统配置缺失 (请在设置页面配置阿里云 Access Key)"
-                    db.commit()
-                    return
-
             output_dir = os.path.dirname(task.file_path)
-            yaml_path = os.path.join(output_dir, "parse_result.yaml")
-            if not os.path.exists(yaml_path):
-                logger.warning(f"Task {task_id} parse_result.yaml not found: {yaml_path}")
-                task.status = "failed"
-                task.message = "未找到解析结果 parse_result.yaml"
+            source_path = translation_yaml_path(output_dir)
+            if not os.path.exists(source_path):
+                logger.warning(f"Task {task_id} parse_result.yaml not found: {source_path}")
+                record.status = "failed"
+                record.message = "未找到解析结果 parse_result.yaml"
                 db.commit()
                 return
+            yaml_path = translation_yaml_path(output_dir, lang)
 
-            task.status = "processing"
-            task.translate_progress = 0
-            task.message = "正在加载解析结果..."
+            record.status = "processing"
+            if not resume:
+                record.translate_progress = 0
+            record.message = "正在加载解析结果..."
             db.commit()
 
-            data, layouts = self._load_yaml_layouts(yaml_path)
+            if lang and resume and os.path.exists(yaml_path):
+                data, layouts = self._load_yaml_layouts(yaml_path)
+            elif lang:
+                # 附加目标语言共享同一份解析结果，去掉主目标语言的译文后另存
+                data, layouts = self._load_yaml_layouts(source_path)
+                for item in layouts:
+                    if isinstance(item, dict):
+                        for field in TRANSLATION_FIELDS:
+                            item.pop(field, None)
+                os.makedirs(os.path.dirname(yaml_path), exist_ok=True)
+                self._save_yaml_layouts(yaml_path, data, layouts)
+            else:
+                data, layouts = self._load_yaml_layouts(yaml_path)
+            self.saved_mtimes[yaml_path] = os.stat(yaml_path).st_mtime_ns
+            self.saved_translations[yaml_path] = translation_snapshot(layouts)
             total = len(layouts)
             logger.info(f"Task {task_id} loaded layouts: total={total}, yaml={yaml_path}")
 
-            source_lang = self._normalize_lang(task.source_lang or "English")
-            target_lang = self._normalize_lang(task.target_lang or "Chinese")
-
-            model = config.llm_model or "qwen-mt-flash"
-            base_url = config.llm_endpoint or "https://dashscope.aliyuncs.com/compatible-mode/v1"
-            logger.info(
-                f"Task {task_id} translation config: engine={translation_engine}, model={model}, base_url={base_url}, source_lang={source_lang}, target_lang={target_lang}"
-            )
+            translator = self.build_translator(config, task, lang, output_dir)
 
-            translator = LayoutTranslator(
-                api_key=config.llm_api_key,
-                source_lang=source_lang,
-                target_lang=target_lang,
-                model=model,
-                base_url=base_url,
-                translation_engine=translation_engine,
-                aliyun_access_key_id=config.aliyun_access_key_id,
-                aliyun_access_key_secret=config.aliyun_access_key_secret,
-                debug_output_path=os.path.join(output_dir, "layout_translator_debug.log"),
-                debug=True
-            )
+            # 按视口优先翻译时布局完成顺序不固定，进度按已处理的布局数计算
+            processed = 0
 
             def on_item(idx: int, result: str, skipped: bool):
+                nonlocal processed
+                if self.task_controls.get(run_key) == INTERRUPT_ACTION:
+                    return
                 try:
+                    processed += 1
                     if total > 0:
-                        progress = int(((idx + 1) / total) * 100)
+                        progress = int((processed / total) * 100)
                     else:
                         progress = 100
 
-                    task.translate_progress = min(100, max(0, progress))
+                    record.translate_progress = min(100, max(0, progress))
                     if skipped:
-                        task.message = f"已跳过 {idx + 1}/{total}"
+                        record.message = f"已跳过 {processed}/{total}"
                     else:
-                        task.message = f"翻译中 {idx + 1}/{total}"
+                        record.message = f"翻译中 {processed}/{total}"
                     db.commit()
 
                     self._save_yaml_layouts(yaml_path, data, layouts)
                 except Exception as e:
-                    logger.error(f"Error in translation callback for task {task_id}: {e}")
+                    logger.error(f"Error in translation callback for task {run_key}: {e}")
 
             translation_ok = True
+            failed_indices: List[int] = []
             finish_info: Dict[str, Any] = {}
 
             def on_finish(cb_task_id: Optional[str], status: str, info: Dict[str, Any]):
-                nonlocal translation_ok, finish_info
+                nonlocal translation_ok, finish_info, failed_indices
                 finish_info = info or {}
-                if status == "stopped":
+                if status == "partial":
+                    failed_indices = list(finish_info.get("failed_indices") or [])
+                    logger.warning(f"Task {run_key} translation partially finished: failed={failed_indices}")
+                elif status == "stopped":
                     translation_ok = False
-                    logger.info(f"Task {task_id} translation stopped")
-                    task.status = "failed" # or specific status if supported
-                    task.message = "任务已停止"
+                    action = self.task_controls.get(run_key)
+                    logger.info(f"Task {run_key} translation stopped: control={action}")
+                    if action == INTERRUPT_ACTION:
+                        # 任务已由其他 worker 接管，状态交给新的运行维护
+                        return
+                    if action == "pause":
+                        record.status = "paused"
+                        record.message = f"翻译已暂停 ({record.translate_progress or 0}%)"
+                    elif action == "cancel":
+                        record.status = "cancelled"
+                        record.message = "翻译已取消"
+                    else:
+                        record.status = "pending"
+                        record.message = "服务已停止，等待恢复翻译"
                     db.commit()
                 elif status != "success":
                     translation_ok = False
                     err = finish_info.get("error") or "翻译失败"
-                    logger.error(f"Task {task_id} translation finished with failure: {err}")
-                    task.status = "failed"
-                    task.message = str(err)
+                    logger.error(f"Task {run_key} translation finished with failure: {err}")
+                    record.status = "failed"
+                    record.message = str(err)
                     db.commit()
                 else:
-                    logger.info(f"Task {task_id} translation finished successfully: {finish_info}")
-
-            translator.translate_layouts(layouts, task_id=task_id, on_item=on_item, on_finish=on_finish, stop_event=self.stop_event)
+                    logger.info(f"Task {run_key} translation finished successfully: {finish_info}")
+
+            # page_range 入库时已规范化为闭区间，无需页数即可解析
+            pages = parse_page_range(task.page_range, 0)
+            if self.stop_event.is_set() or run_key in self.task_controls:
+                task_event.set()
+            translator.translate_layouts(
+                layouts,
+                task_id=task_id,
+                on_item=on_item,
+                on_finish=on_finish,
+                stop_event=task_event,
+                pages=set(pages) if pages is not None else None,
+                skip_translated=resume,
+                continue_on_error=bool(PIPELINE_CONFIG.get("translate_continue_on_error")),
+                viewport=lambda: self._viewport_pages(task_id),
+                viewport_poll_seconds=float(PIPELINE_CONFIG.get("viewport_poll_seconds") or 2),
+            )
+            if self.task_controls.get(run_key) == INTERRUPT_ACTION:
+                logger.warning(f"Task {run_key} lease lost, results left to the new owner")
+                return
             self._save_yaml_layouts(yaml_path, data, layouts)
 
             if not translation_ok:
-                logger.error(f"Task {task_id} translation failed: {finish_info}")
+                logger.error(f"Task {run_key} translation failed: {finish_info}")
                 return
 
-            task.status = "completed"
-            task.translate_progress = 100
-            task.message = "翻译完成"
+            # 翻译已结束时忽略迟到的暂停/取消请求
+            self.task_controls.pop(run_key, None)
+            if failed_indices:
+                record.status = "partial"
+                record.translate_progress = 100
+                record.failed_layouts = json.dumps(failed_indices)
+                record.message = f"部分翻译完成，{len(failed_indices)} 个布局翻译失败"
+                db.commit()
+                logger.info(f"Task {run_key} translation partial: failed={len(failed_indices)}")
+                return
+
+            record.status = "completed"
+            record.translate_progress = 100
+            record.failed_layouts = None
+            record.message = "翻译完成"
             db.commit()
-            logger.info(f"Task {task_id} translation completed")
+            logger.info(f"Task {run_key} translation completed")
         except Exception as e:
-            logger.error(f"Translation execution exception for {task_id}: {e}", exc_info=True)
+            logger.error(f"Translation execution exception for {run_key}: {e}", exc_info=True)
             try:
-                if task is not None:
-                    task.status = "failed"
-                    task.message = f"内部错误: {str(e)}"
+                if record is not None and self.task_controls.get(run_key) != INTERRUPT_ACTION:
+                    record.status = "failed"
+                    record.message = f"内部错误: {str(e)}"
                     db.commit()
             except Exception:
                 pass
+        finally:
+            if record is not None:
+                yaml_path = translation_yaml_path(os.path.dirname(task.file_path), lang)
+                self.saved_mtimes.pop(yaml_path, None)
+                self.saved_translations.pop(yaml_path, None)
+                try:
+                    # 失败时补写内存中最近的 HTTP 交互，便于排查
+                    debug_capture.finish(
+                        translation_debug_log_path(os.path.dirname(task.file_path), lang),
+                        failed=record.status in ("failed", "partial"),
+                    )
+                except Exception as e:
+                    logger.error(f"Error finishing debug capture for task {run_key}: {e}")
+            db.close()
+
+    def _viewport_pages(self, task_id: str) -> Optional[List[int]]:
+        """详情页最近上报的可见页码，超过 viewport_ttl_seconds 未更新时视为无人查看"""
+        db = SessionLocal()
+        try:
+            row = (
+                db.query(Task.viewport_pages, Task.viewport_updated_at)
+                .filter(Task.task_id == task_id)
+                .first()
+            )
         finally:
             db.close()
-            if task_id in self.active_tasks:
-                del self.active_tasks[task_id]
+        if not row or not row.viewport_pages:
+            return None
+        ttl = float(PIPELINE_CONFIG.get("viewport_ttl_seconds") or 0)
+        if ttl > 0 and row.viewport_updated_at and (datetime.now() - row.viewport_updated_at).total_seconds() > ttl:
+            return None
+        return json.loads(row.viewport_pages)
+
+    def _config_error(self, config: Optional[Config]) -> Optional[str]:
+        """翻译所需配置缺失时返回错误信息"""
+        if not config:
+            return "系统配置缺失"
+        translation_engine = config.translation_engine or "llm"
+        if translation_engine == "llm" and not config.llm_api_key:
+            return "系统配置缺失 (请在设置页面配置 LLM API Key)"
+        if translation_engine == "aliyun" and (not config.aliyun_access_key_id or not config.aliyun_access_key_secret):
+            return "系统配置缺失 (请在设置页面配置阿里云 Access Key)"
+        return None
+
+    def build_translator(self, config: Config, task: Task, lang: Optional[str], output_dir: str,
+                         debug_output_path: Optional[str] = None) -> LayoutTranslator:
+        """按系统配置与任务语言创建翻译器，lang 为空时翻译到任务的主目标语言"""
+        translation_engine = config.translation_engine or "llm"
+        source_lang = self._normalize_lang(task.source_lang or "English")
+        target_lang = self._normalize_lang(lang or task.target_lang or "Chinese")
+
+        model = config.llm_model or "qwen-mt-flash"
+        base_url = config.llm_endpoint or "https://dashscope.aliyuncs.com/compatible-mode/v1"
+        logger.info(
+            f"Task {task.task_id} translation config: engine={translation_engine}, model={model}, base_url={base_url}, source_lang={source_lang}, target_lang={target_lang}"
+        )
+
+        return LayoutTranslator(
+            api_key=config.llm_api_key,
+            source_lang=source_lang,
+            target_lang=target_lang,
+            model=model,
+            base_url=base_url,
+            translation_engine=translation_engine,
+            aliyun_access_key_id=config.aliyun_access_key_id,
+            aliyun_access_key_secret=config.aliyun_access_key_secret,
+            deferred_max_retries=int(PIPELINE_CONFIG.get("translate_deferred_retries") or 0),
+            deferred_backoff_seconds=float(PIPELINE_CONFIG.get("translate_deferred_backoff_seconds") or 0),
+            fallback_engine=("aliyun" if translation_engine == "llm" else "llm") if config.translation_failover else None,
+            llm_extra_keys=json.loads(config.llm_extra_keys) if config.llm_extra_keys else [],
+            aliyun_mt_extra_keys=json.loads(config.aliyun_mt_extra_keys) if config.aliyun_mt_extra_keys else [],
+            model_routes=json.loads(config.llm_model_routes) if config.llm_model_routes else [],
+            detect_language=bool(PIPELINE_CONFIG.get("translate_detect_language", True)),
+            skip_references=bool(PIPELINE_CONFIG.get("translate_skip_references", True)),
+            merge_fragments=bool(PIPELINE_CONFIG.get("translate_merge_fragments", True)),
+            debug_output_path=debug_output_path or translation_debug_log_path(output_dir, lang),
+            debug=debug_capture.enabled,
+        )
 
     def _normalize_lang(self, lang: str) -> str:
         val = (lang or "").strip()
@@ -226,31 +706,19 @@ class TranslationManager:
         return val
 
     def _load_yaml_layouts(self, yaml_path: str) -> Tuple[Union[Dict, List], List[Dict[str, Any]]]:
-        with open(yaml_path, "r", encoding="utf-8") as f:
-            data = yaml.safe_load(f)
-
-        if isinstance(data, dict):
-            layouts = data.get("layouts", [])
-            if layouts is None:
-                layouts = []
-            if not isinstance(layouts, list):
-                raise ValueError("YAML 的 layouts 字段不是数组")
-            return data, layouts
-
-        if isinstance(data, list):
-            return data, data
-
-        raise ValueError("YAML 根节点必须是 dict 或 list")
+        return load_result(yaml_path)
 
     def _save_yaml_layouts(self, yaml_path: str, data: Union[Dict, List], layouts: List[Dict[str, Any]]) -> None:
-        if isinstance(data, dict):
-            data["layouts"] = layouts
-            to_write: Union[Dict, List] = data
-        else:
-            to_write = layouts
-
-        with open(yaml_path, "w", encoding="utf-8") as f:
-            yaml.safe_dump(to_write, f, allow_unicode=True, sort_keys=False)
+        with path_lock(yaml_path):
+            sources, translations = merge_external_edits(
+                yaml_path, layouts, self.saved_mtimes.get(yaml_path), self.saved_translations.get(yaml_path)
+            )
+            if sources or translations:
+                logger.info(
+                    f"Merged edits made during translation: {yaml_path}, sources={sources}, translations={translations}"
+                )
+            self.saved_mtimes[yaml_path] = save_result(yaml_path, data, layouts)
+            self.saved_translations[yaml_path] = translation_snapshot(layouts)
 
 
 translation_manager = TranslationManager()
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+import time
+import logging
+from collections import deque
+from typing import Callable, Collection, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 页码未知的布局排在所有有页码的布局之后
+UNKNOWN_PAGE_DISTANCE = 1 << 30
+
+
+def layout_page(item: Dict) -> Optional[int]:
+    """布局所在页码 (跨页布局取第一页)"""
+    page_num = item.get("pageNum")
+    if isinstance(page_num, list):
+        page_num = page_num[0] if page_num else None
+    try:
+        return int(page_num) if page_num is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class ViewportOrder:
+    """
+    决定剩余布局的翻译顺序。
+
+    没有视口信息时按下标顺序；viewport() 返回用户正在查看的页码时，剩余布局按与这些页的距离
+    (相同距离按下标) 重新排序，视口变化后重新排序，其余布局仍在之后继续翻译。
+    viewport() 最多每 poll_seconds 秒调用一次。
+
+    合并组的片段 (member_head: 片段下标 -> 组首下标) 排到前面时改为先翻译组首，片段随组首一起完成。
+    """
+
+    def __init__(
+        self,
+        layouts: List[Dict],
+        member_head: Optional[Dict[int, int]] = None,
+        viewport: Optional[Callable[[], Optional[Collection[int]]]] = None,
+        poll_seconds: float = 2.0,
+    ):
+        self.pages = [layout_page(item) if isinstance(item, dict) else None for item in layouts]
+        self.member_head = member_head or {}
+        self.viewport = viewport
+        self.poll_seconds = max(0.0, float(poll_seconds))
+        self.remaining = set(range(len(layouts)))
+        self.queue = deque(range(len(layouts)))
+        self.current_pages: Optional[frozenset] = None
+        self.last_poll = 0.0
+
+    def next(self) -> Optional[int]:
+        """取出下一个要处理的布局下标，全部处理完时返回 None"""
+        self._poll_viewport()
+        while self.queue:
+            idx = self.queue.popleft()
+            if idx not in self.remaining:
+                continue
+            head = self.member_head.get(idx)
+            if head is not None and head in self.remaining:
+                # 片段留在原位置，组首完成后再轮到它上报
+                self.queue.appendleft(idx)
+                idx = head
+            self.remaining.discard(idx)
+            return idx
+        return None
+
+    def _poll_viewport(self) -> None:
+        if self.viewport is None:
+            return
+        now = time.time()
+        if now - self.last_poll < self.poll_seconds:
+            return
+        self.last_poll = now
+        try:
+            pages = self.viewport()
+        except Exception as e:
+            logger.warning(f"Viewport lookup failed: {e}")
+            return
+        pages = frozenset(int(p) for p in pages) if pages else None
+        if pages == self.current_pages:
+            return
+        self.current_pages = pages
+        if pages is None:
+            ordered = sorted(self.remaining)
+        else:
+            ordered = sorted(self.remaining, key=lambda idx: (self._distance(idx, pages), idx))
+            logger.info(f"Translation reprioritized for pages {sorted(pages)[:10]}: remaining={len(ordered)}")
+        self.queue = deque(ordered)
+
+    def _distance(self, idx: int, pages: frozenset) -> int:
+        page = self.pages[idx]
+        if page is None:
+            return UNKNOWN_PAGE_DISTANCE
+        return min(abs(page - p) for p in pages)
@@ -1,14 +1,15 @@
 from fastapi import FastAPI
+from fastapi.responses import Response
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 import logging
-from sqlalchemy import text
 from .api.routes import router as api_router
-from .core.config import init_directories
-from .core.database import engine, Base
+from .core.config import init_directories, embedded_workers_enabled
+from .core.database import engine, Base, migrate_schema
 from .core.logging_config import setup_logging
 from .core.pdf_parse_manager import pdf_parse_manager
 from .core.translation_manager import translation_manager
+from .core.metrics import metrics, CONTENT_TYPE as METRICS_CONTENT_TYPE
 from .models import sql_models # 确保模型被导入以便 create_all 能找到
 
 # 初始化日志配置
@@ -25,18 +26,14 @@ async def lifespan(app: FastAPI):
     Base.metadata.create_all(bind=engine)
 
     logger.info("Checking database schema...")
-    with engine.connect() as conn:
-        try:
-            # Check if column exists in configs table
-            # SQLite specific check
-            result = conn.execute(text("PRAGMA table_info(configs)"))
-            columns = [row.name for row in result.fetchall()]
-            if "translation_engine" not in columns:
-                logger.info("Adding missing column 'translation_engine' to 'configs' table")
-                conn.execute(text("ALTER TABLE configs ADD COLUMN translation_engine VARCHAR DEFAULT 'llm'"))
-                conn.commit()
-        except Exception as e:
-            logger.warning(f"Schema check failed: {e}")
+    migrate_schema()
+
+    if embedded_workers_enabled():
+        logger.info("Starting job queue consumers...")
+        pdf_parse_manager.start()
+        translation_manager.start()
+    else:
+        logger.info("Embedded workers disabled, jobs are processed by worker processes")
 
     logger.info("lifespan startup complete")
     
@@ -64,6 +61,12 @@ app.add_middleware(
 # 注册路由
 app.include_router(api_router, prefix="/api")
 
+
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    """Prometheus 文本格式的进程内指标 (独立 worker 进程中的耗时指标不在此统计)"""
+    return Response(content=metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
 logger.info("Application started successfully")
 
 if __name__ == "__main__":
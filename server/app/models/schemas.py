@@ -15,6 +15,7 @@ class TranslationTask(BaseModel):
     translateProgress: int
     createTime: str
     message: Optional[str] = None
+    pageRange: str = "all"
 
 class TaskResponse(BaseModel):
     taskId: str
@@ -29,6 +30,24 @@ class ProgressResponse(BaseModel):
 class TaskListResponse(BaseModel):
     tasks: List[TranslationTask]
 
+class LLMCredential(BaseModel):
+    apiKey: str
+    endpoint: str = ""  # 为空时使用主端点
+    weight: float = 1.0
+
+class AliyunMTCredential(BaseModel):
+    accessKeyId: str
+    accessKeySecret: str
+    weight: float = 1.0
+
+class ModelRoute(BaseModel):
+    model: str
+    types: List[str] = []
+    minChars: Optional[int] = None
+    maxChars: Optional[int] = None
+    minComplexity: Optional[float] = None
+    maxComplexity: Optional[float] = None
+
 class SystemConfig(BaseModel):
     aliyunAccessKeyId: str = ""
     aliyunAccessKeySecret: str = ""
@@ -38,11 +57,28 @@ class SystemConfig(BaseModel):
     llmModel: str = ""
     llmEndpoint: str = "https://dashscope.aliyuncs.com/compatible-mode/v1"
     translationEngine: str = "llm"
+    parseEngine: str = "docmind"
+    translationFailover: bool = False
+    llmExtraKeys: List[LLMCredential] = []
+    aliyunMtExtraKeys: List[AliyunMTCredential] = []
+    llmModelRoutes: List[ModelRoute] = []
 
 class TaskResultUpdate(BaseModel):
     index: int
     markdownContent: Optional[str] = None
     translatedMarkdownContent: Optional[str] = None
 
+class LayoutTranslateRequest(BaseModel):
+    # index 为布局下标 (译文写回结果文件)；不传 index 时翻译 text 并直接返回
+    index: Optional[int] = None
+    text: Optional[str] = None
+    lang: Optional[str] = None
+
+class ViewportUpdate(BaseModel):
+    # 详情页当前可见布局的页码 (与布局的 pageNum 一致)
+    pages: List[int] = []
+
 class TranslationSubmit(BaseModel):
     taskId: str
+    # 附加目标语言，与主目标语言共享同一份解析结果，分别翻译
+    targetLangs: Optional[List[str]] = None
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Float
+from sqlalchemy import Column, Integer, String, DateTime, Float, Text, Boolean
 from ..core.database import Base
 from datetime import datetime
 
@@ -15,6 +15,16 @@ class Task(Base):
     message = Column(String, nullable=True)
     source_lang = Column(String, default="English")
     target_lang = Column(String, default="Chinese")
+    page_range = Column(String, default="all")  # 需要解析/翻译的页码范围，如 "1-5,8"
+    page_count = Column(Integer, default=0)  # PDF 总页数 (上传时记录，0 表示未知)
+    parse_job_id = Column(String, nullable=True)  # DocMind 云端任务 ID，用于重启后接管
+    parse_layout_num = Column(Integer, default=0)  # 已拉取并落盘的布局数量
+    parse_checkpoint = Column(Text, nullable=True)  # JSON: 分片子任务状态与已下载图片
+    submitter = Column(String, nullable=True)  # 提交者标识 (X-User-Id 请求头或客户端 IP)，用于公平调度
+    layout_count = Column(Integer, default=0)  # 解析得到的布局数量，作为翻译任务大小
+    failed_layouts = Column(Text, nullable=True)  # JSON: 部分翻译完成 (partial) 时失败布局的下标
+    viewport_pages = Column(Text, nullable=True)  # JSON: 详情页当前可见的页码，翻译时优先处理这些页
+    viewport_updated_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
 
@@ -30,4 +40,45 @@ class Config(Base):
     llm_model = Column(String, default="")
     llm_endpoint = Column(String, default="https://dashscope.aliyuncs.com/compatible-mode/v1")
     translation_engine = Column(String, default="llm")  # llm or aliyun
+    parse_engine = Column(String, default="docmind")  # docmind, local or auto
+    translation_failover = Column(Boolean, default=False)  # 翻译引擎熔断/失败时切换到另一引擎
+    llm_extra_keys = Column(Text, nullable=True)  # JSON: 额外的 LLM 凭据 [{apiKey, endpoint, weight}]
+    aliyun_mt_extra_keys = Column(Text, nullable=True)  # JSON: 额外的机器翻译凭据 [{accessKeyId, accessKeySecret, weight}]
+    llm_model_routes = Column(Text, nullable=True)  # JSON: LLM 模型路由规则，按顺序匹配 [{model, types, minChars, maxChars, ...}]
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+class TaskTranslation(Base):
+    """任务的附加目标语言译文，与主目标语言共享同一份解析结果与图片"""
+    __tablename__ = "task_translations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    task_id = Column(String, index=True)
+    target_lang = Column(String)
+    status = Column(String, default="pending")  # 与 Task.status 相同的取值
+    translate_progress = Column(Integer, default=0)
+    message = Column(String, nullable=True)
+    failed_layouts = Column(Text, nullable=True)  # JSON: 部分翻译完成 (partial) 时失败布局的下标
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    task_id = Column(String, index=True)
+    stage = Column(String, index=True)  # parse or translate
+    status = Column(String, default="queued", index=True)  # queued, running, done, failed, paused, cancelled
+    payload = Column(Text, nullable=True)  # JSON 参数
+    attempts = Column(Integer, default=0)
+    max_attempts = Column(Integer, default=3)
+    submitter = Column(String, nullable=True, index=True)
+    size = Column(Integer, default=1)  # 任务大小: 解析为页数，翻译为布局数
+    engine = Column(String, nullable=True)  # docmind / local / llm / aliyun，用于引擎并发上限
+    control = Column(String, nullable=True)  # 运行中任务收到的控制请求: pause / cancel
+    variant = Column(String, nullable=True)  # 同一任务同一阶段的子任务标识，翻译阶段为附加目标语言 (为空表示主目标语言)
+    last_error = Column(String, nullable=True)
+    lease_owner = Column(String, nullable=True)  # 持有租约的 worker
+    lease_expires_at = Column(DateTime, nullable=True)
+    enqueued_at = Column(DateTime, default=datetime.now)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+from app.core.circuit_breaker import CircuitBreaker
+
+
+def _breaker(**kwargs):
+    options = dict(window_size=4, min_calls=4, failure_rate_threshold=0.5, slow_call_seconds=10, open_seconds=60)
+    options.update(kwargs)
+    return CircuitBreaker("test", **options)
+
+
+def test_opens_when_failure_rate_reaches_threshold():
+    breaker = _breaker()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_success()
+    assert breaker.state == "closed"  # 调用数不足 min_calls
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.allow() is False
+
+
+def test_slow_calls_count_as_failures():
+    breaker = _breaker()
+    for latency in (1, 20, 1, 20):
+        breaker.record_success(latency)
+    assert breaker.state == "open"
+
+
+def test_window_forgets_old_failures():
+    breaker = _breaker()
+    breaker.record_failure()
+    for _ in range(6):
+        breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.snapshot()["failureRate"] == 0.0
+
+
+def test_half_open_allows_a_single_probe_and_closes_on_success():
+    breaker = _breaker(open_seconds=0)
+    for _ in range(4):
+        breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.allow() is True
+    assert breaker.state == "half_open"
+    assert breaker.allow() is False  # 探测进行中
+    breaker.record_success(1)
+    assert breaker.state == "closed"
+    assert breaker.snapshot()["calls"] == 0
+
+
+def test_failed_or_slow_probe_reopens():
+    for finish in (lambda b: b.record_failure(), lambda b: b.record_success(20)):
+        breaker = _breaker(open_seconds=0)
+        for _ in range(4):
+            breaker.record_failure()
+        assert breaker.allow() is True
+        finish(breaker)
+        assert breaker.state == "open"
+
+
+def test_ignored_probe_frees_the_probe_slot():
+    breaker = _breaker(open_seconds=0)
+    for _ in range(4):
+        breaker.record_failure()
+    assert breaker.allow() is True
+    breaker.record_ignored()
+    assert breaker.state == "half_open"
+    assert breaker.allow() is True
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+import threading
+
+from app.core.client_pool import AliyunClientPool
+
+
+def test_same_key_is_built_once_and_reused():
+    pool = AliyunClientPool()
+    built = []
+
+    def factory():
+        built.append(1)
+        return object()
+
+    first = pool._get("alimt", "ep", "id", "secret", factory)
+    second = pool._get("alimt", "ep", "id", "secret", factory)
+    assert first is second
+    assert len(built) == 1
+
+
+def test_building_one_client_does_not_block_other_keys():
+    pool = AliyunClientPool()
+    building = threading.Event()
+    release = threading.Event()
+
+    def slow_factory():
+        building.set()
+        release.wait(5)
+        return "slow"
+
+    thread = threading.Thread(target=pool._get, args=("docmind", "ep", None, None, slow_factory))
+    thread.start()
+    try:
+        assert building.wait(5)
+        # 默认凭据链客户端构建期间，其他凭据的客户端仍可立即取得
+        assert pool._get("alimt", "ep", "id", "secret", lambda: "fast") == "fast"
+    finally:
+        release.set()
+        thread.join()
+    assert pool._get("docmind", "ep", None, None, lambda: "rebuilt") == "slow"
+
+
+def test_concurrent_callers_share_one_build():
+    pool = AliyunClientPool()
+    calls = []
+    gate = threading.Event()
+
+    def factory():
+        calls.append(1)
+        gate.wait(5)
+        return object()
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(pool._get("alimt", "ep", "id", "secret", factory)))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    gate.set()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert len({id(client) for client in results}) == 1
+
+
+def test_evict_removes_only_matching_credentials():
+    pool = AliyunClientPool()
+    pool._get("alimt", "ep", "old", "secret", object)
+    kept = pool._get("alimt", "ep", "other", "secret", object)
+    assert pool.evict("old", "secret") == 1
+    assert pool.evict("old", "secret") == 0
+    assert pool._get("alimt", "ep", "other", "secret", object) is kept
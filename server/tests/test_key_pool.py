@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+import time
+
+from app.core.key_pool import KeyPool, classify_error
+
+
+class _StatusError(Exception):
+    def __init__(self, message, status=None, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+def _pool(*credentials):
+    pool = KeyPool("llm")
+    pool.configure(list(credentials))
+    return pool
+
+
+def test_classify_error():
+    assert classify_error(_StatusError("x", status=429)) == "throttled"
+    assert classify_error(_StatusError("x", status=401)) == "invalid"
+    assert classify_error(RuntimeError("Throttling.User: rate limit exceeded")) == "throttled"
+    assert classify_error(RuntimeError("InvalidAccessKeyId.NotFound")) == "invalid"
+    assert classify_error(RuntimeError("connection reset")) == "error"
+
+
+def test_acquire_balances_by_outstanding_over_weight():
+    pool = _pool({"secret": "a", "label": "a", "weight": 2}, {"secret": "b", "label": "b", "weight": 1})
+    picked = [pool.acquire().label for _ in range(3)]
+    # a 权重是 b 的两倍，同时进行中的请求也可以是 b 的两倍
+    assert sorted(picked) == ["a", "a", "b"]
+
+
+def test_credentials_without_secret_are_ignored():
+    pool = _pool({"secret": ""}, {"secret": "a"})
+    assert len(pool) == 1
+
+
+def test_throttled_key_cools_down_and_comes_back():
+    pool = _pool({"secret": "a", "label": "a"}, {"secret": "b", "label": "b"})
+    key = pool.acquire()
+    pool.release(key, _StatusError("too many", status=429), retry_after=30)
+    assert key.throttled == 1
+    assert 0 < pool.throttle_remaining() <= 30
+    assert {pool.acquire().label for _ in range(3)} == ({"a", "b"} - {key.label})
+
+    key.throttled_until = time.time() - 1
+    assert pool.throttle_remaining() is None
+    assert key.available(time.time())
+
+
+def test_rejected_key_is_removed_until_reconfigured():
+    pool = _pool({"secret": "a", "label": "a"})
+    key = pool.acquire()
+    pool.release(key, _StatusError("bad key", status=403))
+    assert key.disabled
+    assert pool.acquire() is None
+
+    pool.configure([{"secret": "a", "label": "a"}, {"secret": "c", "label": "c"}])
+    assert pool.acquire().label == "c"
+
+
+def test_configure_keeps_stats_of_unchanged_keys():
+    pool = _pool({"secret": "a", "weight": 1})
+    key = pool.acquire()
+    pool.release(key)
+    pool.configure([{"secret": "a", "weight": 3}])
+    [entry] = pool.snapshot()
+    assert (entry["successes"], entry["weight"], entry["outstanding"]) == (1, 3.0, 0)
+
+
+def test_can_use_filter_skips_keys():
+    pool = _pool({"secret": "a", "label": "a"}, {"secret": "b", "label": "b"})
+    assert pool.acquire(lambda key: key.label == "b").label == "b"
+    assert pool.acquire(lambda key: False) is None
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from app.core.lang_detect import ALREADY_TARGET, TRANSLATABLE, UNTRANSLATABLE, classify_layout
+
+
+@pytest.mark.parametrize("text", [
+    "Résultats expérimentaux",
+    "Einleitung und Motivation",
+    "Conclusiones generales del estudio",
+    "Materiales y métodos",
+])
+def test_short_foreign_heading_is_translated_to_english(text):
+    assert classify_layout(text, "English") == (TRANSLATABLE, "latin")
+    assert classify_layout(text, "English", source_lang="French")[0] == TRANSLATABLE
+
+
+def test_short_latin_text_is_kept_when_source_is_english():
+    assert classify_layout("Experimental setup overview", "English", source_lang="English")[0] == ALREADY_TARGET
+
+
+@pytest.mark.parametrize("text", ["John Smith, Jane Doe", "BERT", "CNN LSTM"])
+def test_names_and_abbreviations_are_kept(text):
+    assert classify_layout(text, "English", source_lang="German")[0] == ALREADY_TARGET
+
+
+def test_english_prose_detected_by_stopwords():
+    text = "In this paper we propose a method for the translation of documents."
+    assert classify_layout(text, "English") == (ALREADY_TARGET, "en")
+    assert classify_layout(text, "Chinese") == (TRANSLATABLE, "en")
+
+
+def test_chinese_text_already_in_target():
+    assert classify_layout("本文提出了一种新的文档翻译方法。", "Chinese") == (ALREADY_TARGET, "zh")
+
+
+@pytest.mark.parametrize("text", ["[12]", "https://example.com/a/b", "3.14 (2.5%)", ""])
+def test_untranslatable_fragments(text):
+    assert classify_layout(text, "Chinese")[0] == UNTRANSLATABLE
+
+
+def test_reference_entries_skipped_only_when_enabled():
+    text = "[3] A. Author. Some paper title. In Proceedings, 2021."
+    assert classify_layout(text, "Chinese")[0] == UNTRANSLATABLE
+    assert classify_layout(text, "Chinese", skip_references=False)[0] == TRANSLATABLE
+
+
+def test_code_block_is_untranslatable():
+    code = "def f(x):\n    return x + 1;\nimport os\n"
+    assert classify_layout(code, "Chinese") == (UNTRANSLATABLE, "code")
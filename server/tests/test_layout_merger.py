@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+from app.core.layout_merger import find_merge_groups, join_fragments, split_translation
+
+
+def test_single_fragment_is_returned_unchanged():
+    assert split_translation(" 译文 ", [10]) == [" 译文 "]
+
+
+def test_split_follows_source_length_ratio():
+    translated = "一二三四五六七八九十。一二三四五六七八九十一二三四五六七八九十。"
+    parts = split_translation(translated, [10, 20])
+    assert "".join(parts) == translated
+    assert parts[0] == "一二三四五六七八九十。"
+
+
+def test_split_prefers_punctuation_near_target():
+    translated = "第一部分内容，第二部分的内容比较长一些。"
+    parts = split_translation(translated, [6, 14])
+    assert parts[0].endswith("，")
+    assert "".join(parts) == translated
+
+
+def test_latin_words_are_not_cut():
+    translated = "alpha beta gamma delta epsilon"
+    parts = split_translation(translated, [1, 1, 1])
+    assert len(parts) == 3
+    assert " ".join(parts).split() == translated.split()
+    for part in parts:
+        assert part == part.strip()
+
+
+def test_join_fragments():
+    assert join_fragments(["experi-", "ment results"]) == "experiment results"
+    assert join_fragments(["中文片段", "继续"]) == "中文片段继续"
+    assert join_fragments(["the results were", "consistent"]) == "the results were consistent"
+
+
+def test_find_merge_groups_skips_headers_between_fragments():
+    layouts = [
+        {"type": "text", "pageNum": 0, "markdownContent": "The results were"},
+        {"type": "foot", "pageNum": 0, "markdownContent": "Page 1"},
+        {"type": "text", "pageNum": 1, "markdownContent": "consistent with earlier work."},
+        {"type": "text", "pageNum": 1, "markdownContent": "New paragraph."},
+    ]
+    assert find_merge_groups(layouts) == [[0, 2]]
+    assert find_merge_groups(layouts, [True, True, False, True]) == []
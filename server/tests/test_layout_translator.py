@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+from app.core.layout_translator import LayoutTranslator
+
+
+def _layouts():
+    return [
+        {"type": "text", "pageNum": 0, "markdownContent": "The results of the experiment were"},
+        {"type": "text", "pageNum": 1, "markdownContent": "consistent with the earlier findings."},
+        {"type": "text", "pageNum": 1, "markdownContent": "Another standalone paragraph here."},
+    ]
+
+
+def _translator(fail_first):
+    translator = LayoutTranslator(api_key="test", detect_language=False, deferred_backoff_seconds=0)
+    calls = []
+
+    def fake_unit(text, max_retries=None, backoff_seconds=None, stop_event=None, model=None):
+        calls.append(text)
+        if text in fail_first:
+            fail_first.discard(text)
+            raise RuntimeError("boom")
+        return f"<{text}>", "llm"
+
+    translator._translate_unit = fake_unit
+    return translator, calls
+
+
+def test_failed_merge_group_is_retried_as_joined_unit():
+    joined = "The results of the experiment were consistent with the earlier findings."
+    translator, calls = _translator({joined})
+    finished = []
+    reported = []
+    layouts = translator.translate_layouts(
+        _layouts(),
+        continue_on_error=True,
+        on_item=lambda idx, text, skipped: reported.append((idx, text, skipped)),
+        on_finish=lambda task_id, status, info: finished.append((status, info)),
+    )
+
+    # 组内片段不单独翻译，重试时整组重新合并
+    assert calls.count(joined) == 2
+    assert "consistent with the earlier findings." not in calls
+    assert finished[-1][0] == "success"
+    for idx in (0, 1):
+        assert layouts[idx]["mergeGroup"] == [0, 1]
+        assert "translationError" not in layouts[idx]
+    rebuilt = layouts[0]["translatedMarkdownContent"] + " " + layouts[1]["translatedMarkdownContent"]
+    assert rebuilt == f"<{joined}>"
+    # 重试成功的组首与片段同样上报进度，供增量保存
+    assert sorted(idx for idx, _, _ in reported) == [0, 1, 2]
+    for idx, text, skipped in reported:
+        assert text == layouts[idx]["translatedMarkdownContent"] and not skipped
+
+
+def test_merge_group_failing_again_marks_every_fragment():
+    joined = "The results of the experiment were consistent with the earlier findings."
+    translator = LayoutTranslator(api_key="test", detect_language=False, deferred_backoff_seconds=0)
+
+    def fake_unit(text, **kwargs):
+        if text == joined:
+            raise RuntimeError("down")
+        return f"<{text}>", "llm"
+
+    translator._translate_unit = fake_unit
+    finished = []
+    layouts = translator.translate_layouts(
+        _layouts(),
+        continue_on_error=True,
+        on_finish=lambda task_id, status, info: finished.append((status, info)),
+    )
+
+    status, info = finished[-1]
+    assert status == "partial"
+    assert info["failed_indices"] == [0, 1]
+    for idx in (0, 1):
+        assert layouts[idx]["translationError"] == "down"
+        assert "mergeGroup" not in layouts[idx]
+        assert "translatedMarkdownContent" not in layouts[idx]
+    assert layouts[2]["translatedMarkdownContent"] == "<Another standalone paragraph here.>"
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from app.core.pdf_pages import format_page_range, parse_page_range
+
+
+@pytest.mark.parametrize("spec", [None, "", "  ", "all", "ALL", "*"])
+def test_all_pages(spec):
+    assert parse_page_range(spec, 10) is None
+
+
+@pytest.mark.parametrize("spec, expected", [
+    ("3", [2]),
+    ("1-3,5", [0, 1, 2, 4]),
+    ("5，1-2", [0, 1, 4]),
+    ("2-3, 3-4,", [1, 2, 3]),
+    ("-2", [0, 1]),
+    ("9-", [8, 9]),
+])
+def test_ranges_are_zero_based_and_sorted(spec, expected):
+    assert parse_page_range(spec, 10) == expected
+
+
+@pytest.mark.parametrize("spec", ["0", "4-2", "11", "8-12", "a", ",", "1-x"])
+def test_invalid_ranges(spec):
+    with pytest.raises(ValueError):
+        parse_page_range(spec, 10)
+
+
+def test_unknown_page_count_skips_upper_bound():
+    assert parse_page_range("20-21", 0) == [19, 20]
+
+
+def test_format_round_trip():
+    pages = parse_page_range("1-3,5,7-8", 10)
+    assert format_page_range(pages) == "1-3,5,7-8"
+    assert format_page_range(None) == "all"
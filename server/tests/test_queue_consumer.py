@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+import threading
+
+from app.core.job_queue import INTERRUPT_ACTION, JobControlled, QueueConsumer
+
+
+class _FakeQueue:
+    def __init__(self):
+        self.calls = []
+
+    def heartbeat(self, job_id, owner, lease_seconds):
+        return False
+
+    def complete(self, job_id, owner):
+        self.calls.append(("complete", job_id))
+
+    def fail(self, job_id, owner, error, retry=True):
+        self.calls.append(("fail", job_id))
+
+    def release(self, job_id, owner):
+        self.calls.append(("release", job_id))
+
+    def finish_controlled(self, job_id, owner, action):
+        self.calls.append(("finish_controlled", job_id, action))
+
+
+def _run(consumer, job):
+    consumer.running_jobs[job["id"]] = job
+    consumer._slots.acquire()
+    thread = threading.Thread(target=consumer._run_job, args=(job,))
+    thread.start()
+    return thread
+
+
+def test_lost_lease_stops_handler_and_skips_queue_updates():
+    queue = _FakeQueue()
+    stopped = threading.Event()
+    started = threading.Event()
+    lost = []
+
+    def handler(task_id, job):
+        started.set()
+        assert stopped.wait(5)
+        raise JobControlled(INTERRUPT_ACTION)
+
+    def on_lease_lost(job):
+        lost.append(job["task_id"])
+        stopped.set()
+
+    consumer = QueueConsumer("parse", handler, queue=queue, on_lease_lost=on_lease_lost)
+    thread = _run(consumer, {"id": 1, "task_id": "t1", "attempts": 1})
+    assert started.wait(5)
+    consumer._lose_lease(1)
+    thread.join(5)
+
+    assert lost == ["t1"]
+    assert queue.calls == []
+    assert not consumer.is_running("t1")
+    assert consumer._lost_jobs == set()
+
+
+def test_handler_finishing_after_lease_loss_does_not_complete():
+    queue = _FakeQueue()
+    release = threading.Event()
+    consumer = QueueConsumer("parse", lambda task_id, job: release.wait(5), queue=queue)
+    thread = _run(consumer, {"id": 2, "task_id": "t2", "attempts": 1})
+    consumer._lose_lease(2)
+    release.set()
+    thread.join(5)
+    assert queue.calls == []
+
+
+def test_owned_job_completes():
+    queue = _FakeQueue()
+    consumer = QueueConsumer("parse", lambda task_id, job: None, queue=queue)
+    _run(consumer, {"id": 3, "task_id": "t3", "attempts": 1}).join(5)
+    assert queue.calls == [("complete", 3)]
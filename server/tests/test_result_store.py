@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+import os
+
+from app.core.result_store import (
+    is_stale, load_result, merge_external_edits, save_result, source_hash, translation_snapshot,
+)
+
+
+def _layouts():
+    return [{"markdownContent": f"source {i}", "translatedMarkdownContent": f"译文 {i}"} for i in range(3)]
+
+
+def _touch_later(path, saved_mtime):
+    # 保证外部写入后的修改时间与上次保存不同
+    os.utime(path, ns=(saved_mtime + 1_000_000, saved_mtime + 1_000_000))
+
+
+def test_save_and_load_roundtrip(tmp_path):
+    path = str(tmp_path / "result.yaml")
+    layouts = _layouts()
+    save_result(path, {"task_id": "t1"}, layouts)
+    data, loaded = load_result(path)
+    assert data["task_id"] == "t1"
+    assert loaded == layouts
+
+
+def test_unchanged_file_merges_nothing(tmp_path):
+    path = str(tmp_path / "result.yaml")
+    layouts = _layouts()
+    mtime = save_result(path, {}, layouts)
+    layouts[2]["translatedMarkdownContent"] = "batch"
+    assert merge_external_edits(path, layouts, mtime, translation_snapshot(layouts)) == (0, 0)
+    assert layouts[2]["translatedMarkdownContent"] == "batch"
+
+
+def test_external_translation_survives_batch_save(tmp_path):
+    path = str(tmp_path / "result.yaml")
+    layouts = _layouts()
+    mtime = save_result(path, {}, layouts)
+    snapshot = translation_snapshot(layouts)
+
+    # 单独翻译写入第 1 条并去掉合并组；批量任务在内存中翻译了第 2 条
+    data, disk = load_result(path)
+    disk[1]["translatedMarkdownContent"] = "重新翻译"
+    disk[1]["translationModel"] = "qwen-mt-plus"
+    _touch_later(path, save_result(path, data, disk))
+    layouts[2]["translatedMarkdownContent"] = "批量译文"
+
+    assert merge_external_edits(path, layouts, mtime, snapshot) == (0, 1)
+    assert layouts[1]["translatedMarkdownContent"] == "重新翻译"
+    assert layouts[1]["translationModel"] == "qwen-mt-plus"
+    assert layouts[2]["translatedMarkdownContent"] == "批量译文"
+
+
+def test_external_source_edit_is_merged(tmp_path):
+    path = str(tmp_path / "result.yaml")
+    layouts = _layouts()
+    mtime = save_result(path, {}, layouts)
+    data, disk = load_result(path)
+    disk[0]["markdownContent"] = "edited source"
+    _touch_later(path, save_result(path, data, disk))
+
+    sources, _ = merge_external_edits(path, layouts, mtime, translation_snapshot(layouts))
+    assert sources == 1
+    assert layouts[0]["markdownContent"] == "edited source"
+
+
+def test_is_stale_compares_source_hash():
+    item = {"markdownContent": "a", "translatedMarkdownContent": "甲", "sourceHash": source_hash("a")}
+    assert not is_stale(item)
+    item["markdownContent"] = "b"
+    assert is_stale(item)
+    assert not is_stale({"markdownContent": "b", "translatedMarkdownContent": "乙"})
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime, timedelta
+
+from app.core.scheduler import FairShareScheduler, JobCandidate
+
+NOW = datetime(2026, 1, 1, 12, 0, 0)
+
+
+def _job(job_id, submitter="alice", size=1, engine="llm", waited=0):
+    return JobCandidate(job_id, submitter, size, engine, NOW - timedelta(seconds=waited))
+
+
+def _ids(jobs):
+    return [job.job_id for job in jobs]
+
+
+def test_submitter_with_fewer_running_jobs_goes_first():
+    scheduler = FairShareScheduler()
+    jobs = [_job(1, "alice"), _job(2, "bob")]
+    ordered = scheduler.order(jobs, {"alice": 2, "bob": 0}, {}, now=NOW)
+    assert _ids(ordered) == [2, 1]
+
+
+def test_smaller_jobs_first_then_enqueue_order():
+    scheduler = FairShareScheduler()
+    jobs = [_job(1, size=50), _job(2, size=5), _job(3, size=5)]
+    assert _ids(scheduler.order(jobs, {}, {}, now=NOW)) == [2, 3, 1]
+
+
+def test_waiting_shrinks_effective_size():
+    scheduler = FairShareScheduler(aging_seconds=60)
+    old_large = _job(1, size=20, waited=600)
+    new_small = _job(2, size=5)
+    assert scheduler.effective_size(old_large, NOW) < scheduler.effective_size(new_small, NOW)
+    assert _ids(scheduler.order([new_small, old_large], {}, {}, now=NOW)) == [1, 2]
+
+
+def test_starved_jobs_are_claimed_first_in_enqueue_order():
+    scheduler = FairShareScheduler(max_wait_seconds=3600)
+    jobs = [_job(1, "bob", size=1), _job(3, "alice", size=100, waited=4000), _job(2, "alice", size=90, waited=5000)]
+    ordered = scheduler.order(jobs, {"alice": 5}, {}, now=NOW)
+    assert _ids(ordered) == [2, 3, 1]
+
+
+def test_engines_at_their_limit_are_skipped():
+    scheduler = FairShareScheduler(engine_limits={"docmind": 1})
+    jobs = [_job(1, engine="docmind"), _job(2, engine="llm")]
+    assert _ids(scheduler.order(jobs, {}, {"docmind": 1}, now=NOW)) == [2]
+    assert _ids(scheduler.order(jobs, {}, {"docmind": 0}, now=NOW)) == [1, 2]
+
+
+def test_candidate_defaults():
+    job = JobCandidate(7, None, 0, None, None)
+    assert (job.submitter, job.size, job.engine) == ("anonymous", 1, "")
+    assert FairShareScheduler().effective_size(job, NOW) == 1
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+import threading
+
+import pytest
+
+from app.core.single_flight import FlightAborted, SingleFlight
+
+
+def _start_follower(flight, key, fn, results):
+    def target():
+        try:
+            results.append(flight.do(key, fn))
+        except Exception as e:
+            results.append(e)
+
+    thread = threading.Thread(target=target)
+    thread.start()
+    return thread
+
+
+def _wait_for_waiter(flight, key):
+    while True:
+        with flight._lock:
+            call = flight._calls.get(key)
+            if call is not None and call.waiters:
+                return
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def leader_fn():
+        calls.append("leader")
+        release.wait(5)
+        return "result"
+
+    results = []
+    leader = _start_follower(flight, "k", leader_fn, results)
+    while "leader" not in calls:
+        pass
+    follower = _start_follower(flight, "k", lambda: calls.append("follower") or "other", results)
+    _wait_for_waiter(flight, "k")
+    release.set()
+    leader.join(5)
+    follower.join(5)
+
+    assert results == ["result", "result"]
+    assert calls == ["leader"]
+    assert flight.snapshot() == {"executed": 1, "coalesced": 1, "inFlight": 0}
+
+
+def test_followers_share_errors():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def failing():
+        release.wait(5)
+        raise ValueError("boom")
+
+    results = []
+    leader = _start_follower(flight, "k", failing, results)
+    while not flight._calls:
+        pass
+    follower = _start_follower(flight, "k", lambda: "unused", results)
+    _wait_for_waiter(flight, "k")
+    release.set()
+    leader.join(5)
+    follower.join(5)
+    assert [type(r) for r in results] == [ValueError, ValueError]
+
+
+def test_aborted_leader_makes_followers_retry():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def aborted():
+        release.wait(5)
+        raise FlightAborted(RuntimeError("stopped"))
+
+    results = []
+    leader = _start_follower(flight, "k", aborted, results)
+    while not flight._calls:
+        pass
+    follower = _start_follower(flight, "k", lambda: "own result", results)
+    _wait_for_waiter(flight, "k")
+    release.set()
+    leader.join(5)
+    follower.join(5)
+
+    errors = [r for r in results if isinstance(r, Exception)]
+    assert [str(e) for e in errors] == ["stopped"] and isinstance(errors[0], RuntimeError)
+    assert "own result" in results
+    assert flight.executed == 2
+
+
+def test_sequential_calls_are_not_cached():
+    flight = SingleFlight()
+    assert flight.do("k", lambda: 1) == 1
+    assert flight.do("k", lambda: 2) == 2
+    with pytest.raises(KeyError):
+        flight.do("k", lambda: {}["missing"])
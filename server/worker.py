@@ -0,0 +1,107 @@
+import argparse
+import logging
+import os
+import signal
+import sys
+import threading
+
+# 将当前目录添加到 python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.config import init_directories, PIPELINE_CONFIG
+from app.core.logging_config import setup_logging
+from app.core.database import engine, Base, migrate_schema
+from app.models import sql_models  # 确保模型被导入以便 create_all 能找到
+
+STAGES = ("parse", "translate")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="PDF Translator 独立 worker 进程，从共享数据库队列认领解析/翻译任务",
+        epilog=(
+            "队列保存在 SQLite 数据库 (WAL 模式) 中，worker 必须与 API 运行在同一台主机并访问同一个本地数据库文件，"
+            "不支持通过网络文件系统在多台主机间共享；写锁等待时间见 pipeline.sqlite_busy_timeout_seconds。"
+        ),
+    )
+    parser.add_argument(
+        "--stages",
+        default=",".join(STAGES),
+        help="要处理的阶段，逗号分隔 (parse,translate)",
+    )
+    parser.add_argument(
+        "--parse-workers",
+        type=int,
+        default=int(PIPELINE_CONFIG.get("parse_workers") or 2),
+        help="解析并发数",
+    )
+    parser.add_argument(
+        "--translate-workers",
+        type=int,
+        default=int(PIPELINE_CONFIG.get("translate_workers") or 2),
+        help="翻译并发数",
+    )
+    parser.add_argument(
+        "--shutdown-timeout",
+        type=float,
+        default=30.0,
+        help="收到停止信号后等待运行中任务归还队列的秒数",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = [s for s in stages if s not in STAGES]
+    if unknown or not stages:
+        raise SystemExit(f"未知的阶段: {unknown or args.stages}")
+
+    setup_logging(log_name=f"worker_{os.getpid()}.log")
+    logger = logging.getLogger("app.worker")
+
+    init_directories()
+    Base.metadata.create_all(bind=engine)
+    migrate_schema()
+
+    # 在初始化日志之后再导入管理器，避免其模块级日志丢失
+    from app.core.pdf_parse_manager import pdf_parse_manager
+    from app.core.translation_manager import translation_manager
+
+    managers = []
+    if "parse" in stages:
+        pdf_parse_manager.start(max_workers=args.parse_workers)
+        managers.append(pdf_parse_manager)
+    if "translate" in stages:
+        translation_manager.start(max_workers=args.translate_workers)
+        managers.append(translation_manager)
+    logger.info(
+        f"Worker started: pid={os.getpid()}, stages={stages}, parse_workers={args.parse_workers}, translate_workers={args.translate_workers}"
+    )
+
+    shutdown = threading.Event()
+
+    def handle_signal(signum, frame):
+        logger.info(f"Received signal {signum}, shutting down worker...")
+        shutdown.set()
+
+    signal.signal(signal.SIGINT, handle_signal)
+    signal.signal(signal.SIGTERM, handle_signal)
+
+    while not shutdown.wait(1.0):
+        pass
+
+    # 停止认领新任务并中断运行中的任务，运行中的任务会归还队列
+    stoppers = [
+        threading.Thread(target=manager.stop_all, kwargs={"wait": True}, daemon=True)
+        for manager in managers
+    ]
+    for stopper in stoppers:
+        stopper.start()
+    for stopper in stoppers:
+        stopper.join(args.shutdown_timeout)
+    logger.info("Worker stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -33,11 +33,17 @@ api.interceptors.response.use(
 )
 
 // 文件上传
-export const uploadFile = (file: File, sourceLang: string, targetLang: string) => {
+export const uploadFile = (
+  file: File,
+  sourceLang: string,
+  targetLang: string,
+  pageRange: string = 'all'
+) => {
   const formData = new FormData()
   formData.append('file', file)
   formData.append('source_lang', sourceLang)
   formData.append('target_lang', targetLang)
+  formData.append('page_range', pageRange || 'all')
 
   return api.post('/upload', formData, {
     headers: {
@@ -57,8 +63,24 @@ export const getTranslationProgress = (taskId: string) => {
 }
 
 // 提交翻译任务
-export const submitTranslationTask = (taskId: string) => {
-  return api.post('/translate', { taskId })
+// targetLangs 为附加目标语言，与主目标语言共享同一份解析结果
+export const submitTranslationTask = (taskId: string, targetLangs?: string[]) => {
+  return api.post('/translate', targetLangs ? { taskId, targetLangs } : { taskId })
+}
+
+// 暂停任务
+export const pauseTask = (taskId: string) => {
+  return api.post(`/task/${taskId}/pause`)
+}
+
+// 取消任务
+export const cancelTask = (taskId: string) => {
+  return api.post(`/task/${taskId}/cancel`)
+}
+
+// 恢复已暂停/取消的任务
+export const resumeTask = (taskId: string) => {
+  return api.post(`/task/${taskId}/resume`)
 }
 
 // 获取翻译列表
@@ -67,20 +89,39 @@ export const getTranslationList = () => {
 }
 
 // 获取任务解析结果详情
-export const getTaskDetail = (taskId: string) => {
-  return api.get(`/task/${taskId}/result`)
+export const getTaskDetail = (taskId: string, lang?: string) => {
+  return api.get(`/task/${taskId}/result`, { params: lang ? { lang } : undefined })
+}
+
+// 立即翻译单个布局 (译文写回结果) 或任意文本，不在批量翻译队列中排队
+export const translateLayout = (
+  taskId: string,
+  payload: { index?: number; text?: string; lang?: string }
+) => {
+  return api.post(`/task/${taskId}/translate-layout`, payload)
+}
+
+// 上报详情页可见的页码，翻译优先处理这些页
+export const updateViewport = (taskId: string, pages: number[]) => {
+  return api.post(`/task/${taskId}/viewport`, { pages })
+}
+
+// 重新翻译原文已修改的布局
+export const refreshStaleTranslations = (taskId: string, lang?: string) => {
+  return api.post(`/task/${taskId}/refresh`, null, { params: lang ? { lang } : undefined })
 }
 
 // 更新任务解析结果
 export const updateTaskResult = (
   taskId: string,
   index: number,
-  payload: { markdownContent?: string; translatedMarkdownContent?: string }
+  payload: { markdownContent?: string; translatedMarkdownContent?: string },
+  lang?: string
 ) => {
   return api.post(`/task/${taskId}/result/update`, {
     index,
     ...payload
-  })
+  }, { params: lang ? { lang } : undefined })
 }
 
 // 下载原始文件
@@ -107,4 +148,9 @@ export const saveConfig = (config: any) => {
   return api.post('/config', config)
 }
 
+// 获取翻译凭据用量
+export const getKeyUsage = () => {
+  return api.get('/keys/usage')
+}
+
 export default api
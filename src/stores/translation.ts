@@ -4,11 +4,43 @@ import { ref } from 'vue'
 export interface TranslationTask {
   taskId: string
   filename: string
-  status: 'pending' | 'processing' | 'completed' | 'failed'
+  status: 'pending' | 'processing' | 'completed' | 'failed' | 'paused' | 'cancelled' | 'partial'
   parseProgress: number
   translateProgress: number
   createTime: string
   message?: string
+  targetLang?: string
+  // 附加目标语言的翻译进度
+  translations?: TaskTranslationProgress[]
+}
+
+export interface TaskTranslationProgress {
+  targetLang: string
+  status: TranslationTask['status']
+  translateProgress: number
+  message?: string
+  failedLayouts?: number[]
+}
+
+export interface LLMCredential {
+  apiKey: string
+  endpoint?: string
+  weight?: number
+}
+
+export interface AliyunMTCredential {
+  accessKeyId: string
+  accessKeySecret: string
+  weight?: number
+}
+
+export interface ModelRoute {
+  model: string
+  types?: string[]
+  minChars?: number | null
+  maxChars?: number | null
+  minComplexity?: number | null
+  maxComplexity?: number | null
 }
 
 export interface TranslationConfig {
@@ -20,6 +52,11 @@ export interface TranslationConfig {
   llmModel: string
   llmEndpoint: string
   translationEngine?: string
+  parseEngine?: string
+  translationFailover?: boolean
+  llmExtraKeys?: LLMCredential[]
+  aliyunMtExtraKeys?: AliyunMTCredential[]
+  llmModelRoutes?: ModelRoute[]
 }
 
 export const useTranslationStore = defineStore('translation', () => {
@@ -35,7 +72,12 @@ export const useTranslationStore = defineStore('translation', () => {
     llmApiKey: '',
     llmModel: '',
     llmEndpoint: 'https://dashscope.aliyuncs.com/compatible-mode/v1',
-    translationEngine: 'llm'
+    translationEngine: 'llm',
+    parseEngine: 'docmind',
+    translationFailover: false,
+    llmExtraKeys: [],
+    aliyunMtExtraKeys: [],
+    llmModelRoutes: []
   })
 
   // 添加翻译任务